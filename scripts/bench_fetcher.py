@@ -0,0 +1,142 @@
+"""
+BaseFetcher をローカル代替サーバー（scripts.graph_standin）に対して実行するベンチマーク
+
+ページサイズ × プール数の組み合わせ毎に別プロセスで fetch_interval / run を実行し、
+rows/s、ページレイテンシの p50/p99、受信バイト数、ピーク RSS を表示する。
+
+python -m scripts.bench_fetcher --page-sizes 100,500,1000 --pools 100,1000 --hours 24 --mode run --fields minimal
+"""
+
+import argparse
+import logging
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List
+
+from scripts.graph_standin import GraphStandin, StandinConfig
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.http_client import summarize
+from src.data.fetcher.projection import FULL_FIELDS, build_pool_hour_query, resolve_fields
+from src.data.fetcher.retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+_QUERY = (Path(__file__).resolve().parents[1] / "src/data/fetcher/queries/uniswap_poolHourDatas.gql").read_text()
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    endpoint: str
+    page_size: int
+    pools: int
+    interval_end_iso: str
+    hours: int
+    mode: str = "run"  # "run"（ファイルへ逐次書き込み） | "fetch"（fetch_interval でメモリに保持）
+    pagination: str = "id_gt"
+    fields: str = "full"  # projection.FIELD_PROFILES のプロファイル名
+
+
+def _peak_rss_mib() -> float:
+    # Linux は KiB、macOS は bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_case(case: BenchCase) -> Dict[str, Any]:
+    """1 ケースを実行して計測結果を返す（ピーク RSS はプロセス単位なので別プロセスで呼ぶ）"""
+    fields = resolve_fields(case.fields)
+    fetcher = BaseFetcher(
+        "uniswap",
+        case.endpoint,
+        _QUERY if fields == FULL_FIELDS else build_pool_hour_query(fields),
+        case.page_size,
+        pagination=case.pagination,
+        http2=False,
+        retry=RetryPolicy(base_delay=0.05, max_delay=1.0),
+        fields=fields,
+    )
+    started = time.perf_counter()
+    with fetcher, tempfile.TemporaryDirectory() as tmp:
+        if case.mode == "fetch":
+            rows = len(fetcher.fetch_interval(case.interval_end_iso, case.hours))
+        else:
+            rows = fetcher.save_pages(
+                fetcher.iter_pages(case.interval_end_iso, case.hours), str(Path(tmp) / "out.jsonl")
+            )
+    elapsed = time.perf_counter() - started
+    latency = summarize(fetcher.page_timings)
+    return {
+        **asdict(case),
+        "rows": rows,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed) if elapsed else 0,
+        "pages": latency["pages"],
+        "p50_ms": round(latency["p50_s"] * 1000, 1),
+        "p99_ms": round(latency["p99_s"] * 1000, 1),
+        "mib": round(latency["bytes"] / 2**20, 2),
+        "peak_rss_mib": round(_peak_rss_mib(), 1),
+        "retries": fetcher.controller.metrics["retries"],
+    }
+
+
+def _run_isolated(case: BenchCase) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_case, (case,))
+
+
+def main(
+    page_sizes: List[int], pool_counts: List[int], hours: int, mode: str, cfg: StandinConfig, fields: str = "full"
+) -> List[Dict[str, Any]]:
+    results = []
+    header = ["pools", "page", "rows", "rows/s", "p50 ms", "p99 ms", "MiB", "RSS MiB", "retry"]
+    print("".join(f"{h:>{w}}" for h, w in zip(header, [7, 7, 10, 11, 9, 9, 8, 9, 7])))
+    for pools in pool_counts:
+        standin_cfg = replace(cfg, pools=pools, hours=hours)
+        with GraphStandin(standin_cfg) as standin:
+            end = standin_cfg.start_unix + hours * 3600
+            end_iso = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(end))
+            for page_size in page_sizes:
+                r = _run_isolated(BenchCase(standin.url, page_size, pools, end_iso, hours, mode, fields=fields))
+                results.append(r)
+                print(
+                    f"{pools:>7}{page_size:>7}{r['rows']:>10,}{r['rows_per_s']:>11,}{r['p50_ms']:>9}"
+                    f"{r['p99_ms']:>9}{r['mib']:>8}{r['peak_rss_mib']:>9}{r['retries']:>7}"
+                )
+    return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    p = argparse.ArgumentParser()
+    p.add_argument("--page-sizes", type=_int_list, default=[100, 500, 1000])
+    p.add_argument("--pools", type=_int_list, default=[100, 1000])
+    p.add_argument("--hours", type=int, default=24, help="1 回の取得で対象にする時間数")
+    p.add_argument("--mode", choices=["run", "fetch"], default="run")
+    p.add_argument("--fields", choices=["full", "minimal"], default="full", help="取得フィールドのプロファイル")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    args = p.parse_args()
+    main(
+        args.page_sizes,
+        args.pools,
+        args.hours,
+        args.mode,
+        StandinConfig(
+            latency_s=args.latency_ms / 1000,
+            rate_limit_rate=args.rate_limit_rate,
+            server_error_rate=args.error_rate,
+            retry_after_s=0,
+        ),
+        args.fields,
+    )
@@ -0,0 +1,61 @@
+"""
+フェッチャーの JSON バックエンド（msgspec / orjson / stdlib）を記録済みページで比較するマイクロベンチマーク
+
+python -m scripts.bench_fetcher_serde --rows 1000 --iterations 50
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from src.data.fetcher.serde import available_backends, get_serde
+from src.data.fetcher.writers import build_row
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "poolhourdatas_page.json"
+
+
+def _load_page(path: Path, rows: int) -> bytes:
+    """記録済みページを読み込み、rows 行になるまで複製したレスポンスボディを返す"""
+    recorded = json.loads(path.read_text("utf-8"))["data"]["poolHourDatas"]
+    page = []
+    for i in range(rows):
+        rec = json.loads(json.dumps(recorded[i % len(recorded)]))
+        rec["id"] = f"{rec['id']}-{i}"
+        page.append(rec)
+    return json.dumps({"data": {"poolHourDatas": page}}).encode("utf-8")
+
+
+def _best_of(fn, iterations: int) -> float:
+    best = float("inf")
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(page_path: Path, rows: int, iterations: int) -> None:
+    body = _load_page(page_path, rows)
+    logger.info(f"page: {len(body) / 1024:.0f} KiB, {rows} rows, best of {iterations}")
+    print(f"{'backend':<10}{'decode ms':>12}{'encode ms':>12}{'rows/s':>14}")
+    for name in available_backends():
+        serde = get_serde(name)
+        page = serde.decode_page(body)
+        rows_out = [build_row(rec, "uniswap_v3", "2024-10-04T01:00:00Z") for rec in page]
+        decode_s = _best_of(lambda: serde.decode_page(body), iterations)
+        encode_s = _best_of(lambda: serde.encode_rows(rows_out), iterations)
+        print(f"{name:<10}{decode_s * 1000:>12.2f}{encode_s * 1000:>12.2f}{rows / (decode_s + encode_s):>14,.0f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    p = argparse.ArgumentParser()
+    p.add_argument("--page", type=Path, default=DEFAULT_PAGE, help="記録済み GraphQL レスポンス (JSON)")
+    p.add_argument("--rows", type=int, default=1000, help="1 ページの行数（記録済みページを複製して拡張）")
+    p.add_argument("--iterations", type=int, default=50)
+    args = p.parse_args()
+    main(args.page, args.rows, args.iterations)
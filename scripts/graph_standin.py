@@ -0,0 +1,289 @@
+"""
+The Graph の poolHourDatas エンドポイントのローカル代替サーバー（負荷試験・ベンチマーク用）
+
+- 記録済みページ（--template）を雛形に、pools × hours 行の合成データを返す
+- variables の startTime/endTime/first/skip/lastId を解釈し、skip・id_gt の両方のページングに対応（行は id 昇順）
+- クエリの選択セットに従ってフィールドを射影し、pools(where: {id_in: $ids}) にも応答する
+  （引数・フィルタは解釈せず、選択セットのみ）
+- ゲートウェイと同じ first<=1000・skip<=5000 の制限
+- レイテンシ、429（Retry-After 付き）、5xx を確率的に注入できる
+
+python -m scripts.graph_standin --pools 500 --latency-ms 50 --error-rate 0.05
+"""
+
+import argparse
+import copy
+import json
+import logging
+import random
+import re
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "poolhourdatas_page.json"
+
+MAX_FIRST = 1000
+MAX_SKIP = 5000
+
+
+@dataclass(frozen=True)
+class StandinConfig:
+    """
+    pools: プール数（1 時間あたりの行数）
+    start_unix / hours: データが存在する期間
+    latency_s: 1 リクエストあたりの応答遅延
+    rate_limit_rate / server_error_rate: 429 / 5xx を返す確率
+    """
+
+    pools: int = 100
+    start_unix: int = 1727740800  # 2024-10-01T00:00:00Z
+    hours: int = 24 * 7
+    latency_s: float = 0.0
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    retry_after_s: int = 1
+    seed: int = 0
+    template_path: Path = DEFAULT_TEMPLATE
+
+
+_TOKEN = re.compile(r"#[^\n]*|[A-Za-z_][A-Za-z0-9_]*|[{}()]")
+
+Selection = Dict[str, "Selection"]
+
+
+@lru_cache(maxsize=64)
+def parse_selection(query: str) -> Tuple[str, Selection]:
+    """
+    クエリ最初のルートフィールド名とその選択セット（フィールド名 → 子の選択セット）。
+    解釈できないクエリは poolHourDatas の全フィールドとして扱う
+    """
+    tokens = [t for t in _TOKEN.findall(query) if not t.startswith("#")]
+    if "{" not in tokens:
+        return "poolHourDatas", {}
+    # query Name(...) { root(...) { ... } }
+    i = tokens.index("{") + 1
+    root = tokens[i]
+    i += 1
+    if tokens[i] == "(":
+        depth = 0
+        while True:
+            depth += {"(": 1, ")": -1}.get(tokens[i], 0)
+            i += 1
+            if depth == 0:
+                break
+
+    def _parse(i: int) -> Tuple[Selection, int]:
+        tree: Selection = {}
+        i += 1  # "{"
+        while tokens[i] != "}":
+            name = tokens[i]
+            i += 1
+            if tokens[i] == "{":
+                tree[name], i = _parse(i)
+            else:
+                tree[name] = {}
+        return tree, i + 1
+
+    return root, _parse(i)[0]
+
+
+def project(value: Any, selection: Selection) -> Any:
+    if not selection or not isinstance(value, dict):
+        return value
+    return {k: project(value[k], sub) for k, sub in selection.items() if k in value}
+
+
+class PoolHourDataset:
+    """
+    pools × hours 行の仮想データセット
+
+    id は "{pool_id}-{hour}"（pool_id は固定長 16 進）なので、時間窓内の行の id 昇順は
+    (プール, 時間) の順と一致する。行は保持せず、ページ要求ごとに必要な分だけ生成する。
+    """
+
+    def __init__(self, cfg: StandinConfig):
+        self.cfg = cfg
+        self.templates = json.loads(cfg.template_path.read_text("utf-8"))["data"]["poolHourDatas"]
+        self.pools: List[Dict[str, Any]] = []
+        for p in range(cfg.pools):
+            pool = copy.deepcopy(self.templates[p % len(self.templates)]["pool"])
+            pool["id"] = f"0x{p:040x}"
+            self.pools.append(pool)
+
+    def __len__(self) -> int:
+        return self.cfg.pools * self.cfg.hours
+
+    def _hours(self, start: int, end: int) -> range:
+        first = max(0, -(-(start - self.cfg.start_unix) // 3600))
+        last = min(self.cfg.hours, -(-(end - self.cfg.start_unix) // 3600))
+        return range(first, max(first, last))
+
+    def row(self, pool_idx: int, hour_idx: int) -> Dict[str, Any]:
+        period = self.cfg.start_unix + hour_idx * 3600
+        pool = self.pools[pool_idx]
+        row = dict(self.templates[pool_idx % len(self.templates)])
+        row["id"] = f"{pool['id']}-{period // 3600}"
+        row["periodStartUnix"] = period
+        row["pool"] = pool
+        return row
+
+    def page(self, variables: Dict[str, Any]) -> List[Dict[str, Any]]:
+        hours = self._hours(variables["startTime"], variables["endTime"])
+        if not hours:
+            return []
+        size = len(self.pools) * len(hours)
+
+        class _Ids:
+            # bisect 用に、窓内の行の id を位置から計算する
+            def __getitem__(_, i: int) -> str:
+                return self.row(i // len(hours), hours[i % len(hours)])["id"]
+
+        begin = bisect_right(_Ids(), variables.get("lastId") or "", 0, size) + variables.get("skip", 0)
+        end = min(size, begin + variables.get("first", 100))
+        return [self.row(i // len(hours), hours[i % len(hours)]) for i in range(begin, end)]
+
+    def pools_by_id(self, ids: List[str]) -> List[Dict[str, Any]]:
+        out = []
+        for pool_id in ids:
+            try:
+                idx = int(pool_id, 16)
+            except ValueError:
+                continue
+            if 0 <= idx < len(self.pools) and self.pools[idx]["id"] == pool_id:
+                out.append(self.pools[idx])
+        return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # ヘッダとボディを別々に送るため、Nagle と遅延 ACK の組み合わせで 40ms 単位の遅延が乗らないように
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        status, headers, payload = self.server.standin.respond(json.loads(body))
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    standin: "GraphStandin"
+
+
+class GraphStandin:
+    """
+    with GraphStandin(StandinConfig(pools=50)) as standin:
+        BaseFetcher("uniswap", standin.url, query, page_size=1000)...
+    """
+
+    def __init__(self, cfg: Optional[StandinConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.cfg = cfg or StandinConfig()
+        self.dataset = PoolHourDataset(self.cfg)
+        self.stats: Dict[str, int] = {"requests": 0, "rows": 0, "429": 0, "5xx": 0}
+        self._rng = random.Random(self.cfg.seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.standin = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def respond(self, request: Dict[str, Any]) -> tuple[int, Dict[str, str], Dict[str, Any]]:
+        """1 リクエスト分の (status, headers, body)"""
+        variables = request.get("variables") or {}
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._rng.random()
+        if self.cfg.latency_s:
+            time.sleep(self.cfg.latency_s)
+
+        if roll < self.cfg.rate_limit_rate:
+            with self._lock:
+                self.stats["429"] += 1
+            return 429, {"Retry-After": str(self.cfg.retry_after_s)}, {"error": "rate limited"}
+        if roll < self.cfg.rate_limit_rate + self.cfg.server_error_rate:
+            with self._lock:
+                self.stats["5xx"] += 1
+            return 503, {}, {"error": "service unavailable"}
+
+        if variables.get("first", 0) > MAX_FIRST or variables.get("skip", 0) > MAX_SKIP:
+            message = f"The `first` argument must be <= {MAX_FIRST} and `skip` <= {MAX_SKIP}"
+            return 200, {}, {"errors": [{"message": message}]}
+
+        root, selection = parse_selection(request.get("query", ""))
+        if root == "pools":
+            pools = self.dataset.pools_by_id(variables.get("ids", []))
+            return 200, {}, {"data": {"pools": [project(p, selection) for p in pools]}}
+
+        page = [project(row, selection) for row in self.dataset.page(variables)]
+        with self._lock:
+            self.stats["rows"] += len(page)
+        return 200, {}, {"data": {"poolHourDatas": page}}
+
+    def start(self) -> "GraphStandin":
+        # shutdown() は poll_interval 毎にしか反映されないため短めにする
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def __enter__(self) -> "GraphStandin":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    p = argparse.ArgumentParser()
+    p.add_argument("--port", type=int, default=8787)
+    p.add_argument("--pools", type=int, default=100)
+    p.add_argument("--hours", type=int, default=24 * 7, help="2024-10-01T00:00Z からデータを用意する時間数")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 を返す確率")
+    p.add_argument("--error-rate", type=float, default=0.0, help="503 を返す確率")
+    p.add_argument("--template", type=Path, default=DEFAULT_TEMPLATE, help="行の雛形にする記録済みレスポンス")
+    args = p.parse_args()
+    cfg = StandinConfig(
+        pools=args.pools,
+        hours=args.hours,
+        latency_s=args.latency_ms / 1000,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.error_rate,
+        template_path=args.template,
+    )
+    standin = GraphStandin(cfg, port=args.port)
+    logger.info(f"serving {len(standin.dataset)} rows at {standin.url}")
+    try:
+        standin.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,133 @@
+"""
+長期間のバックフィル: 期間を時間／日単位のシャードに分割し、並行取得・チェックポイント付きで保存する
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Literal
+
+from .orchestrator import FetchResult, FetchTask, run_tasks
+from .run_fetch import build_fetcher
+from .types import ProtocolName
+from .writers import OutputFormat, output_suffix
+
+logger = logging.getLogger(__name__)
+
+ShardUnit = Literal["hour", "day"]
+
+_SHARD_HOURS: dict[str, int] = {"hour": 1, "day": 24}
+
+
+@dataclass(frozen=True)
+class Shard:
+    """[end - hours, end) の取得単位"""
+
+    interval_end_iso: str
+    hours: int
+
+    @property
+    def date(self) -> str:
+        # 区間の開始日でディレクトリを分ける（00:00 終わりの日シャードが翌日に入らないように）
+        end = datetime.fromisoformat(self.interval_end_iso)
+        return (end - timedelta(hours=self.hours)).date().isoformat()
+
+
+def parse_utc_hour(value: str) -> datetime:
+    """'2024-07-01' や '2024-07-01T05:30:00Z' を UTC の正時に切り捨てて返す"""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def plan_shards(start: datetime, end: datetime, unit: ShardUnit = "day") -> list[Shard]:
+    """
+    [start, end) をシャードに分割する。日シャードは UTC 日境界に揃え、端数は短いシャードになる
+    """
+    if unit not in _SHARD_HOURS:
+        raise ValueError(f"Unknown shard unit: {unit}")
+    if start >= end:
+        raise ValueError(f"start must be before end: {start} >= {end}")
+
+    shards: list[Shard] = []
+    cur = start
+    while cur < end:
+        if unit == "day":
+            boundary = (cur + timedelta(days=1)).replace(hour=0)
+        else:
+            boundary = cur + timedelta(hours=1)
+        nxt = min(boundary, end)
+        shards.append(Shard(nxt.isoformat(), int((nxt - cur).total_seconds() // 3600)))
+        cur = nxt
+    return shards
+
+
+class Checkpoint:
+    """
+    完了済みシャードを JSON ファイルに記録する（クラッシュ後の再開用）
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: set[str] = set()
+        if path.exists():
+            self.done = set(json.loads(path.read_text("utf-8")).get("done", []))
+
+    def is_done(self, shard: Shard) -> bool:
+        return shard.interval_end_iso in self.done
+
+    def mark_done(self, shard: Shard) -> None:
+        self.done.add(shard.interval_end_iso)
+        # 書き込み途中で落ちても壊れないよう一時ファイル経由で置き換える
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"done": sorted(self.done)}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def shard_output_path(output_dir: str, protocol: str, shard: Shard, fmt: OutputFormat = "jsonl") -> str:
+    """{output_dir}/{protocol}/{date}/{protocol}_{interval_end_iso}.{jsonl|parquet}"""
+    name = f"{protocol}_{shard.interval_end_iso}{output_suffix(fmt)}"
+    return str(Path(output_dir) / protocol / shard.date / name)
+
+
+def run_backfill(
+    protocol: ProtocolName,
+    start: datetime,
+    end: datetime,
+    output_dir: str,
+    unit: ShardUnit = "day",
+    workers: int = 8,
+    fmt: OutputFormat = "jsonl",
+) -> dict[Shard, str]:
+    """
+    [start, end) をバックフィルし、全シャード（再開前に完了済みのものも含む）の出力パスを返す
+    """
+    shards = plan_shards(start, end, unit)
+    checkpoint = Checkpoint(Path(output_dir) / protocol / "_checkpoint.json")
+    pending = [s for s in shards if not checkpoint.is_done(s)]
+    logger.info(f"[{protocol}] backfill {start} - {end}: {len(shards)} shards, {len(pending)} pending")
+
+    fetcher = build_fetcher(protocol)
+    if fetcher.pagination == "skip" and unit == "day":
+        logger.warning(f"[{protocol}] day shards with skip pagination may hit The Graph's skip<=5000 cap")
+
+    by_task: dict[FetchTask, Shard] = {}
+    for shard in pending:
+        task = FetchTask(
+            fetcher, shard.interval_end_iso, shard_output_path(output_dir, protocol, shard, fmt), shard.hours
+        )
+        by_task[task] = shard
+
+    def _on_done(result: FetchResult) -> None:
+        if result.error is None:
+            checkpoint.mark_done(by_task[result.task])
+
+    # 1 エンドポイントのみなので全体枠＝エンドポイント枠
+    with fetcher:
+        run_tasks(list(by_task), max_concurrency=workers, per_endpoint_concurrency=workers, on_done=_on_done)
+    return {s: shard_output_path(output_dir, protocol, s, fmt) for s in shards}
@@ -1,12 +1,36 @@
-import json
+import asyncio
+import contextlib
 import logging
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    get_args,
+)
 
-import requests
+import httpx
 
-from .types import PoolHourData
+from .http_client import PageTimer, PageTiming, build_client, summarize
+from .metadata_cache import PoolMetadataCache
+from .projection import FULL_FIELDS, MAX_POOLS_PER_QUERY, build_pools_query, needs_pool_metadata, resolve_fields
+from .retry import FetchController, RetryPolicy
+from .serde import GraphQLError, Serde, get_serde
+from .storage_write import StorageWriteWriter
+from .types import PaginationMode, PoolHourData, PoolInfo
+from .writers import JsonlWriter, ParquetWriter, open_writer
 
 
 class BaseFetcher:
@@ -21,76 +45,322 @@ class BaseFetcher:
         query: str,
         page_size: int,
         headers: Optional[Dict[str, str]] = None,
+        pagination: PaginationMode = "skip",
+        pool_size: int = 10,
+        http2: bool = True,
+        client: Optional[httpx.Client] = None,
+        serde: Optional[Serde] = None,
+        retry: Optional[RetryPolicy] = None,
+        min_page_size: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        metadata_cache: Optional[PoolMetadataCache] = None,
+        dex_protocol: Optional[str] = None,
+        rate_group: Optional[str] = None,
+        requests_per_s: Optional[float] = None,
     ):
         """
         Initialize the BaseFetcher.
+
+        The fetcher owns a pooled keep-alive `httpx.Client` (created lazily unless
+        `client` is given) so consecutive pages reuse the same TCP/TLS connection.
+        `page_size` is the upper bound; the controller retries transient failures
+        and shrinks the page size (down to `min_page_size`) on gateway timeouts.
+        `fields` declares what `query` selects (default: every field); when pool
+        metadata is projected out it is fetched once per pool and attached to rows;
+        `metadata_cache` persists it across runs. Fetchers sharing a `rate_group`
+        (default: the endpoint) share one concurrency slot and `requests_per_s`
+        budget when run together by the orchestrator.
         """
+        if pagination not in get_args(PaginationMode):
+            raise ValueError(f"Unknown pagination mode: {pagination}")
         self.name: str = name
         self.endpoint: str = endpoint
         self.query: str = query
         self.page_size: int = page_size
         self.headers: Dict[str, str] = headers or {}
+        self.pagination: PaginationMode = pagination
+        self.pool_size: int = pool_size
+        self.http2: bool = http2
+        self._client: Optional[httpx.Client] = client
+        # ページのデコードと出力行のエンコードに使う JSON バックエンド
+        self.serde: Serde = serde or get_serde()
+        # 直近ページのレイテンシ内訳（ベンチマーク・ログ用）
+        self.page_timings: Deque[PageTiming] = deque(maxlen=10_000)
+        # リトライ・ページサイズ調整（同一フェッチャーの全タスクで共有）
+        self.controller = FetchController(name, page_size, retry, min_page_size)
+        self.fields = resolve_fields(fields or "full")
+        # 行のクエリで省いたプール情報は pools クエリで取得し、id 毎にキャッシュする
+        self.pool_metadata: Dict[str, PoolInfo] = {}
+        self.metadata_cache = metadata_cache
+        self._pools_query: Optional[str] = build_pools_query() if needs_pool_metadata(self.fields) else None
+        # 出力の dex_protocol 列
+        self.dex_protocol: str = dex_protocol or f"{name}_v3"
+        self.rate_group: str = rate_group or endpoint
+        self.requests_per_s: Optional[float] = requests_per_s
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = build_client(self.pool_size, self.http2)
+        return self._client
+
+    def close(self) -> None:
+        """
+        Close the pooled HTTP client and flush the metadata cache.
+        """
+        if self.metadata_cache is not None:
+            self.metadata_cache.flush()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self) -> "BaseFetcher":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
 
-    def fetch_interval(self, interval_end_iso: str) -> List[PoolHourData]:
+    def _initial_variables(self, interval_end_iso: str, hours: int = 1) -> Dict[str, Any]:
         """
-        Fetch data for a specific time interval.
+        Build GraphQL variables for the first page of an interval.
         """
-        # 1時間前を start／end timestamp に変換
+        # hours 時間前を start／end timestamp に変換
         end_dt = datetime.fromisoformat(interval_end_iso.replace("Z", "+00:00"))
-        start_dt = end_dt - timedelta(hours=1)
-        start_ts = int(start_dt.timestamp())
-        end_ts = int(end_dt.timestamp())
+        start_dt = end_dt - timedelta(hours=hours)
+        return {
+            "startTime": int(start_dt.timestamp()),
+            "endTime": int(end_dt.timestamp()),
+            "first": self.controller.page_size,
+            "skip": 0,
+            # id_gt モードでは "" から開始（全 id が "" より大きい）
+            "lastId": "",
+        }
+
+    def _next_variables(self, variables: Dict[str, Any], page: List[PoolHourData]) -> Optional[Dict[str, Any]]:
+        """
+        Return variables for the next page, or None if `page` was the last one.
+        """
+        if len(page) < variables["first"]:
+            return None
+        # ページサイズはコントローラが随時調整するため、次ページの first は都度取り直す
+        first = self.controller.page_size
+        if self.pagination == "id_gt":
+            # クエリは orderBy: id なので末尾 id 以降を取得すればページ数に依存せず一定コスト
+            return {**variables, "first": first, "lastId": page[-1]["id"]}
+        return {**variables, "first": first, "skip": variables["skip"] + len(page)}
+
+    def _decode_page(self, body: bytes) -> List[PoolHourData]:
+        """
+        Decode poolHourDatas from a raw GraphQL response body.
+        """
+        if self.fields == FULL_FIELDS:
+            return self.serde.decode_page(body)
+        # 射影したクエリの行は PoolHourData の全キーを持たないため型検証なしでデコード
+        return self.serde.decode_data(body)["poolHourDatas"]
+
+    def _decode_pools(self, body: bytes) -> List[PoolInfo]:
+        return self.serde.decode_data(body)["pools"]
 
-        all_records: List[PoolHourData] = []
-        skip = 0
+    def _missing_pool_batches(self, page: List[PoolHourData]) -> List[List[str]]:
+        """
+        Pool ids in `page` without cached metadata, split into pools-query sized batches.
+        """
+        ids = list(dict.fromkeys(rec["pool"]["id"] for rec in page if rec["pool"]["id"] not in self.pool_metadata))
+        if ids and self.metadata_cache is not None:
+            cached = self.metadata_cache.get_many(self.name, ids)
+            self.pool_metadata.update(cached)
+            ids = [i for i in ids if i not in cached]
+        return [ids[i : i + MAX_POOLS_PER_QUERY] for i in range(0, len(ids), MAX_POOLS_PER_QUERY)]
+
+    def _attach_pool_metadata(self, page: List[PoolHourData], pools: Iterable[PoolInfo]) -> None:
+        """
+        Cache fetched pools and replace each row's projected `pool` with the full object.
+        """
+        pools = list(pools)
+        for pool in pools:
+            self.pool_metadata[pool["id"]] = pool
+        if pools and self.metadata_cache is not None:
+            self.metadata_cache.put_many(self.name, pools)
+        for rec in page:
+            # 同じプールの行は同じ dict を共有する
+            rec["pool"] = self.pool_metadata.get(rec["pool"]["id"], rec["pool"])
+
+    def _record_timing(self, timing: PageTiming) -> PageTiming:
+        logging.debug(
+            f"[{self.name}] page {timing.http_version} connect={timing.connect * 1000:.1f}ms "
+            f"ttfb={timing.ttfb * 1000:.1f}ms download={timing.download * 1000:.1f}ms bytes={timing.bytes}"
+        )
+        self.page_timings.append(timing)
+        return timing
+
+    def iter_pages(self, interval_end_iso: str, hours: int = 1) -> Iterator[List[PoolHourData]]:
+        """
+        Yield pages for the `hours`-long interval ending at `interval_end_iso` as they arrive.
+        """
+        timings: List[PageTiming] = []
+        variables: Optional[Dict[str, Any]] = self._initial_variables(interval_end_iso, hours)
+        while variables is not None:
+            logging.info(f"[{self.name}] fetch skip={variables['skip']} last_id={variables['lastId'] or '-'}")
+            page, variables, timing = self._post_page(variables)
+            timings.append(timing)
+            if page and self._pools_query:
+                pools = []
+                for ids in self._missing_pool_batches(page):
+                    batch, _, _ = self._post_page({"ids": ids}, self._pools_query, self._decode_pools)
+                    pools += batch
+                self._attach_pool_metadata(page, pools)
+            if page:
+                yield page
+            variables = self._next_variables(variables, page)
+        logging.info(f"[{self.name}] latency {summarize(timings)}")
+        logging.info(f"[{self.name}] controller {self.controller.snapshot()}")
+
+    def _post_page(
+        self,
+        variables: Dict[str, Any],
+        query: Optional[str] = None,
+        decode: Optional[Callable[[bytes], Any]] = None,
+    ) -> Tuple[Any, Dict[str, Any], PageTiming]:
+        """
+        POST one page, retrying transient failures. Returns the page together with
+        the variables actually sent (`first` may have been shrunk by a retry).
+
+        `query`/`decode` default to the poolHourDatas query and page decoder.
+        """
+        attempt = 1
         while True:
-            variables: Dict[str, Any] = {
-                "startTime": start_ts,
-                "endTime": end_ts,
-                "first": self.page_size,
-                "skip": skip,
-            }
-            logging.info(f"[{self.name}] fetch skip={skip}")
-            resp = requests.post(
-                self.endpoint,
-                json={"query": self.query, "variables": variables},
-                headers=self.headers,
-                timeout=30,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            if data.get("errors"):
-                raise RuntimeError(data["errors"])
-            page = data["data"]["poolHourDatas"]
-            if not page:
-                break
-            all_records.extend(page)
-            if len(page) < self.page_size:
-                break
-            skip += self.page_size
-        return all_records
-
-    def save(self, records: List[PoolHourData], output_path: str) -> None:
+            timer = PageTimer()
+            try:
+                resp = self.client.post(
+                    self.endpoint,
+                    json={"query": query or self.query, "variables": variables},
+                    headers=self.headers,
+                    extensions={"trace": timer.trace},
+                )
+                timing = self._record_timing(timer.finish(resp))
+                resp.raise_for_status()
+                page = (decode or self._decode_page)(resp.content)
+            except (httpx.HTTPError, GraphQLError) as exc:
+                delay = self.controller.on_error(exc, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                if "first" in variables:
+                    variables = {**variables, "first": self.controller.page_size}
+                continue
+            self.controller.on_success(timing.total)
+            return page, variables, timing
+
+    def fetch_interval(self, interval_end_iso: str, hours: int = 1) -> List[PoolHourData]:
+        """
+        Fetch data for the `hours`-long interval ending at `interval_end_iso`.
+        """
+        return [rec for page in self.iter_pages(interval_end_iso, hours) for rec in page]
+
+    async def aiter_pages(
+        self,
+        client: httpx.AsyncClient,
+        interval_end_iso: str,
+        slot: Optional[Callable[[str], AsyncContextManager[None]]] = None,
+        hours: int = 1,
+    ) -> AsyncIterator[List[PoolHourData]]:
+        """
+        Async variant of iter_pages using a shared httpx.AsyncClient.
+
+        `slot(rate_group)` is entered around each HTTP request so that callers can
+        enforce global / per-endpoint concurrency limits.
+        """
+        variables: Optional[Dict[str, Any]] = self._initial_variables(interval_end_iso, hours)
+        while variables is not None:
+            logging.info(f"[{self.name}] afetch end={interval_end_iso} skip={variables['skip']}")
+            page, variables = await self._apost_page(client, variables, slot)
+            if page and self._pools_query:
+                pools = []
+                for ids in self._missing_pool_batches(page):
+                    batch, _ = await self._apost_page(client, {"ids": ids}, slot, self._pools_query, self._decode_pools)
+                    pools += batch
+                self._attach_pool_metadata(page, pools)
+            if page:
+                yield page
+            variables = self._next_variables(variables, page)
+
+    async def _apost_page(
+        self,
+        client: httpx.AsyncClient,
+        variables: Dict[str, Any],
+        slot: Optional[Callable[[str], AsyncContextManager[None]]] = None,
+        query: Optional[str] = None,
+        decode: Optional[Callable[[bytes], Any]] = None,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Async variant of _post_page. The concurrency slot is released while backing off.
+        """
+        attempt = 1
+        while True:
+            try:
+                async with slot(self.rate_group) if slot else contextlib.nullcontext():
+                    timer = PageTimer()
+                    resp = await client.post(
+                        self.endpoint,
+                        json={"query": query or self.query, "variables": variables},
+                        headers=self.headers,
+                        extensions={"trace": timer.atrace},
+                    )
+                    timing = self._record_timing(timer.finish(resp))
+                resp.raise_for_status()
+                page = (decode or self._decode_page)(resp.content)
+            except (httpx.HTTPError, GraphQLError) as exc:
+                delay = self.controller.on_error(exc, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                if "first" in variables:
+                    variables = {**variables, "first": self.controller.page_size}
+                continue
+            self.controller.on_success(timing.total)
+            return page, variables
+
+    async def afetch_interval(
+        self,
+        client: httpx.AsyncClient,
+        interval_end_iso: str,
+        slot: Optional[Callable[[str], AsyncContextManager[None]]] = None,
+        hours: int = 1,
+    ) -> List[PoolHourData]:
+        """
+        Async variant of fetch_interval.
+        """
+        return [rec async for page in self.aiter_pages(client, interval_end_iso, slot, hours) for rec in page]
+
+    def open_writer(
+        self, output_path: str, **sink_options: Any
+    ) -> Union[JsonlWriter, ParquetWriter, StorageWriteWriter]:
+        """
+        Open a page-at-a-time writer for this protocol (Parquet if the path ends with .parquet,
+        the Storage Write API for bq://project.dataset.table).
+        """
+        return open_writer(output_path, self.dex_protocol, self.serde, **sink_options)
+
+    def save_pages(self, pages: Iterable[List[PoolHourData]], output_path: str, **sink_options: Any) -> int:
+        """
+        Write pages to `output_path` as they are produced and return the row count.
+        """
+        with self.open_writer(output_path, **sink_options) as writer:
+            for page in pages:
+                writer.write(page)
+        logging.info(f"[{self.name}] saved {writer.rows} to {output_path}")
+        return writer.rows
+
+    def save(self, records: Iterable[PoolHourData], output_path: str) -> None:
         """
         Save the fetched data to a file.
         """
-        out = Path(output_path)
-        out.parent.mkdir(parents=True, exist_ok=True)
-        with out.open("w", encoding="utf-8") as f:
-            for rec in records:
-                row = {
-                    "raw": rec,
-                    "pool_id": rec["pool"]["id"],
-                    "dex_protocol": f"{self.name}_v3",
-                    "hour_ts": datetime.utcfromtimestamp(rec["periodStartUnix"]).isoformat(timespec="seconds") + "Z",
-                    "load_ts": datetime.utcnow().isoformat(timespec="seconds") + "Z",
-                }
-                f.write(json.dumps(row, ensure_ascii=False) + "\n")
-        logging.info(f"[{self.name}] saved {len(records)} to {output_path}")
-
-    def run(self, output_path: str, interval_end_iso: str) -> None:
-        """
-        Run the fetcher.
-        """
-        recs = self.fetch_interval(interval_end_iso)
-        self.save(recs, output_path)
+        self.save_pages([records], output_path)
+
+    def run(self, output_path: str, interval_end_iso: str, hours: int = 1, **sink_options: Any) -> int:
+        """
+        Run the fetcher, streaming each page to `output_path` as it arrives.
+        """
+        return self.save_pages(self.iter_pages(interval_end_iso, hours), output_path, **sink_options)
@@ -1,13 +1,27 @@
+"""
+protocols.yml の読み込み
+
+ファイルの探索・YAML のパース・スキーマ検証・環境変数の展開はプロセス内で 1 回だけ行い、結果をキャッシュする。
+ファイルの mtime が変わっていれば再読み込みする（確認は PROTOCOL_CFG_CHECK_INTERVAL_S 秒毎。常駐するポーラー向け）。
+"""
+
+import copy
 import logging
 import os
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_args
 
 import yaml
 
-from .types import ProtocolConfigMap
+from .types import PaginationMode, ProtocolConfig, ProtocolConfigMap
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHECK_INTERVAL_S = 5.0
+
 
 class ConfigError(Exception):
     """設定ファイル関連のエラー"""
@@ -15,6 +29,26 @@ class ConfigError(Exception):
     pass
 
 
+# キー → (許容する型, 必須か)
+_SCHEMA: Dict[str, Tuple[Tuple[type, ...], bool]] = {
+    "api_key": ((str,), True),
+    "subgraph_id": ((str,), True),
+    "endpoint_template": ((str,), True),
+    "page_size": ((int,), True),
+    "pagination": ((str,), False),
+    "pool_size": ((int,), False),
+    "http2": ((bool,), False),
+    "min_page_size": ((int,), False),
+    "max_retries": ((int,), False),
+    "fields": ((str, list), False),
+    "query_file": ((str,), False),
+    "headers": ((dict,), False),
+    "dex_protocol": ((str,), False),
+    "rate_group": ((str,), False),
+    "requests_per_s": ((int, float), False),
+}
+
+
 def _get_search_candidates() -> list[Path]:
     """protocols.yml の探索候補パスのリストを返す"""
     candidates = []
@@ -33,8 +67,9 @@ def _get_search_candidates() -> list[Path]:
     return list(dict.fromkeys(candidates))
 
 
-def locate_cfg() -> Path:
-    """protocols.yml のパスを探索して返す"""
+@lru_cache(maxsize=None)
+def _locate(env_path: Optional[str]) -> Path:
+    # env_path はキャッシュのキー（PROTOCOL_CFG_PATH が変われば探索し直す）
     candidates = _get_search_candidates()
 
     for cand in candidates:
@@ -47,22 +82,158 @@ def locate_cfg() -> Path:
     raise ConfigError("protocols.yml が見つかりません。\n探索パス:\n" + "\n".join(f"  - {p}" for p in searched))
 
 
-def load_protocol_config(protocol: str | None = None) -> ProtocolConfigMap:
+def locate_cfg() -> Path:
+    """protocols.yml のパスを探索して返す（PROTOCOL_CFG_PATH の値毎にキャッシュ）"""
+    return _locate(os.getenv("PROTOCOL_CFG_PATH"))
+
+
+def validate_protocol_config(raw: Any, source: str = "protocols.yml") -> ProtocolConfigMap:
     """
-    protocols.yml を読み込み、環境変数を展開して返す
+    スキーマ検証して返す。問題はまとめて 1 つの ConfigError にする
     """
-    cfg_path = locate_cfg()
-    raw: ProtocolConfigMap = yaml.safe_load(cfg_path.read_text("utf-8"))
-
-    # 環境変数展開
-    targets = [protocol] if protocol else raw.keys()
-    for proto in targets:
-        for k, v in raw[proto].items():
-            if isinstance(v, str) and v.startswith("${") and v.endswith("}"):
-                env_name = v[2:-1]
-                env_val = os.getenv(env_name)
-                if env_val is None:
-                    raise ConfigError(f"必須の環境変数 '{env_name}' が設定されていません (protocols.yml: {proto}.{k})")
-                raw[proto][k] = env_val
-
+    if not isinstance(raw, dict) or not raw:
+        raise ConfigError(f"{source}: プロトコル名をキーにしたマッピングが必要です")
+    problems: List[str] = []
+    for proto, cfg in raw.items():
+        if not isinstance(cfg, dict):
+            problems.append(f"{proto}: マッピングが必要です")
+            continue
+        for key, (types, required) in _SCHEMA.items():
+            if key not in cfg:
+                if required:
+                    problems.append(f"{proto}.{key}: 必須です")
+                continue
+            value = cfg[key]
+            # bool は int のサブクラスなので page_size: true などを弾く
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                expected = " | ".join(t.__name__ for t in types)
+                problems.append(f"{proto}.{key}: {expected} が必要です（{value!r}）")
+        for key in cfg.keys() - _SCHEMA.keys():
+            problems.append(f"{proto}.{key}: 不明なキーです")
+        if cfg.get("pagination", "skip") not in get_args(PaginationMode):
+            problems.append(f"{proto}.pagination: {' | '.join(get_args(PaginationMode))} のいずれかです")
+        if isinstance(cfg.get("page_size"), int) and cfg["page_size"] <= 0:
+            problems.append(f"{proto}.page_size: 正の値が必要です")
+    if problems:
+        raise ConfigError(f"{source} が不正です:\n" + "\n".join(f"  - {p}" for p in problems))
     return raw
+
+
+def _expand_env(proto: str, cfg: Dict[str, Any]) -> ProtocolConfig:
+    """値全体が ${NAME} の文字列を環境変数の値に置き換える"""
+    expanded = copy.deepcopy(cfg)
+    for k, v in cfg.items():
+        if isinstance(v, str) and v.startswith("${") and v.endswith("}"):
+            env_name = v[2:-1]
+            env_val = os.getenv(env_name)
+            if env_val is None:
+                raise ConfigError(f"必須の環境変数 '{env_name}' が設定されていません (protocols.yml: {proto}.{k})")
+            expanded[k] = env_val
+    return expanded
+
+
+class ProtocolConfigCache:
+    """
+    1 つの protocols.yml のパース・検証結果と、環境変数を展開済みのプロトコル毎の設定
+
+    環境変数の展開は要求されたプロトコルの分だけ（使わないプロトコルの環境変数は不要）
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        check_interval_s: float = DEFAULT_CHECK_INTERVAL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked_at = float("-inf")
+        self._raw: ProtocolConfigMap = {}
+        self._expanded: ProtocolConfigMap = {}
+        # 再読み込みの度に増える（設定の変更を検知する側で使う）
+        self.version = 0
+
+    def _file_stamp(self) -> Tuple[int, int]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError as e:
+            raise ConfigError(f"protocols.yml が見つかりません: {self.path}") from e
+        return st.st_mtime_ns, st.st_size
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        mtime・サイズが変わっていれば読み直し、読み直したら True
+
+        force でなければ前回の確認から check_interval_s 経つまでは stat もしない。
+        新しい内容が不正な場合は ConfigError を送出し、直前の正しい設定を使い続ける。
+        """
+        with self._lock:
+            now = self._clock()
+            if not force and self._stamp is not None and now - self._checked_at < self.check_interval_s:
+                return False
+            self._checked_at = now
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                return False
+            try:
+                parsed = yaml.safe_load(self.path.read_text("utf-8"))
+            except yaml.YAMLError as e:
+                raise ConfigError(f"{self.path} を YAML としてパースできません: {e}") from e
+            raw = validate_protocol_config(parsed, str(self.path))
+            first = self._stamp is None
+            self._raw, self._expanded, self._stamp = raw, {}, stamp
+            self.version += 1
+            if not first:
+                logger.info(f"Reloaded {self.path} (version {self.version})")
+            return True
+
+    def names(self) -> List[str]:
+        self.refresh()
+        return list(self._raw)
+
+    def get(self, protocol: str) -> ProtocolConfig:
+        self.refresh()
+        if protocol not in self._raw:
+            raise ConfigError(f"Unknown protocol: {protocol} (protocols.yml: {', '.join(self._raw)})")
+        if protocol not in self._expanded:
+            self._expanded[protocol] = _expand_env(protocol, self._raw[protocol])
+        # 呼び出し側での変更がキャッシュに波及しないようコピーを返す
+        return copy.deepcopy(self._expanded[protocol])
+
+
+_caches: Dict[Path, ProtocolConfigCache] = {}
+_caches_lock = threading.Lock()
+
+
+def protocol_config_cache() -> ProtocolConfigCache:
+    """現在の protocols.yml のキャッシュ（パス毎に 1 つ）"""
+    path = locate_cfg()
+    with _caches_lock:
+        if path not in _caches:
+            interval = float(os.getenv("PROTOCOL_CFG_CHECK_INTERVAL_S", DEFAULT_CHECK_INTERVAL_S))
+            _caches[path] = ProtocolConfigCache(path, interval)
+        return _caches[path]
+
+
+def clear_config_cache() -> None:
+    """探索結果・パース結果のキャッシュを破棄する（テスト用）"""
+    _locate.cache_clear()
+    with _caches_lock:
+        _caches.clear()
+
+
+def reload_protocol_config() -> bool:
+    """protocols.yml が変わっていれば読み直し、読み直したら True（確認間隔を無視して stat する）"""
+    return protocol_config_cache().refresh(force=True)
+
+
+def load_protocol_config(protocol: str | None = None) -> ProtocolConfigMap:
+    """
+    protocols.yml を読み込み、環境変数を展開して返す（キャッシュ済みの結果のコピー）
+    """
+    cache = protocol_config_cache()
+    targets = [protocol] if protocol else cache.names()
+    return {proto: cache.get(proto) for proto in targets}
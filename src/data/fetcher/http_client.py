@@ -0,0 +1,135 @@
+"""
+The Graph 向け HTTP クライアント（接続プール・keep-alive・HTTP/2）とページ毎のレイテンシ計測
+"""
+
+import importlib.util
+import logging
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30.0
+
+
+def http2_available() -> bool:
+    """HTTP/2 には h2 パッケージが必要（httpx[http2]）"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_kwargs(pool_size: int, http2: bool) -> Dict[str, Any]:
+    # gzip/deflate は常に、br/zstd は brotli/zstandard がインストールされていれば
+    # httpx が Accept-Encoding に含めて自動で展開する
+    return {
+        "timeout": DEFAULT_TIMEOUT,
+        "http2": http2 and http2_available(),
+        "limits": httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=60,
+        ),
+    }
+
+
+def build_client(pool_size: int = 10, http2: bool = True) -> httpx.Client:
+    """keep-alive 接続を再利用する同期クライアント"""
+    return httpx.Client(**_client_kwargs(pool_size, http2))
+
+
+def build_async_client(pool_size: int = 10, http2: bool = True) -> httpx.AsyncClient:
+    """keep-alive 接続を再利用する非同期クライアント"""
+    return httpx.AsyncClient(**_client_kwargs(pool_size, http2))
+
+
+@dataclass(frozen=True)
+class PageTiming:
+    """
+    1 ページ分のレイテンシ内訳（秒）
+
+    connect: TCP + TLS ハンドシェイク（keep-alive で再利用した場合は 0）
+    ttfb: リクエスト送信完了からレスポンスヘッダ受信まで
+    download: ヘッダ受信からボディ読み込み完了まで
+    """
+
+    connect: float
+    ttfb: float
+    download: float
+    total: float
+    bytes: int
+    http_version: str
+
+    @property
+    def reused(self) -> bool:
+        return self.connect == 0.0
+
+
+class PageTimer:
+    """
+    httpx の trace 拡張でイベント時刻を記録し PageTiming を組み立てる
+
+    同期クライアントでは `extensions={"trace": timer.trace}`、
+    非同期クライアントでは `extensions={"trace": timer.atrace}` を渡す
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._marks: Dict[str, float] = {}
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # イベント名は "connection.connect_tcp.started" / "http11.receive_response_headers.complete" など
+        self._marks[event_name] = time.perf_counter()
+
+    async def atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self.trace(event_name, info)
+
+    def _mark(self, suffix: str) -> Optional[float]:
+        for name, ts in self._marks.items():
+            if name.endswith(suffix):
+                return ts
+        return None
+
+    def _span(self, step: str) -> float:
+        start, end = self._mark(f"{step}.started"), self._mark(f"{step}.complete")
+        return end - start if start is not None and end is not None else 0.0
+
+    def finish(self, resp: httpx.Response) -> PageTiming:
+        ended = time.perf_counter()
+        total = ended - self.started
+        connect = self._span("connect_tcp") + self._span("start_tls")
+        sent = self._mark("send_request_body.complete")
+        headers = self._mark("receive_response_headers.complete")
+        if sent is None or headers is None:
+            # trace を発行しないトランスポート（MockTransport 等）では全体を ttfb とみなす
+            ttfb, download = total - connect, 0.0
+        else:
+            ttfb, download = headers - sent, ended - headers
+        return PageTiming(
+            connect=connect,
+            ttfb=ttfb,
+            download=download,
+            total=total,
+            bytes=resp.num_bytes_downloaded,
+            http_version=resp.http_version,
+        )
+
+
+def summarize(timings: Iterable[PageTiming]) -> Dict[str, float]:
+    """ページレイテンシの集計（ログ／ベンチマーク用）"""
+    items = list(timings)
+    if not items:
+        return {"pages": 0}
+    totals = sorted(t.total for t in items)
+    return {
+        "pages": len(items),
+        "new_connections": sum(1 for t in items if not t.reused),
+        "connect_s": sum(t.connect for t in items),
+        "ttfb_s": sum(t.ttfb for t in items),
+        "download_s": sum(t.download for t in items),
+        "p50_s": statistics.median(totals),
+        "p99_s": totals[min(len(totals) - 1, int(len(totals) * 0.99))],
+        "bytes": sum(t.bytes for t in items),
+    }
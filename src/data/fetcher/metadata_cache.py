@@ -0,0 +1,159 @@
+"""
+プール／トークン情報（PoolInfo）の永続キャッシュ
+
+プール情報はほぼ変わらないため、pools クエリの結果を SQLite に保存し、実行をまたいで再利用する。
+TTL を過ぎたエントリはキャッシュミス扱いとなり、次回の取得時に上書きされる。
+
+保存先はローカルファイル、または gs://bucket/path.sqlite（起動時にダウンロードし、
+flush() で変更があればアップロード。世代番号の前提条件付き）。
+FETCHER_METADATA_CACHE 環境変数で指定する（TTL は FETCHER_METADATA_TTL_HOURS、既定 7 日）。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .types import PoolInfo
+
+logger = logging.getLogger(__name__)
+
+_CACHE_ENV = "FETCHER_METADATA_CACHE"
+_TTL_ENV = "FETCHER_METADATA_TTL_HOURS"
+DEFAULT_TTL_S = 7 * 24 * 3600
+# SQLite のバインド変数上限（古いバージョンは 999）
+_LOOKUP_CHUNK = 900
+
+
+class PoolMetadataCache:
+    """
+    (プロトコル, プール id) → PoolInfo の SQLite キャッシュ
+    """
+
+    def __init__(self, path: str, ttl_s: float = DEFAULT_TTL_S, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.dirty = False
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 非同期経路ではイベントループのスレッドから、同期経路では呼び出し元のスレッドから使う
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pools ("
+            " protocol TEXT NOT NULL, id TEXT NOT NULL, body TEXT NOT NULL, fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (protocol, id))"
+        )
+        self._conn.commit()
+
+    def get_many(self, protocol: str, ids: Iterable[str]) -> Dict[str, PoolInfo]:
+        """TTL 内のエントリだけを返す（見つからない id は含まれない）"""
+        ids = list(ids)
+        oldest = self._clock() - self.ttl_s
+        found: Dict[str, PoolInfo] = {}
+        with self._lock:
+            for i in range(0, len(ids), _LOOKUP_CHUNK):
+                chunk = ids[i : i + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT id, body FROM pools WHERE protocol = ? AND fetched_at >= ?"
+                    f" AND id IN ({','.join('?' * len(chunk))})",
+                    [protocol, oldest, *chunk],
+                )
+                found.update((pool_id, json.loads(body)) for pool_id, body in rows)
+        return found
+
+    def put_many(self, protocol: str, pools: Iterable[PoolInfo]) -> int:
+        now = self._clock()
+        rows = [(protocol, p["id"], json.dumps(p, separators=(",", ":")), now) for p in pools]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO pools VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+            self.dirty = True
+        return len(rows)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM pools WHERE fetched_at < ?", (self._clock() - self.ttl_s,))
+            self._conn.commit()
+        return cur.rowcount
+
+    def flush(self) -> None:
+        """ローカルファイルはコミット済みなので何もしない（GCS 版がオーバーライド）"""
+        self.dirty = False
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+class GcsPoolMetadataCache(PoolMetadataCache):
+    """
+    GCS 上の SQLite ファイルをローカルにダウンロードして使い、flush() で書き戻す
+
+    書き戻しは読み込んだ世代番号を if_generation_match に渡す。並行ジョブが先に更新していた場合は
+    キャッシュなので書き戻しを諦める（次回の実行で再取得される）。
+    """
+
+    def __init__(self, uri: str, ttl_s: float = DEFAULT_TTL_S, project: Optional[str] = None, client: Any = None):
+        from google.api_core.exceptions import NotFound
+
+        if client is None:
+            from google.cloud import storage
+
+            client = storage.Client(project=project)
+        bucket, _, name = uri[len("gs://") :].partition("/")
+        self.blob = client.bucket(bucket).blob(name)
+        self._tmp = tempfile.TemporaryDirectory()
+        local = os.path.join(self._tmp.name, "metadata.sqlite")
+        try:
+            self.blob.download_to_filename(local)
+            self.generation = self.blob.generation
+        except NotFound:
+            self.generation = 0
+        super().__init__(local, ttl_s)
+
+    def flush(self) -> None:
+        from google.api_core.exceptions import PreconditionFailed
+
+        if not self.dirty:
+            return
+        try:
+            with self._lock:
+                self.blob.upload_from_filename(self.path, if_generation_match=self.generation)
+        except PreconditionFailed:
+            logger.warning("pool metadata cache was updated concurrently - skipped upload")
+        else:
+            self.generation = self.blob.generation
+            logger.info(f"uploaded pool metadata cache to gs://{self.blob.bucket.name}/{self.blob.name}")
+        self.dirty = False
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._tmp.cleanup()
+
+
+def open_metadata_cache(uri: str, ttl_s: float = DEFAULT_TTL_S) -> PoolMetadataCache:
+    """gs:// なら GCS 同期、それ以外はローカルの SQLite ファイル"""
+    if uri.startswith("gs://"):
+        return GcsPoolMetadataCache(uri, ttl_s)
+    return PoolMetadataCache(uri, ttl_s)
+
+
+@lru_cache(maxsize=None)
+def default_metadata_cache() -> Optional[PoolMetadataCache]:
+    """FETCHER_METADATA_CACHE が設定されていればプロセス内で共有するキャッシュを返す"""
+    uri = os.getenv(_CACHE_ENV)
+    if not uri:
+        return None
+    ttl_s = float(os.getenv(_TTL_ENV, DEFAULT_TTL_S / 3600)) * 3600
+    return open_metadata_cache(uri, ttl_s)
@@ -0,0 +1,186 @@
+"""
+複数プロトコル × 複数時間ウィンドウを asyncio で並行取得するオーケストレータ
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+import httpx
+
+from .base import BaseFetcher
+from .http_client import build_async_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FetchTask:
+    """1 プロトコル・1 ウィンドウ分の取得単位"""
+
+    fetcher: BaseFetcher
+    interval_end_iso: str
+    output_path: str
+    hours: int = 1
+
+
+@dataclass
+class FetchResult:
+    task: FetchTask
+    rows: int = 0
+    elapsed_s: float = 0.0
+    error: Optional[BaseException] = None
+
+
+class RateBudget:
+    """
+    秒間リクエスト数のトークンバケット（バースト 1 秒分）
+
+    同じ rate_group のフェッチャーで共有し、ゲートウェイ全体のレート制限を超えないようにする
+    """
+
+    def __init__(
+        self,
+        requests_per_s: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        if requests_per_s <= 0:
+            raise ValueError(f"requests_per_s must be positive: {requests_per_s}")
+        self.rate = requests_per_s
+        self.capacity = max(1.0, requests_per_s)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # ロック内で待つことで取得順を守る（後着のリクエストが先着を追い越さない）
+        async with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                await self._sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._updated = self._clock()
+            self._tokens -= 1
+
+
+class ConcurrencyLimiter:
+    """
+    全体の同時リクエスト数と rate_group（既定はエンドポイント）毎の同時リクエスト数を制限する
+
+    rates を渡したグループはさらに秒間リクエスト数も制限する
+    """
+
+    def __init__(self, max_concurrency: int, per_endpoint_concurrency: int, rates: Optional[Dict[str, float]] = None):
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._per_endpoint: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(per_endpoint_concurrency)
+        )
+        self._budgets: Dict[str, RateBudget] = {group: RateBudget(rate) for group, rate in (rates or {}).items()}
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str) -> AsyncIterator[None]:
+        # エンドポイント枠を先に取り、1 エンドポイントの待ちで全体枠を塞がない
+        async with self._per_endpoint[endpoint]:
+            if endpoint in self._budgets:
+                await self._budgets[endpoint].acquire()
+            async with self._global:
+                yield
+
+
+def group_rates(fetchers: Iterable[BaseFetcher]) -> Dict[str, float]:
+    """rate_group 毎の秒間リクエスト数（グループ内で指定が異なる場合は最小値）"""
+    rates: Dict[str, float] = {}
+    for f in fetchers:
+        if f.requests_per_s is not None:
+            rates[f.rate_group] = min(rates.get(f.rate_group, f.requests_per_s), f.requests_per_s)
+    return rates
+
+
+async def _run_task(client: httpx.AsyncClient, limiter: ConcurrencyLimiter, task: FetchTask) -> FetchResult:
+    result = FetchResult(task)
+    started = time.perf_counter()
+    try:
+        with task.fetcher.open_writer(task.output_path) as writer:
+            pages = task.fetcher.aiter_pages(client, task.interval_end_iso, limiter.slot, hours=task.hours)
+            async for page in pages:
+                # ページ到着毎に書き出す。ファイル書き込みはイベントループを塞がないようスレッドで実行
+                await asyncio.to_thread(writer.write, page)
+        result.rows = writer.rows
+    except Exception as e:
+        logger.error(f"[{task.fetcher.name}] fetch failed for {task.interval_end_iso}: {e}")
+        result.error = e
+    result.elapsed_s = time.perf_counter() - started
+    return result
+
+
+async def _run_and_notify(
+    client: httpx.AsyncClient,
+    limiter: ConcurrencyLimiter,
+    active: asyncio.Semaphore,
+    task: FetchTask,
+    on_done: Optional[Callable[[FetchResult], None]],
+) -> FetchResult:
+    # 途中のページを大量のタスクが抱え込まないよう、進行中タスク数自体も制限する
+    async with active:
+        result = await _run_task(client, limiter, task)
+    if on_done is not None:
+        on_done(result)
+    return result
+
+
+async def fetch_all(
+    tasks: Sequence[FetchTask],
+    max_concurrency: int = 8,
+    per_endpoint_concurrency: int = 4,
+    client: Optional[httpx.AsyncClient] = None,
+    on_done: Optional[Callable[[FetchResult], None]] = None,
+) -> List[FetchResult]:
+    """
+    全タスクを並行実行し、タスク順に結果を返す（失敗したタスクは error に例外を格納）
+
+    on_done はタスク完了毎にイベントループ上で呼ばれる（チェックポイント記録など）
+    """
+    limiter = ConcurrencyLimiter(max_concurrency, per_endpoint_concurrency, group_rates(t.fetcher for t in tasks))
+    active = asyncio.Semaphore(max_concurrency)
+    owns_client = client is None
+    if client is None:
+        client = build_async_client(pool_size=max_concurrency)
+    try:
+        return list(await asyncio.gather(*(_run_and_notify(client, limiter, active, t, on_done) for t in tasks)))
+    finally:
+        if owns_client:
+            await client.aclose()
+
+
+def run_tasks(
+    tasks: Sequence[FetchTask],
+    max_concurrency: int = 8,
+    per_endpoint_concurrency: int = 4,
+    on_done: Optional[Callable[[FetchResult], None]] = None,
+) -> None:
+    """
+    同期コードからの呼び出し用。1 つでも失敗があれば RuntimeError
+    """
+    started = time.perf_counter()
+    results = asyncio.run(fetch_all(tasks, max_concurrency, per_endpoint_concurrency, on_done=on_done))
+    for r in results:
+        logger.info(
+            f"[{r.task.fetcher.name}] end={r.task.interval_end_iso} rows={r.rows} "
+            f"elapsed={r.elapsed_s:.2f}s{' FAILED' if r.error else ''}"
+        )
+    logger.info(f"fetched {len(results)} tasks in {time.perf_counter() - started:.2f}s")
+
+    failed = [r for r in results if r.error is not None]
+    if failed:
+        raise RuntimeError(
+            "fetch failed: " + ", ".join(f"{r.task.fetcher.name}@{r.task.interval_end_iso}" for r in failed)
+        )
@@ -0,0 +1,177 @@
+"""
+現在の 1 時間分の poolHourDatas を数分毎に取得し直し、内容が変わった行だけを下流に流すポーリングモード
+
+poolHourData は時間の途中でも随時更新されるため、確定した 1 時間を待たずに数分遅れで異常を検知できる。
+行（プール × 時間）毎に直近に流した内容のハッシュを保持し、変化した行・新しい行だけを emit に渡す。
+
+- 時間が切り替わった直後の 1 回（interval_s 以内）は直前の 1 時間も取得し、確定値の変化も流す
+- 変化の履歴はプロセス内にのみ保持するため、再起動直後の 1 回は全行を流す（at-least-once）
+
+流した行は RAW テーブル（1 時間 1 行）には書かず、live/ 以下や専用テーブルに出力する（writer_emitter）。
+refresh を渡すと各回の前に呼び、新しいフェッチャーが返れば差し替える（protocols.yml の再読み込みなど）。
+"""
+
+import hashlib
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from .base import BaseFetcher
+from .serde import GraphQLError, Serde, get_serde
+from .types import PoolHourData
+
+logger = logging.getLogger(__name__)
+
+Emit = Callable[[List[PoolHourData]], None]
+
+
+class ChangeTracker:
+    """poolHourData の id（プール × 時間）毎に、直近に流した行の内容ハッシュを保持する"""
+
+    def __init__(self, serde: Optional[Serde] = None):
+        self.serde = serde or get_serde()
+        self._digests: Dict[str, Tuple[int, bytes]] = {}
+        self._staged: Dict[str, Tuple[int, bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def changed(self, records: Iterable[PoolHourData]) -> List[PoolHourData]:
+        """前回から内容が変わった行（初出の行を含む）を返す（ハッシュは commit で反映）"""
+        records = list(records)
+        # ページ分をまとめてエンコードし、1 行ずつハッシュする
+        lines = self.serde.encode_rows(records).split(b"\n")[:-1]
+        changed: List[PoolHourData] = []
+        for rec, line in zip(records, lines):
+            digest = hashlib.blake2b(line, digest_size=16).digest()
+            prev = self._digests.get(rec["id"])
+            if prev is None or prev[1] != digest:
+                self._staged[rec["id"]] = (rec["periodStartUnix"], digest)
+                changed.append(rec)
+        return changed
+
+    def commit(self) -> None:
+        """changed で返した行を流し終えたら呼ぶ（呼ばなければ次回も変化として扱う）"""
+        self._digests.update(self._staged)
+        self._staged = {}
+
+    def discard(self) -> None:
+        """commit されなかった変化を破棄する"""
+        self._staged = {}
+
+    def forget_before(self, start: int) -> None:
+        """取得対象から外れた時間の行を削除する"""
+        self._digests = {k: v for k, v in self._digests.items() if v[0] >= start}
+
+
+class HourPoller:
+    """
+    poller = HourPoller(fetcher, emit, interval_s=300)
+    poller.run()  # max_polls を指定しなければ停止されるまで続ける
+    """
+
+    def __init__(
+        self,
+        fetcher: BaseFetcher,
+        emit: Emit,
+        interval_s: float = 300.0,
+        tracker: Optional[ChangeTracker] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        refresh: Optional[Callable[[], Optional[BaseFetcher]]] = None,
+    ):
+        self.fetcher = fetcher
+        self.emit = emit
+        self.interval_s = interval_s
+        self.tracker = tracker or ChangeTracker(fetcher.serde)
+        self._clock = clock
+        self._sleep = sleep
+        self._refresh = refresh
+        self.metrics: Counter = Counter()
+
+    def window(self, now: float) -> Tuple[int, int]:
+        """取得する [start, end)（UTC 秒）。時間が切り替わった直後は直前の 1 時間を含める"""
+        hour = int(now) // 3600 * 3600
+        start = hour - 3600 if now - hour < self.interval_s else hour
+        return start, hour + 3600
+
+    def poll_once(self) -> List[PoolHourData]:
+        """1 回取得し、変化した行を emit に渡して返す"""
+        start, end = self.window(self._clock())
+        self.tracker.discard()
+        self.tracker.forget_before(start)
+        end_iso = datetime.fromtimestamp(end, tz=timezone.utc).isoformat()
+        rows = 0
+        changed: List[PoolHourData] = []
+        for page in self.fetcher.iter_pages(end_iso, (end - start) // 3600):
+            rows += len(page)
+            changed += self.tracker.changed(page)
+        if changed:
+            self.emit(changed)
+        self.tracker.commit()
+        self.metrics["polls"] += 1
+        self.metrics["rows"] += rows
+        self.metrics["emitted"] += len(changed)
+        logger.info(f"[{self.fetcher.name}] polled {rows} rows, {len(changed)} changed")
+        return changed
+
+    def refresh(self) -> None:
+        """refresh が新しいフェッチャーを返したら差し替える（失敗時は今のフェッチャーを使い続ける）"""
+        if self._refresh is None:
+            return
+        try:
+            fetcher = self._refresh()
+        except Exception:
+            logger.exception(f"[{self.fetcher.name}] failed to refresh fetcher - keeping the current one")
+            return
+        if fetcher is not None and fetcher is not self.fetcher:
+            # 変化の履歴は行の id 単位なので、差し替えても引き継ぐ
+            self.fetcher.close()
+            self.fetcher = fetcher
+            self.metrics["reloads"] += 1
+            logger.info(f"[{fetcher.name}] switched to a rebuilt fetcher")
+
+    def run(self, max_polls: Optional[int] = None) -> None:
+        """interval_s 毎に poll_once を繰り返す（取得・書き出しの失敗は次の回に持ち越す）"""
+        next_at = self._clock()
+        attempts = 0
+        while True:
+            self.refresh()
+            try:
+                self.poll_once()
+            except (httpx.HTTPError, GraphQLError) as e:
+                self.metrics["failures"] += 1
+                logger.warning(f"[{self.fetcher.name}] poll failed: {e}")
+            except Exception:
+                # 書き出し先の障害でもプロセスは止めず、変化した行は次回まとめて流す
+                self.metrics["failures"] += 1
+                logger.exception(f"[{self.fetcher.name}] failed to emit changed rows")
+            attempts += 1
+            if max_polls is not None and attempts >= max_polls:
+                return
+            next_at += self.interval_s
+            self._sleep(max(0.0, next_at - self._clock()))
+
+
+def writer_emitter(
+    fetcher: BaseFetcher, path_template: str, clock: Callable[[], float] = time.time, **sink_options: Any
+) -> Emit:
+    """
+    ポーリング毎にライターを開いて変化した行を書き出す emit
+
+    path_template には {protocol}, {date}, {poll_ts} を使える
+    （例: gs://bucket/live/{protocol}/{date}/{poll_ts}.jsonl.gz、bq://project.dataset.table）
+    """
+
+    def emit(rows: List[PoolHourData]) -> None:
+        now = datetime.fromtimestamp(clock(), tz=timezone.utc)
+        path = path_template.format(
+            protocol=fetcher.name, date=now.date().isoformat(), poll_ts=now.strftime("%Y%m%dT%H%M%SZ")
+        )
+        fetcher.save_pages([rows], path, **sink_options)
+
+    return emit
@@ -0,0 +1,148 @@
+"""
+poolHourDatas の取得フィールドを宣言し、GraphQL クエリを組み立てる
+
+フィールドは "pool.token0.id" のようなドット区切りのパスで宣言する。プロファイル:
+
+- full: queries/*.gql と同じ全フィールド
+- minimal: dbt の pool_hourly_base と BigQuery の stg_pool_hourly_all が参照するフィールドのみ
+
+minimal ではトークンの symbol/name/decimals と feeTier を行毎に取得しない。これらは
+pools(where: {id_in: [...]}) でプール毎に 1 度だけ取得し、行の pool に差し込む。
+"""
+
+from typing import Dict, List, Sequence, Tuple, Union
+
+FULL_FIELDS: Tuple[str, ...] = (
+    "id",
+    "periodStartUnix",
+    "pool.id",
+    "pool.token0.id",
+    "pool.token0.symbol",
+    "pool.token0.name",
+    "pool.token0.decimals",
+    "pool.token1.id",
+    "pool.token1.symbol",
+    "pool.token1.name",
+    "pool.token1.decimals",
+    "pool.feeTier",
+    "liquidity",
+    "sqrtPrice",
+    "token0Price",
+    "token1Price",
+    "tick",
+    "feeGrowthGlobal0X128",
+    "feeGrowthGlobal1X128",
+    "tvlUSD",
+    "volumeToken0",
+    "volumeToken1",
+    "volumeUSD",
+    "feesUSD",
+    "txCount",
+    "open",
+    "high",
+    "low",
+    "close",
+)
+
+MINIMAL_FIELDS: Tuple[str, ...] = (
+    "id",
+    "periodStartUnix",
+    "pool.id",
+    "pool.token0.id",
+    "pool.token1.id",
+    "liquidity",
+    "tvlUSD",
+    "volumeUSD",
+    "txCount",
+    "open",
+    "high",
+    "low",
+    "close",
+)
+
+FIELD_PROFILES: Dict[str, Tuple[str, ...]] = {"full": FULL_FIELDS, "minimal": MINIMAL_FIELDS}
+
+# ページング・出力に必須のフィールド
+REQUIRED_FIELDS: Tuple[str, ...] = ("id", "periodStartUnix", "pool.id")
+
+# pools クエリで取得するプール情報（PoolInfo と同じ形）
+POOL_METADATA_FIELDS: Tuple[str, ...] = tuple(f[len("pool.") :] for f in FULL_FIELDS if f.startswith("pool."))
+
+# The Graph の first 上限。id_in もこの件数ずつに分割する
+MAX_POOLS_PER_QUERY = 1000
+
+FieldSpec = Union[str, Sequence[str]]
+
+
+def resolve_fields(spec: FieldSpec) -> Tuple[str, ...]:
+    """プロファイル名またはフィールドのリストを検証済みのフィールドのタプルにする"""
+    if isinstance(spec, str):
+        if spec not in FIELD_PROFILES:
+            raise ValueError(f"Unknown field profile: {spec}")
+        return FIELD_PROFILES[spec]
+    fields = tuple(dict.fromkeys(spec))
+    unknown = [f for f in fields if f not in FULL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown poolHourData fields: {unknown}")
+    missing = [f for f in REQUIRED_FIELDS if f not in fields]
+    if missing:
+        raise ValueError(f"Required poolHourData fields missing: {missing}")
+    return fields
+
+
+def needs_pool_metadata(fields: Sequence[str]) -> bool:
+    """行のクエリでプール情報の一部を省いている場合 True"""
+    return any(f"pool.{f}" not in fields for f in POOL_METADATA_FIELDS)
+
+
+def selection_set(fields: Sequence[str], indent: int = 2) -> str:
+    """ドット区切りのパスから入れ子の選択セットを組み立てる（宣言順を維持）"""
+    tree: Dict[str, Dict] = {}
+    for path in fields:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+
+    def _render(node: Dict[str, Dict], depth: int) -> List[str]:
+        pad = " " * (indent * depth)
+        lines: List[str] = []
+        for name, children in node.items():
+            if children:
+                lines += [f"{pad}{name} {{", *_render(children, depth + 1), f"{pad}}}"]
+            else:
+                lines.append(f"{pad}{name}")
+        return lines
+
+    return "\n".join(_render(tree, 2))
+
+
+def build_pool_hour_query(fields: Sequence[str]) -> str:
+    """queries/*.gql と同じ引数・ページング条件で、選択フィールドだけを変えたクエリ"""
+    return f"""query PoolHourDatas(
+  $startTime: Int!
+  $endTime: Int!
+  $first: Int!
+  $skip: Int!
+  $lastId: String!
+) {{
+  poolHourDatas(
+    first: $first
+    skip: $skip
+    where: {{ periodStartUnix_gte: $startTime, periodStartUnix_lt: $endTime, id_gt: $lastId }}
+    orderBy: id
+    orderDirection: asc
+  ) {{
+{selection_set(fields)}
+  }}
+}}
+"""
+
+
+def build_pools_query(fields: Sequence[str] = POOL_METADATA_FIELDS) -> str:
+    """id を指定してプール情報をまとめて取得するクエリ（$ids は最大 MAX_POOLS_PER_QUERY 件）"""
+    return f"""query Pools($ids: [String!]!) {{
+  pools(first: {MAX_POOLS_PER_QUERY}, where: {{ id_in: $ids }}) {{
+{selection_set(fields)}
+  }}
+}}
+"""
@@ -0,0 +1,190 @@
+"""
+poolHourData のコンパクトなメモリ内表現
+
+The Graph のレスポンス（PoolHourData TypedDict）は数値がすべて文字列で、トークンの
+symbol/name/decimals が行毎に繰り返される。大量の行を保持する処理（バックフィルの Parquet
+バッファなど）では、数値を一度だけパースした __slots__ レコードに変換し、プール／トークン
+情報は MetadataTable に id をキーとして 1 つだけ保持する。
+
+- uint128/uint160/uint256 (liquidity, sqrtPrice, feeGrowthGlobal*X128) と int 系は Python int で損失なし
+- BigDecimal 系（価格・USD 建て）は float
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .types import PoolHourData, PoolInfo, TokenInfo
+
+# (GraphQL フィールド名, 属性名, 型)
+NUMERIC_FIELDS: Tuple[Tuple[str, str, type], ...] = (
+    ("liquidity", "liquidity", int),
+    ("sqrtPrice", "sqrt_price", int),
+    ("token0Price", "token0_price", float),
+    ("token1Price", "token1_price", float),
+    ("tick", "tick", int),
+    ("feeGrowthGlobal0X128", "fee_growth_global0_x128", int),
+    ("feeGrowthGlobal1X128", "fee_growth_global1_x128", int),
+    ("tvlUSD", "tvl_usd", float),
+    ("volumeToken0", "volume_token0", float),
+    ("volumeToken1", "volume_token1", float),
+    ("volumeUSD", "volume_usd", float),
+    ("feesUSD", "fees_usd", float),
+    ("txCount", "tx_count", int),
+    ("open", "open", float),
+    ("high", "high", float),
+    ("low", "low", float),
+    ("close", "close", float),
+)
+
+
+def _parse(value: Any, kind: type) -> Any:
+    if value is None:
+        return None
+    if kind is int:
+        # "123" のほか、BigDecimal 表記の "123.0" 等も許容
+        return int(value) if not isinstance(value, str) or value.lstrip("-").isdigit() else int(float(value))
+    return float(value)
+
+
+def _format(value: Any) -> Optional[str]:
+    # The Graph と同じく数値は文字列で返す（int は損失なし、float は repr で往復一致）
+    return None if value is None else str(value) if isinstance(value, int) else repr(value)
+
+
+@dataclass(frozen=True, slots=True)
+class TokenMeta:
+    id: str
+    symbol: Optional[str]
+    name: Optional[str]
+    decimals: Optional[int]
+
+    def to_raw(self) -> TokenInfo:
+        return {"id": self.id, "symbol": self.symbol, "name": self.name, "decimals": _format(self.decimals)}
+
+
+@dataclass(frozen=True, slots=True)
+class PoolMeta:
+    id: str
+    token0: Optional[TokenMeta]
+    token1: Optional[TokenMeta]
+    fee_tier: Optional[int]
+
+    def to_raw(self) -> PoolInfo:
+        raw: Dict[str, Any] = {"id": self.id}
+        if self.token0 is not None:
+            raw["token0"] = self.token0.to_raw()
+        if self.token1 is not None:
+            raw["token1"] = self.token1.to_raw()
+        if self.fee_tier is not None:
+            raw["feeTier"] = _format(self.fee_tier)
+        return raw
+
+
+class MetadataTable:
+    """
+    プール／トークン情報を id で 1 つだけ保持するサイドテーブル
+    """
+
+    def __init__(self) -> None:
+        self.pools: Dict[str, PoolMeta] = {}
+        self.tokens: Dict[str, TokenMeta] = {}
+
+    def token(self, raw: Optional[Dict[str, Any]]) -> Optional[TokenMeta]:
+        if not raw:
+            return None
+        cached = self.tokens.get(raw["id"])
+        # id だけの参照（フィールド射影時など）は既知の情報を使う
+        if cached is not None and len(raw) == 1:
+            return cached
+        meta = TokenMeta(
+            id=sys.intern(raw["id"]),
+            symbol=raw.get("symbol"),
+            name=raw.get("name"),
+            decimals=_parse(raw.get("decimals"), int),
+        )
+        if meta == cached:
+            return cached
+        self.tokens[meta.id] = meta
+        return meta
+
+    def pool(self, raw: Dict[str, Any]) -> PoolMeta:
+        cached = self.pools.get(raw["id"])
+        if cached is not None and len(raw) == 1:
+            return cached
+        meta = PoolMeta(
+            id=sys.intern(raw["id"]),
+            token0=self.token(raw.get("token0")),
+            token1=self.token(raw.get("token1")),
+            fee_tier=_parse(raw.get("feeTier"), int),
+        )
+        if meta == cached:
+            return cached
+        self.pools[meta.id] = meta
+        return meta
+
+
+@dataclass(slots=True)
+class PoolHourRecord:
+    """
+    poolHourData 1 行。数値はパース済み、プール情報は MetadataTable の共有インスタンスを参照
+    """
+
+    id: str
+    period_start_unix: int
+    pool: PoolMeta
+    liquidity: Optional[int] = None
+    sqrt_price: Optional[int] = None
+    token0_price: Optional[float] = None
+    token1_price: Optional[float] = None
+    tick: Optional[int] = None
+    fee_growth_global0_x128: Optional[int] = None
+    fee_growth_global1_x128: Optional[int] = None
+    tvl_usd: Optional[float] = None
+    volume_token0: Optional[float] = None
+    volume_token1: Optional[float] = None
+    volume_usd: Optional[float] = None
+    fees_usd: Optional[float] = None
+    tx_count: Optional[int] = None
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+
+    @classmethod
+    def from_raw(cls, rec: PoolHourData, table: MetadataTable) -> "PoolHourRecord":
+        out = cls(rec["id"], int(rec["periodStartUnix"]), table.pool(rec["pool"]))
+        for key, attr, kind in NUMERIC_FIELDS:
+            if key in rec:
+                setattr(out, attr, _parse(rec[key], kind))
+        return out
+
+    def to_raw(self) -> PoolHourData:
+        """The Graph と同じ形の dict に戻す（出力時の非正規化用）"""
+        raw: Dict[str, Any] = {"id": self.id, "periodStartUnix": self.period_start_unix, "pool": self.pool.to_raw()}
+        for key, attr, _ in NUMERIC_FIELDS:
+            value = getattr(self, attr)
+            if value is not None:
+                raw[key] = _format(value)
+        return raw
+
+
+class RecordBatch:
+    """PoolHourRecord の列と、それらが参照する MetadataTable"""
+
+    def __init__(self, table: Optional[MetadataTable] = None) -> None:
+        self.table = table or MetadataTable()
+        self.records: List[PoolHourRecord] = []
+
+    def extend(self, page: Iterable[PoolHourData]) -> None:
+        self.records.extend(PoolHourRecord.from_raw(rec, self.table) for rec in page)
+
+    def clear(self) -> None:
+        # メタデータは次のバッチでも再利用する
+        self.records = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[PoolHourRecord]:
+        return iter(self.records)
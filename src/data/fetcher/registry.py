@@ -0,0 +1,115 @@
+"""
+protocols.yml のエントリからフェッチャーを組み立てるレジストリ
+
+protocols.yml のトップレベルのキーがそのままプロトコル名になる。チェーン・サブグラフを追加する場合は
+エントリ（と必要なら queries/ のクエリファイル）を追加するだけでよく、モジュールの追加は不要:
+
+    base_uniswap:
+      api_key: ${THE_GRAPH_API_KEY}
+      subgraph_id: ${THE_GRAPH_BASE_UNISWAP_SUBGRAPH_ID}
+      endpoint_template: "https://gateway.thegraph.com/api/{api_key}/subgraphs/id/{subgraph_id}"
+      page_size: 1000
+      dex_protocol: uniswap_v3_base
+      rate_group: the_graph_gateway
+
+設定だけでは表現できないプロトコルは register() でビルダーを登録すると、同名のエントリより優先される。
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .base import BaseFetcher
+from .config import ConfigError, load_protocol_config, protocol_config_cache
+from .metadata_cache import PoolMetadataCache, default_metadata_cache
+from .projection import FULL_FIELDS, build_pool_hour_query, resolve_fields
+from .retry import RetryPolicy
+from .types import ProtocolConfig, ProtocolName
+
+QUERIES_DIR = Path(__file__).parent / "queries"
+
+FetcherBuilder = Callable[[], BaseFetcher]
+
+
+@lru_cache(maxsize=None)
+def read_query(query_file: str) -> str:
+    """queries/ 以下のクエリファイルを読む（プロセス内でキャッシュ）"""
+    path = QUERIES_DIR / query_file
+    if not path.is_file():
+        raise ConfigError(f"query file not found: {path}")
+    return path.read_text(encoding="utf-8")
+
+
+def build_fetcher_from_config(
+    name: ProtocolName, cfg: ProtocolConfig, metadata_cache: Optional[PoolMetadataCache] = None
+) -> BaseFetcher:
+    """protocols.yml の 1 エントリ（環境変数は展開済み）からフェッチャーを組み立てる"""
+    endpoint = cfg["endpoint_template"].format(api_key=cfg["api_key"], subgraph_id=cfg["subgraph_id"])
+    headers = {k: v.format(api_key=cfg["api_key"]) for k, v in cfg.get("headers", {}).items()}
+    fields = resolve_fields(cfg.get("fields", "full"))
+    # 全フィールドかつクエリファイルの指定があればそのまま使い、それ以外は選択フィールドからクエリを組み立てる
+    if fields == FULL_FIELDS and "query_file" in cfg:
+        query = read_query(cfg["query_file"])
+    else:
+        query = build_pool_hour_query(fields)
+    return BaseFetcher(
+        name,
+        endpoint,
+        query,
+        cfg["page_size"],
+        headers,
+        pagination=cfg.get("pagination", "skip"),
+        pool_size=cfg.get("pool_size", 10),
+        http2=cfg.get("http2", True),
+        retry=RetryPolicy(max_attempts=cfg.get("max_retries", 6)),
+        min_page_size=cfg.get("min_page_size"),
+        fields=fields,
+        metadata_cache=metadata_cache,
+        dex_protocol=cfg.get("dex_protocol"),
+        rate_group=cfg.get("rate_group"),
+        requests_per_s=cfg.get("requests_per_s"),
+    )
+
+
+def configured_protocols() -> List[ProtocolName]:
+    """protocols.yml のプロトコル名（環境変数は展開しない）"""
+    return protocol_config_cache().names()
+
+
+class FetcherRegistry:
+    """
+    プロトコル名 → フェッチャーのビルダー
+
+    register() で登録したビルダーがなければ protocols.yml のエントリから組み立てる。
+    """
+
+    def __init__(self) -> None:
+        self._builders: Dict[ProtocolName, FetcherBuilder] = {}
+
+    def register(self, name: ProtocolName, builder: FetcherBuilder) -> None:
+        self._builders[name] = builder
+
+    def names(self) -> List[ProtocolName]:
+        """登録済みのビルダーと protocols.yml のエントリの名前（protocols.yml の順）"""
+        from_config = configured_protocols()
+        return from_config + [n for n in self._builders if n not in from_config]
+
+    def build(self, name: ProtocolName) -> BaseFetcher:
+        if name in self._builders:
+            return self._builders[name]()
+        cfg = load_protocol_config(name)[name]
+        return build_fetcher_from_config(name, cfg, default_metadata_cache())
+
+
+registry = FetcherRegistry()
+
+
+def build_fetcher(protocol: ProtocolName) -> BaseFetcher:
+    """
+    Build a fetcher for the given protocol.
+    """
+    return registry.build(protocol)
+
+
+def available_protocols() -> List[ProtocolName]:
+    return registry.names()
@@ -0,0 +1,159 @@
+"""
+The Graph 向けのリトライ制御とページサイズの自動調整
+
+- 429/5xx・タイムアウト・接続エラーはジッター付き指数バックオフでリトライ（Retry-After があれば優先）
+- ゲートウェイのタイムアウトやクエリ複雑度エラーではページサイズを半減し、速いページが続けば戻す
+- 判断はすべて FetchController.metrics に集計し、ログにも出力する
+"""
+
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from .serde import GraphQLError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+# ゲートウェイ／インデクサ側でクエリが打ち切られたことを示すステータス・メッセージ
+_SHRINK_STATUS = frozenset({504})
+_SHRINK_MESSAGES = ("timeout", "timed out", "complexity", "too expensive", "too large")
+# インデクサの一時的な不調（ページサイズとは無関係）
+_TRANSIENT_MESSAGES = ("bad indexers", "unavailable")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    max_attempts: 1 ページあたりの最大試行回数（初回を含む）
+    base_delay / max_delay: バックオフの基準値と上限（秒）
+    max_retry_after: これより長い Retry-After は待たずに失敗させる（秒）
+    """
+
+    max_attempts: int = 6
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    max_retry_after: float = 120.0
+
+    def backoff(self, attempt: int) -> float:
+        """attempt 回目の失敗後の待ち時間（full jitter）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After ヘッダ（秒数または HTTP-date）を秒に変換"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(exc: BaseException) -> Tuple[Optional[str], bool, Optional[float]]:
+    """
+    例外を (リトライ理由, ページサイズを縮小するか, Retry-After 秒) に分類する。
+    リトライしない例外は理由が None
+    """
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout", True, None
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status not in RETRYABLE_STATUS:
+            return None, False, None
+        return f"http_{status}", status in _SHRINK_STATUS, parse_retry_after(exc.response.headers.get("Retry-After"))
+    if isinstance(exc, httpx.TransportError):
+        return "transport", False, None
+    if isinstance(exc, GraphQLError):
+        message = str(exc).lower()
+        if any(m in message for m in _SHRINK_MESSAGES):
+            return "graphql_limit", True, None
+        if any(m in message for m in _TRANSIENT_MESSAGES):
+            return "graphql_transient", False, None
+    return None, False, None
+
+
+class FetchController:
+    """
+    1 フェッチャー（エンドポイント）分のリトライ判断とページサイズ
+
+    page_size は設定値を上限に、失敗時は半減（min_page_size まで）、
+    fast_page_s 未満のページが grow_after 回続くと 1.5 倍に戻す。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        page_size: int,
+        policy: Optional[RetryPolicy] = None,
+        min_page_size: Optional[int] = None,
+        fast_page_s: float = 2.0,
+        grow_after: int = 3,
+    ):
+        self.name = name
+        self.policy = policy or RetryPolicy()
+        self.max_page_size = page_size
+        self.min_page_size = min(min_page_size or 100, page_size)
+        self.page_size = page_size
+        self.fast_page_s = fast_page_s
+        self.grow_after = grow_after
+        self.metrics: Counter[str] = Counter()
+        self._fast_streak = 0
+
+    def on_success(self, elapsed_s: float) -> None:
+        self.metrics["pages"] += 1
+        if elapsed_s >= self.fast_page_s:
+            self._fast_streak = 0
+            return
+        self._fast_streak += 1
+        if self._fast_streak >= self.grow_after and self.page_size < self.max_page_size:
+            self._fast_streak = 0
+            self._resize(min(self.max_page_size, int(self.page_size * 1.5)), "grow")
+
+    def on_error(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """
+        attempt 回目の試行が exc で失敗したときの待ち時間（秒）。リトライしない場合は None
+        """
+        reason, shrink, retry_after = classify(exc)
+        if reason is None:
+            return None
+        self.metrics[f"error.{reason}"] += 1
+        self._fast_streak = 0
+        if shrink and self.page_size > self.min_page_size:
+            self._resize(max(self.min_page_size, self.page_size // 2), "shrink")
+
+        if attempt >= self.policy.max_attempts or (retry_after or 0) > self.policy.max_retry_after:
+            self.metrics["gave_up"] += 1
+            logger.error(f"[{self.name}] giving up after {attempt} attempts ({reason}): {exc}")
+            return None
+
+        if retry_after is not None:
+            self.metrics["retry_after"] += 1
+            delay = retry_after
+        else:
+            delay = self.policy.backoff(attempt)
+        self.metrics["retries"] += 1
+        self.metrics["retry_wait_ms"] += int(delay * 1000)
+        logger.warning(
+            f"[{self.name}] {reason} (attempt {attempt}/{self.policy.max_attempts}), "
+            f"retry in {delay:.2f}s page_size={self.page_size}"
+        )
+        return delay
+
+    def _resize(self, size: int, direction: str) -> None:
+        logger.info(f"[{self.name}] page_size {direction} {self.page_size} -> {size}")
+        self.metrics[f"page_size.{direction}"] += 1
+        self.page_size = size
+
+    def snapshot(self) -> Dict[str, Any]:
+        """ログ出力用のメトリクス"""
+        return {"page_size": self.page_size, **self.metrics}
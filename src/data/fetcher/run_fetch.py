@@ -1,29 +1,64 @@
 import logging
 from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
 
-from .sushiswap import build_sushiswap_fetcher
+from .orchestrator import FetchTask, run_tasks
+from .registry import available_protocols, build_fetcher
 from .types import ProtocolName
-from .uniswap import build_uniswap_fetcher
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-def fetch_pool_data(protocol: ProtocolName, output_path: str, data_interval_end: str) -> None:
+__all__ = ["build_fetcher", "fetch_pool_data", "fetch_pool_data_many"]
+
+
+def fetch_pool_data(protocol: ProtocolName, output_path: str, data_interval_end: str, hours: int = 1) -> None:
     """
     Common entry point called from Airflow's PythonOperator
     """
-    logging.info(f"START fetch_pool_data: protocol={protocol}, interval_end={data_interval_end}, output={output_path}")
-
-    if protocol == "uniswap":
-        fetcher = build_uniswap_fetcher()
-    elif protocol == "sushiswap":
-        fetcher = build_sushiswap_fetcher()
-    else:
-        raise ValueError(f"Unknown protocol: {protocol}")
-    fetcher.run(output_path, data_interval_end)
+    logging.info(
+        f"START fetch_pool_data: protocol={protocol}, interval_end={data_interval_end}, hours={hours}, "
+        f"output={output_path}"
+    )
+
+    with build_fetcher(protocol) as fetcher:
+        fetcher.run(output_path, data_interval_end, hours)
     logging.info(f"END   fetch_pool_data: protocol={protocol}")
 
 
+def fetch_pool_data_many(
+    protocols: Optional[Sequence[ProtocolName]],
+    data_interval_ends: Sequence[str],
+    output_dir: str,
+    max_concurrency: int = 8,
+    per_endpoint_concurrency: int = 4,
+) -> list[str]:
+    """
+    Fetch every protocol × interval concurrently and return the written paths.
+
+    Output layout: {output_dir}/{protocol}/{interval_end_iso}.jsonl
+    `protocols=None` fetches every protocol in protocols.yml.
+    """
+    protocols = list(protocols) if protocols is not None else available_protocols()
+    logging.info(f"START fetch_pool_data_many: protocols={list(protocols)}, intervals={len(data_interval_ends)}")
+
+    # fetcher はプロトコル毎に 1 つだけ作り、ウィンドウ間で共有
+    fetchers = {p: build_fetcher(p) for p in protocols}
+    tasks = [
+        FetchTask(fetchers[p], end, str(Path(output_dir) / p / f"{end}.jsonl"))
+        for p in protocols
+        for end in data_interval_ends
+    ]
+    try:
+        run_tasks(tasks, max_concurrency, per_endpoint_concurrency)
+    finally:
+        for fetcher in fetchers.values():
+            fetcher.close()
+    logging.info("END   fetch_pool_data_many")
+    return [t.output_path for t in tasks]
+
+
 if __name__ == "__main__":
     """
     Local execution example
@@ -32,10 +67,5 @@ if __name__ == "__main__":
 
     dt_end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0).isoformat()
 
-    # Uniswap
-    run = build_uniswap_fetcher()
-    run.run(f"./data/raw/{dt_end[:10]}_uni.jsonl", dt_end)
-
-    # SushiSwap
-    run = build_sushiswap_fetcher()
-    run.run(f"./data/raw/{dt_end[:10]}_sushi.jsonl", dt_end)
+    # protocols.yml の全プロトコルを並行取得
+    fetch_pool_data_many(None, [dt_end], "./data/raw")
@@ -0,0 +1,137 @@
+"""
+フェッチャーのホットループで使う JSON エンコード／デコード層
+
+msgspec → orjson → 標準ライブラリ json の順に、インストールされているものを自動選択する。
+FETCHER_JSON_BACKEND=msgspec|orjson|stdlib で明示指定も可能。
+"""
+
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypedDict
+
+from .types import PoolHourData
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_ENV = "FETCHER_JSON_BACKEND"
+
+
+class GraphQLError(RuntimeError):
+    """GraphQL レスポンスの errors"""
+
+    def __init__(self, errors: List[Any]):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class Serde:
+    """
+    decode_data: GraphQL レスポンスボディ → data（errors があれば GraphQLError）。フィールドを射影したクエリ用
+    decode_page: 全フィールドの poolHourDatas レスポンス → poolHourDatas（decode_page_typed があれば型検証付き）
+    encode_rows: 行の列 → NDJSON バイト列（各行末尾に改行）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        decode: Callable[[bytes], Dict[str, Any]],
+        encode_rows: Callable[[List[Dict[str, Any]]], bytes],
+        decode_page_typed: Optional[Callable[[bytes], Dict[str, Any]]] = None,
+    ):
+        self.name = name
+        self._decode = decode
+        self._decode_page = decode_page_typed or decode
+        self.encode_rows = encode_rows
+
+    @staticmethod
+    def _data(resp: Dict[str, Any]) -> Dict[str, Any]:
+        if resp.get("errors"):
+            raise GraphQLError(resp["errors"])
+        return resp["data"]
+
+    def decode_data(self, body: bytes) -> Dict[str, Any]:
+        return self._data(self._decode(body))
+
+    def decode_page(self, body: bytes) -> List[PoolHourData]:
+        return self._data(self._decode_page(body))["poolHourDatas"]
+
+    def __repr__(self) -> str:
+        return f"Serde({self.name})"
+
+
+def _stdlib() -> Serde:
+    def encode_rows(rows: List[Dict[str, Any]]) -> bytes:
+        return "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in rows).encode("utf-8")
+
+    return Serde("stdlib", json.loads, encode_rows)
+
+
+def _orjson() -> Serde:
+    import orjson
+
+    def encode_rows(rows: List[Dict[str, Any]]) -> bytes:
+        return b"".join(orjson.dumps(r, option=orjson.OPT_APPEND_NEWLINE) for r in rows)
+
+    return Serde("orjson", orjson.loads, encode_rows)
+
+
+def _msgspec() -> Serde:
+    import msgspec
+
+    class _Data(TypedDict):
+        poolHourDatas: List[PoolHourData]
+
+    class _Response(msgspec.Struct):
+        data: Optional[_Data] = None
+        errors: Optional[List[Any]] = None
+
+    # PoolHourData の TypedDict に対して型検証しながら直接デコード（中間の汎用 dict を作らない）
+    decoder = msgspec.json.Decoder(_Response)
+    encoder = msgspec.json.Encoder()
+
+    def decode_page(body: bytes) -> Dict[str, Any]:
+        try:
+            resp = decoder.decode(body)
+        except msgspec.ValidationError as e:
+            # 型が想定と異なる行（サブグラフのスキーマ差異など）があっても、ページは型検証なしで読む
+            logger.warning(f"poolHourDatas did not match PoolHourData ({e}) - decoding without validation")
+            return msgspec.json.decode(body)
+        return {"data": resp.data, "errors": resp.errors}
+
+    return Serde("msgspec", msgspec.json.decode, encoder.encode_lines, decode_page)
+
+
+_BACKENDS: Dict[str, Callable[[], Serde]] = {"msgspec": _msgspec, "orjson": _orjson, "stdlib": _stdlib}
+
+
+@lru_cache(maxsize=None)
+def get_serde(name: Optional[str] = None) -> Serde:
+    """
+    指定された（未指定なら環境変数または利用可能な最速の）バックエンドを返す
+    """
+    name = name or os.getenv(_BACKEND_ENV)
+    if name:
+        if name not in _BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {name}")
+        return _BACKENDS[name]()
+
+    for candidate, factory in _BACKENDS.items():
+        try:
+            serde = factory()
+        except ImportError:
+            continue
+        logger.debug(f"using JSON backend: {candidate}")
+        return serde
+    raise AssertionError("stdlib backend is always available")
+
+
+def available_backends() -> Iterable[str]:
+    """インストール済みのバックエンド名"""
+    for name, factory in _BACKENDS.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        yield name
@@ -0,0 +1,250 @@
+"""
+ライターの出力先（シンク）と圧縮
+
+- ローカルパス: `<output>.part` に書き、正常終了時のみリネーム
+- gs://bucket/name: 書き込まれたバイト列を part_size 毎に一時オブジェクトとして並列アップロードし、
+  正常終了時に compose で 1 オブジェクトにまとめる。取得と並行してアップロードが進むため、
+  ローカルディスク（Cloud Run の tmpfs）を使わず、取得完了からロード開始までの待ちも短い。
+  最終オブジェクトの作成は if_generation_match=0 で、既に存在すれば OutputExistsError
+
+圧縮は出力パスの末尾（.gz → gzip、.zst → zstd）で決まる。gzip/zstd とも 1 本のストリームを
+パートに分割しているだけなので、compose 後のオブジェクトはそのまま展開できる。
+"""
+
+import gzip
+import io
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Deque, List, Literal, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Compression = Literal["none", "gzip", "zstd"]
+
+_COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+# GCS compose の 1 回あたりのソース上限
+_COMPOSE_LIMIT = 32
+
+
+class OutputExistsError(FileExistsError):
+    """出力先オブジェクトが既に存在する（別の実行が先にアップロード済み）"""
+
+
+def split_compression(output_path: str) -> Tuple[str, Compression]:
+    """'x.jsonl.gz' → ('x.jsonl', 'gzip')"""
+    for suffix, compression in _COMPRESSION_SUFFIXES.items():
+        if output_path.endswith(suffix):
+            return output_path[: -len(suffix)], compression
+    return output_path, "none"
+
+
+def compression_suffix(compression: Compression) -> str:
+    if compression == "none":
+        return ""
+    for suffix, name in _COMPRESSION_SUFFIXES.items():
+        if name == compression:
+            return suffix
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+class _Compressed(io.RawIOBase):
+    """zstd の圧縮ストリーム（close しても下位ストリームは閉じない）"""
+
+    def __init__(self, raw: BinaryIO):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd 圧縮には zstandard が必要です (pip install zstandard)") from e
+        self._writer = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        return self._writer.write(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._writer.close()
+        super().close()
+
+
+def wrap_compression(raw: BinaryIO, compression: Compression) -> BinaryIO:
+    """raw に圧縮して書き込むストリームを返す（close で圧縮を終端するが raw は閉じない）"""
+    if compression == "none":
+        return raw
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    if compression == "zstd":
+        return _Compressed(raw)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+class LocalSink:
+    """`<output>.part` に書き、commit でリネームする"""
+
+    def __init__(self, output_path: str):
+        self.output_path = Path(output_path)
+        self._tmp_path = self.output_path.with_name(self.output_path.name + ".part")
+        self._f: Optional[BinaryIO] = None
+
+    def open(self) -> BinaryIO:
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self._tmp_path.open("wb")
+        return self._f
+
+    def commit(self) -> None:
+        self._f.close()
+        os.replace(self._tmp_path, self.output_path)
+
+    def abort(self) -> None:
+        self._f.close()
+        # 途中までのファイルを残すと不完全なデータがアップロードされ得るため削除
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class _PartStream(io.RawIOBase):
+    """GcsSink に渡すバッファ付きの書き込み口"""
+
+    def __init__(self, sink: "GcsSink"):
+        self._sink = sink
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        n = self._sink._append(b)
+        self._pos += n
+        return n
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class GcsSink:
+    """
+    gs://bucket/name へのストリーミングアップロード
+
+    part_size 毎に `{name}.parts-{uuid}/{index}` へ並列アップロードし（同時に最大 parallelism 件、
+    メモリ上のパートはそれ + 書き込み中の 1 つ）、commit で compose → 一時オブジェクトを削除する。
+    クラッシュで残った一時オブジェクトはバケットのライフサイクルルールで削除する想定。
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        part_size: int = 8 * 1024 * 1024,
+        parallelism: int = 4,
+        client: Any = None,
+        content_type: Optional[str] = None,
+    ):
+        if client is None:
+            from google.cloud import storage
+
+            client = storage.Client()
+        bucket_name, _, self.name = uri[len("gs://") :].partition("/")
+        self.uri = uri
+        self.bucket = client.bucket(bucket_name)
+        self.part_size = part_size
+        self.parallelism = parallelism
+        self.content_type = content_type
+        self.bytes_uploaded = 0
+        self._prefix = f"{self.name}.parts-{uuid.uuid4().hex}"
+        self._buf = bytearray()
+        self._parts: List[str] = []
+        self._inflight: Deque[Future] = deque()
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def open(self) -> BinaryIO:
+        self._pool = ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="gcs-part")
+        return _PartStream(self)
+
+    def _append(self, b: Any) -> int:
+        self._buf += b
+        while len(self._buf) >= self.part_size:
+            self._submit(bytes(self._buf[: self.part_size]))
+            del self._buf[: self.part_size]
+        return len(b)
+
+    def _submit(self, data: bytes) -> None:
+        # 並列数を超えたら最も古いパートの完了を待つ（メモリ使用量の上限）
+        while len(self._inflight) >= self.parallelism:
+            self._inflight.popleft().result()
+        name = f"{self._prefix}/{len(self._parts):05d}"
+        self._parts.append(name)
+        self._inflight.append(self._pool.submit(self._upload_part, name, data))
+
+    def _upload_part(self, name: str, data: bytes) -> None:
+        self.bucket.blob(name).upload_from_string(data, if_generation_match=0)
+        with self._lock:
+            self.bytes_uploaded += len(data)
+
+    def _wait(self) -> None:
+        while self._inflight:
+            self._inflight.popleft().result()
+
+    def _compose(self, sources: List[str]) -> List[str]:
+        """32 件を超える場合は中間オブジェクトに段階的にまとめ、最終 compose 用のソースを返す"""
+        temps: List[str] = []
+        level = 0
+        while len(sources) > _COMPOSE_LIMIT:
+            merged = []
+            for i in range(0, len(sources), _COMPOSE_LIMIT):
+                name = f"{self._prefix}/c{level}-{i // _COMPOSE_LIMIT:05d}"
+                chunk = [self.bucket.blob(s) for s in sources[i : i + _COMPOSE_LIMIT]]
+                self.bucket.blob(name).compose(chunk, if_generation_match=0)
+                merged.append(name)
+            temps += merged
+            sources = merged
+            level += 1
+        self._parts += temps
+        return sources
+
+    def _cleanup(self) -> None:
+        for name in self._parts:
+            try:
+                self.bucket.blob(name).delete()
+            except Exception as e:  # 一時オブジェクトの削除失敗はライフサイクルルールに任せる
+                logger.warning(f"failed to delete {name}: {e}")
+        self._parts = []
+
+    def commit(self) -> None:
+        from google.api_core.exceptions import PreconditionFailed
+
+        try:
+            if self._buf or not self._parts:
+                self._submit(bytes(self._buf))
+                self._buf.clear()
+            self._wait()
+            sources = self._compose(list(self._parts))
+            dest = self.bucket.blob(self.name)
+            if self.content_type:
+                dest.content_type = self.content_type
+            try:
+                dest.compose([self.bucket.blob(s) for s in sources], if_generation_match=0)
+            except PreconditionFailed as e:
+                raise OutputExistsError(self.uri) from e
+            logger.info(f"uploaded {self.uri} ({self.bytes_uploaded} bytes in {len(sources)} parts)")
+        finally:
+            self._pool.shutdown(wait=True)
+            self._cleanup()
+
+    def abort(self) -> None:
+        for f in self._inflight:
+            f.cancel()
+        self._pool.shutdown(wait=True)
+        self._cleanup()
+
+
+def open_sink(output_path: str, **gcs_kwargs: Any) -> Any:
+    """gs:// なら GcsSink、それ以外は LocalSink"""
+    if output_path.startswith("gs://"):
+        return GcsSink(output_path, **gcs_kwargs)
+    return LocalSink(output_path)
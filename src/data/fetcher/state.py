@@ -0,0 +1,236 @@
+"""
+増分取得の状態ストア
+
+プロトコル毎に「BigQuery へのロードまで完了した区間」と「アップロード済み・ロード未完了の区間」を
+periodStartUnix（UTC 秒）の半開区間 [start, end) で記録する。再実行・ジョブのリトライ時は
+完了済みの区間をネットワークに問い合わせずにスキップし、未取得の隙間だけを取得する。
+
+保存先はローカルディレクトリか gs://bucket/prefix（世代番号による楽観ロック付き）。
+同じストアにバッチロードのマニフェスト（LoadManifest）も保存できる（state_cls で指定）。
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Set, Tuple, Type, Union
+
+logger = logging.getLogger(__name__)
+
+Interval = Tuple[int, int]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """重なり・隣接する区間をまとめてソート済みで返す"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(start: int, end: int, covered: Iterable[Interval]) -> List[Interval]:
+    """[start, end) のうち covered に含まれない部分"""
+    gaps: List[Interval] = []
+    cur = start
+    for s, e in merge_intervals(covered):
+        if e <= cur or s >= end:
+            continue
+        if s > cur:
+            gaps.append((cur, s))
+        cur = max(cur, e)
+    if cur < end:
+        gaps.append((cur, end))
+    return gaps
+
+
+class FetchState:
+    """
+    done: ロードまで完了した区間（マージ済み）
+    pending: アップロード済み・ロード未完了の区間 → GCS URI
+    """
+
+    def __init__(
+        self,
+        protocol: str,
+        done: Optional[Iterable[Interval]] = None,
+        pending: Optional[Dict[Interval, str]] = None,
+    ):
+        self.protocol = protocol
+        self.done: List[Interval] = merge_intervals(done or [])
+        self.pending: Dict[Interval, str] = dict(pending or {})
+
+    @property
+    def high_water(self) -> Optional[int]:
+        """ロード済みの最新時刻（区間の終端）"""
+        return self.done[-1][1] if self.done else None
+
+    def gaps(self, start: int, end: int) -> List[Interval]:
+        """[start, end) のうち、ロード済みでもアップロード済みでもない区間"""
+        return subtract_intervals(start, end, [*self.done, *self.pending])
+
+    def mark_uploaded(self, interval: Interval, uri: str) -> None:
+        self.pending[interval] = uri
+
+    def mark_done(self, interval: Interval) -> None:
+        self.pending.pop(interval, None)
+        self.done = merge_intervals([*self.done, interval])
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "protocol": self.protocol,
+            "done": [list(i) for i in self.done],
+            "pending": [[s, e, uri] for (s, e), uri in sorted(self.pending.items())],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "FetchState":
+        return cls(
+            data["protocol"],
+            [(s, e) for s, e in data.get("done", [])],
+            {(s, e): uri for s, e, uri in data.get("pending", [])},
+        )
+
+
+class LoadManifest:
+    """
+    バッチロードのマニフェスト（プロトコル毎）
+
+    since: この時刻（UTC 秒）以降に作成されたオブジェクトだけをロード対象にする
+           （バッチロード導入前に直接ロード済みのオブジェクトを再ロードしない）
+    loaded: ロード済みの GCS URI
+    pending: 投入済み・完了を確認していないロードジョブの id → URI
+    """
+
+    def __init__(
+        self,
+        protocol: str,
+        since: Optional[float] = None,
+        loaded: Optional[Iterable[str]] = None,
+        pending: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.protocol = protocol
+        self.since = since
+        self.loaded: Set[str] = set(loaded or [])
+        self.pending: Dict[str, List[str]] = dict(pending or {})
+
+    def known(self) -> Set[str]:
+        """ロード済みまたはロード中の URI"""
+        return self.loaded.union(*self.pending.values())
+
+    def reserve(self, job_id: str, uris: List[str]) -> None:
+        self.pending[job_id] = list(uris)
+
+    def complete(self, job_id: str) -> None:
+        self.loaded.update(self.pending.pop(job_id))
+
+    def forget(self, uris: Iterable[str]) -> None:
+        """対象期間を過ぎた URI を削除する（マニフェストの肥大化を防ぐ）"""
+        self.loaded.difference_update(uris)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "protocol": self.protocol,
+            "since": self.since,
+            "loaded": sorted(self.loaded),
+            "pending": self.pending,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "LoadManifest":
+        return cls(data["protocol"], data.get("since"), data.get("loaded", []), data.get("pending", {}))
+
+
+State = Union[FetchState, LoadManifest]
+
+
+class StateStore(Protocol):
+    def load(self, protocol: str) -> Any: ...
+
+    def save(self, state: Any) -> None: ...
+
+
+class LocalStateStore:
+    """{root}/{protocol}.json に保存（一時ファイル経由のアトミックな置き換え）"""
+
+    def __init__(self, root: str, state_cls: Type[State] = FetchState):
+        self.root = Path(root)
+        self.state_cls = state_cls
+
+    def _path(self, protocol: str) -> Path:
+        return self.root / f"{protocol}.json"
+
+    def load(self, protocol: str) -> State:
+        path = self._path(protocol)
+        if not path.exists():
+            return self.state_cls(protocol)
+        return self.state_cls.from_json(json.loads(path.read_text("utf-8")))
+
+    def save(self, state: State) -> None:
+        path = self._path(state.protocol)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(state.to_json()), "utf-8")
+        os.replace(tmp, path)
+
+
+class GcsStateStore:
+    """
+    gs://{bucket}/{prefix}/{protocol}.json に保存
+
+    読み込んだ世代番号を if_generation_match に渡すため、同じプロトコルの状態を
+    並行実行のジョブが上書きし合うことはない（競合時は PreconditionFailed）。
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        project: Optional[str] = None,
+        client: Any = None,
+        state_cls: Type[State] = FetchState,
+    ):
+        if client is None:
+            from google.cloud import storage
+
+            client = storage.Client(project=project)
+        self.bucket = client.bucket(bucket)
+        self.prefix = prefix.strip("/")
+        self.state_cls = state_cls
+        self._generations: Dict[str, int] = {}
+
+    def _blob(self, protocol: str) -> Any:
+        name = f"{self.prefix}/{protocol}.json" if self.prefix else f"{protocol}.json"
+        return self.bucket.blob(name)
+
+    def load(self, protocol: str) -> State:
+        from google.api_core.exceptions import NotFound
+
+        blob = self._blob(protocol)
+        try:
+            body = blob.download_as_bytes()
+        except NotFound:
+            # 世代 0 = 「まだ存在しない」場合のみ作成を許可
+            self._generations[protocol] = 0
+            return self.state_cls(protocol)
+        self._generations[protocol] = blob.generation
+        return self.state_cls.from_json(json.loads(body))
+
+    def save(self, state: State) -> None:
+        blob = self._blob(state.protocol)
+        blob.upload_from_string(
+            json.dumps(state.to_json()),
+            content_type="application/json",
+            if_generation_match=self._generations.get(state.protocol, 0),
+        )
+        self._generations[state.protocol] = blob.generation
+
+
+def open_state_store(uri: str, project: Optional[str] = None, state_cls: Type[State] = FetchState) -> StateStore:
+    """gs://bucket/prefix なら GCS、それ以外はローカルディレクトリ"""
+    if uri.startswith("gs://"):
+        bucket, _, prefix = uri[len("gs://") :].partition("/")
+        return GcsStateStore(bucket, prefix, project=project, state_cls=state_cls)
+    return LocalStateStore(uri, state_cls)
@@ -0,0 +1,279 @@
+"""
+BigQuery Storage Write API で RAW テーブル（pool_hourly_{protocol}_v3）に直接書き込むライター
+
+fetch → GCS → ロードジョブを経由しないため、取得が終わった時点で行をクエリできる。
+JsonlWriter と同じインターフェース（with / write / rows）で、BaseFetcher.run("bq://project.dataset.table") でも使える。
+
+- mode="pending"（既定）: 行は pending ストリームに追記し、正常終了時に finalize → batch commit して
+  まとめて可視化する。途中で失敗した場合はコミットしないため、1 行も書き込まれない
+- mode="committed": 追記した行はすぐに可視化される（失敗時はそこまでの行が残る）
+
+どちらもリクエスト毎に offset を指定するため、リトライで同じ行を二重に書き込まない（ALREADY_EXISTS は成功扱い）。
+archive にライター（JsonlWriter など）を渡すと同じページを GCS にも書き出す。
+"""
+
+import logging
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Protocol, Tuple
+
+from .retry import RetryPolicy
+from .serde import Serde, get_serde
+from .types import PoolHourData
+
+logger = logging.getLogger(__name__)
+
+WriteMode = Literal["pending", "committed"]
+
+# AppendRows 1 リクエストの上限は 10 MB。行以外の分の余裕を残す
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+# RAW テーブルの列 → protobuf の型（JSON は文字列、TIMESTAMP は UNIX エポックからのマイクロ秒）
+RAW_ROW_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("raw", "string"),
+    ("pool_id", "string"),
+    ("dex_protocol", "string"),
+    ("hour_ts", "int64"),
+    ("load_ts", "int64"),
+)
+
+
+def raw_row_message() -> Tuple[Any, Any]:
+    """RAW テーブル 1 行分の protobuf メッセージクラスと DescriptorProto"""
+    from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+    types = {
+        "string": descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+        "int64": descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+    }
+    file_proto = descriptor_pb2.FileDescriptorProto(name="pool_hour_raw.proto", package="dex")
+    message = file_proto.message_type.add(name="PoolHourRawRow")
+    for number, (name, type_) in enumerate(RAW_ROW_FIELDS, start=1):
+        message.field.add(
+            name=name, number=number, type=types[type_], label=descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+        )
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+    return message_factory.GetMessageClass(pool.FindMessageTypeByName("dex.PoolHourRawRow")), message
+
+
+class WriteClient(Protocol):
+    """Storage Write API の操作（テストではインメモリの偽物に差し替える）"""
+
+    def create_stream(self, table: str, committed: bool) -> str: ...
+
+    def append(self, stream: str, rows: List[Dict[str, Any]], offset: int) -> Future: ...
+
+    def finalize(self, stream: str) -> int: ...
+
+    def commit(self, table: str, streams: List[str]) -> None: ...
+
+    def abort(self, stream: str) -> None: ...
+
+
+class BigQueryWriteClient:
+    """google-cloud-bigquery-storage による WriteClient の実装"""
+
+    def __init__(self, client: Any = None):
+        try:
+            from google.cloud import bigquery_storage_v1
+            from google.cloud.bigquery_storage_v1 import writer
+        except ImportError as e:
+            raise ImportError(
+                "Storage Write API には google-cloud-bigquery-storage が必要です "
+                "(pip install google-cloud-bigquery-storage)"
+            ) from e
+        self._types = bigquery_storage_v1.types
+        self._writer = writer
+        self._client = client or bigquery_storage_v1.BigQueryWriteClient()
+        self._row_cls, self._descriptor = raw_row_message()
+        self._streams: Dict[str, Any] = {}
+
+    def _table_path(self, table: str) -> str:
+        return self._client.table_path(*table.split("."))
+
+    def create_stream(self, table: str, committed: bool) -> str:
+        stream_type = self._types.WriteStream.Type.COMMITTED if committed else self._types.WriteStream.Type.PENDING
+        name = self._client.create_write_stream(
+            parent=self._table_path(table), write_stream=self._types.WriteStream(type_=stream_type)
+        ).name
+        # スキーマは接続毎に 1 度だけ送る（以降のリクエストは行だけ）
+        template = self._types.AppendRowsRequest(
+            write_stream=name,
+            proto_rows=self._types.AppendRowsRequest.ProtoData(
+                writer_schema=self._types.ProtoSchema(proto_descriptor=self._descriptor)
+            ),
+        )
+        self._streams[name] = self._writer.AppendRowsStream(self._client, template)
+        return name
+
+    def append(self, stream: str, rows: List[Dict[str, Any]], offset: int) -> Future:
+        serialized = [self._row_cls(**row).SerializeToString() for row in rows]
+        request = self._types.AppendRowsRequest(
+            offset=offset,
+            proto_rows=self._types.AppendRowsRequest.ProtoData(rows=self._types.ProtoRows(serialized_rows=serialized)),
+        )
+        return self._streams[stream].send(request)
+
+    def finalize(self, stream: str) -> int:
+        self._streams.pop(stream).close()
+        return self._client.finalize_write_stream(name=stream).row_count
+
+    def commit(self, table: str, streams: List[str]) -> None:
+        resp = self._client.batch_commit_write_streams(
+            self._types.BatchCommitWriteStreamsRequest(parent=self._table_path(table), write_streams=streams)
+        )
+        if resp.stream_errors:
+            raise RuntimeError(f"failed to commit write streams: {list(resp.stream_errors)}")
+
+    def abort(self, stream: str) -> None:
+        # pending ストリームはコミットしなければ破棄される。接続だけ閉じる
+        if stream in self._streams:
+            self._streams.pop(stream).close()
+
+
+def _transient_errors() -> Tuple[type, ...]:
+    from google.api_core import exceptions
+
+    return (
+        exceptions.ServiceUnavailable,
+        exceptions.InternalServerError,
+        exceptions.Aborted,
+        exceptions.DeadlineExceeded,
+        exceptions.TooManyRequests,
+    )
+
+
+class StorageWriteWriter:
+    """
+    with StorageWriteWriter("project.dex_raw_dev.pool_hourly_uniswap_v3", "uniswap_v3") as w:
+        for page in pages:
+            w.write(page)
+
+    送信は 1 リクエスト分だけ先行させ、次のページの取得と前のページの追記を重ねる。
+    """
+
+    def __init__(
+        self,
+        table: str,
+        dex_protocol: str,
+        serde: Optional[Serde] = None,
+        client: Optional[WriteClient] = None,
+        mode: WriteMode = "pending",
+        archive: Any = None,
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        retry: Optional[RetryPolicy] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if mode not in ("pending", "committed"):
+            raise ValueError(f"Unknown write mode: {mode}")
+        self.table = table
+        self.dex_protocol = dex_protocol
+        self.serde = serde or get_serde()
+        self.client = client
+        self.mode = mode
+        self.archive = archive
+        self.max_request_bytes = max_request_bytes
+        self.retry = retry or RetryPolicy()
+        self._sleep = sleep
+        self.rows = 0
+        self.stream: Optional[str] = None
+        self._inflight: Optional[Tuple[int, List[Dict[str, Any]], Future]] = None
+
+    def __enter__(self) -> "StorageWriteWriter":
+        if self.client is None:
+            self.client = BigQueryWriteClient()
+        self.stream = self.client.create_stream(self.table, committed=self.mode == "committed")
+        if self.archive is not None:
+            self.archive.__enter__()
+        return self
+
+    def _rows(self, records: List[PoolHourData]) -> List[Dict[str, Any]]:
+        load_ts = int(datetime.now(timezone.utc).timestamp()) * 1_000_000
+        # raw はページ分をまとめてエンコードし、行に分割する（JSON の文字列中の改行はエスケープされる）
+        raws = self.serde.encode_rows(records).split(b"\n")[:-1]
+        return [
+            {
+                "raw": raw.decode("utf-8"),
+                "pool_id": rec["pool"]["id"],
+                "dex_protocol": self.dex_protocol,
+                "hour_ts": rec["periodStartUnix"] * 1_000_000,
+                "load_ts": load_ts,
+            }
+            for rec, raw in zip(records, raws)
+        ]
+
+    def write(self, records: Iterable[PoolHourData]) -> int:
+        """1 ページ分を追記し、追記した行数を返す"""
+        records = list(records)
+        rows = self._rows(records)
+        chunk: List[Dict[str, Any]] = []
+        size = 0
+        for row in rows:
+            row_size = len(row["raw"]) + 128
+            if chunk and size + row_size > self.max_request_bytes:
+                self._append(chunk)
+                chunk, size = [], 0
+            chunk.append(row)
+            size += row_size
+        if chunk:
+            self._append(chunk)
+        if self.archive is not None:
+            self.archive.write(records)
+        return len(rows)
+
+    def _append(self, rows: List[Dict[str, Any]]) -> None:
+        self._wait()
+        self._inflight = (self.rows, rows, self.client.append(self.stream, rows, self.rows))
+        self.rows += len(rows)
+
+    def _wait(self) -> None:
+        """先行しているリクエストの完了を待つ（一時的なエラーは同じ offset で再送）"""
+        from google.api_core.exceptions import AlreadyExists
+
+        if self._inflight is None:
+            return
+        offset, rows, future = self._inflight
+        self._inflight = None
+        attempt = 1
+        while True:
+            try:
+                future.result()
+                return
+            except AlreadyExists:
+                # 前回の送信が実は成功していた（同じ offset の行は書き込み済み）
+                return
+            except _transient_errors() as e:
+                if attempt >= self.retry.max_attempts:
+                    raise
+                delay = self.retry.backoff(attempt)
+                logger.warning(f"append at offset {offset} failed ({e}) - retrying in {delay:.2f}s")
+                self._sleep(delay)
+                attempt += 1
+                future = self.client.append(self.stream, rows, offset)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        archived = self.archive is None
+        try:
+            if exc_type is not None:
+                return
+            self._wait()
+            row_count = self.client.finalize(self.stream)
+            if row_count != self.rows:
+                raise RuntimeError(f"write stream has {row_count} rows, expected {self.rows}")
+            # アーカイブを先に確定し、行が見えた時点で GCS にも揃っているようにする
+            if not archived:
+                archived = True
+                self.archive.__exit__(None, None, None)
+            if self.mode == "pending":
+                self.client.commit(self.table, [self.stream])
+            logger.info(f"committed {self.rows} rows to {self.table}")
+        except BaseException as e:
+            exc_type, exc, tb = type(e), e, e.__traceback__
+            raise
+        finally:
+            if exc_type is not None:
+                self.client.abort(self.stream)
+                if not archived:
+                    self.archive.__exit__(exc_type, exc, tb)
@@ -1,6 +1,11 @@
-from typing import Literal, TypedDict
+from typing import Dict, List, Literal, NotRequired, Optional, TypedDict, Union
 
-ProtocolName = Literal["uniswap", "sushiswap"]
+# protocols.yml のトップレベルのキー（registry.available_protocols() で一覧できる）
+ProtocolName = str
+
+# skip: skip += first によるオフセット方式（The Graph では skip<=5000 の上限あり）
+# id_gt: 直前ページ末尾の id を起点にするキーセット方式
+PaginationMode = Literal["skip", "id_gt"]
 
 
 class ProtocolConfig(TypedDict):
@@ -8,11 +13,25 @@ class ProtocolConfig(TypedDict):
     subgraph_id: str
     endpoint_template: str
     page_size: int
+    pagination: NotRequired[PaginationMode]
+    pool_size: NotRequired[int]
+    http2: NotRequired[bool]
+    min_page_size: NotRequired[int]
+    max_retries: NotRequired[int]
+    # "full" | "minimal" または "pool.token0.id" 形式のフィールドのリスト
+    fields: NotRequired[Union[str, List[str]]]
+    # queries/ 以下の全フィールド用クエリ（省略時は fields から組み立てる）
+    query_file: NotRequired[str]
+    # 追加の HTTP ヘッダ（値の {api_key} は展開される）
+    headers: NotRequired[Dict[str, str]]
+    # 出力の dex_protocol 列（既定は "{protocol}_v3"）
+    dex_protocol: NotRequired[str]
+    # 同時リクエスト数・リクエストレートを共有するグループ（既定はエンドポイント毎）
+    rate_group: NotRequired[str]
+    requests_per_s: NotRequired[float]
 
 
-class ProtocolConfigMap(TypedDict):
-    uniswap: ProtocolConfig
-    sushiswap: ProtocolConfig
+ProtocolConfigMap = Dict[ProtocolName, ProtocolConfig]
 
 
 class TokenInfo(TypedDict):
@@ -38,7 +57,8 @@ class PoolHourData(TypedDict):
     sqrtPrice: str
     token0Price: str
     token1Price: str
-    tick: str
+    # 流動性のないプール・時間帯では null
+    tick: Optional[str]
     feeGrowthGlobal0X128: str
     feeGrowthGlobal1X128: str
     tvlUSD: str
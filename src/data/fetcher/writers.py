@@ -0,0 +1,277 @@
+"""
+取得したページを逐次ファイルへ書き出すライター
+
+ページ単位で書き込むため、メモリ使用量は 1 ページ分（Parquet は 1 row group 分）に抑えられる。
+出力先は sinks が扱い、正常終了時のみ確定する（ローカルは `<output>.part` からのリネーム、
+gs:// は並列アップロードしたパートの compose）。
+出力形式は拡張子で決まる（.parquet → ParquetWriter、それ以外 → JsonlWriter）。
+bq://project.dataset.table は Storage Write API で RAW テーブルに直接書き込む（storage_write.StorageWriteWriter）。
+JSONL は末尾の .gz/.zst で圧縮する（Parquet は列毎に zstd 圧縮済みのため不可）。
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterable, List, Literal, Optional, Union
+
+from .records import RecordBatch
+from .serde import Serde, get_serde
+from .sinks import open_sink, split_compression, wrap_compression
+from .storage_write import StorageWriteWriter
+from .types import PoolHourData
+
+OutputFormat = Literal["jsonl", "parquet"]
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds") + "Z"
+
+
+def build_row(rec: PoolHourData, dex_protocol: str, load_ts: str) -> Dict[str, Any]:
+    """BigQuery RAW テーブル 1 行分の dict を作る"""
+    return {
+        "raw": rec,
+        "pool_id": rec["pool"]["id"],
+        "dex_protocol": dex_protocol,
+        "hour_ts": _utc_iso(datetime.fromtimestamp(rec["periodStartUnix"], tz=timezone.utc)),
+        "load_ts": load_ts,
+    }
+
+
+def output_suffix(fmt: OutputFormat) -> str:
+    if fmt not in ("jsonl", "parquet"):
+        raise ValueError(f"Unknown output format: {fmt}")
+    return f".{fmt}"
+
+
+class _AtomicOutput:
+    """シンクに（必要なら圧縮して）書き、正常終了時のみ出力を確定する"""
+
+    def __init__(self, output_path: str, **sink_options: Any):
+        self.output_path = output_path
+        _, self.compression = split_compression(output_path)
+        self._sink = open_sink(output_path, **sink_options)
+        self._raw: Optional[BinaryIO] = None
+        self._f: Optional[BinaryIO] = None
+
+    def _open(self) -> BinaryIO:
+        self._raw = self._sink.open()
+        self._f = wrap_compression(self._raw, self.compression)
+        return self._f
+
+    def _finish(self, ok: bool) -> None:
+        if not ok:
+            self._sink.abort()
+            return
+        if self._f is not self._raw:
+            self._f.close()  # 圧縮ストリームの終端を書き出す（下位のシンクは閉じない）
+        self._sink.commit()
+
+
+class JsonlWriter(_AtomicOutput):
+    """
+    NDJSON ライター
+
+    with JsonlWriter(path, "uniswap_v3") as w:
+        for page in pages:
+            w.write(page)
+    """
+
+    def __init__(self, output_path: str, dex_protocol: str, serde: Optional[Serde] = None, **sink_options: Any):
+        super().__init__(output_path, **sink_options)
+        self.dex_protocol = dex_protocol
+        self.serde = serde or get_serde()
+        self.rows = 0
+
+    def __enter__(self) -> "JsonlWriter":
+        self._open()
+        return self
+
+    def write(self, records: Iterable[PoolHourData]) -> int:
+        """1 ページ分を書き込み、書き込んだ行数を返す"""
+        load_ts = _utc_iso(datetime.now(timezone.utc))
+        rows = [build_row(rec, self.dex_protocol, load_ts) for rec in records]
+        # ページ分をまとめてエンコードし、1 回の write で OS に渡す（Python 側のバッファに溜め込まない）
+        self._f.write(self.serde.encode_rows(rows))
+        if self.compression == "none":
+            # 圧縮時はページ毎に flush すると圧縮率が落ちるため、圧縮側のバッファに任せる
+            self._f.flush()
+        self.rows += len(rows)
+        return len(rows)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._finish(exc_type is None)
+
+
+# poolHourData → フラットな列名。BigDecimal 系は float64
+_FLOAT_FIELDS = {
+    "token0Price": "token0_price",
+    "token1Price": "token1_price",
+    "tvlUSD": "tvl_usd",
+    "volumeToken0": "volume_token0",
+    "volumeToken1": "volume_token1",
+    "volumeUSD": "volume_usd",
+    "feesUSD": "fees_usd",
+    "open": "open",
+    "high": "high",
+    "low": "low",
+    "close": "close",
+}
+# uint128/uint160/uint256 は BIGNUMERIC の整数部（38 桁）にも収まらないため文字列のまま保持
+_BIGINT_FIELDS = {
+    "liquidity": "liquidity",
+    "sqrtPrice": "sqrt_price",
+    "feeGrowthGlobal0X128": "fee_growth_global0_x128",
+    "feeGrowthGlobal1X128": "fee_growth_global1_x128",
+}
+_INT_FIELDS = {"tick": "tick", "txCount": "tx_count"}
+# 値の種類が少ない列は辞書エンコード
+_DICT_COLUMNS = [
+    "pool_id",
+    "dex_protocol",
+    "token0_id",
+    "token0_symbol",
+    "token0_name",
+    "token1_id",
+    "token1_symbol",
+    "token1_name",
+]
+
+
+def parquet_schema():
+    """ParquetWriter が出力する列のスキーマ"""
+    import pyarrow as pa
+
+    ts = pa.timestamp("ms", tz="UTC")
+    fields = [
+        pa.field("id", pa.string(), nullable=False),
+        pa.field("pool_id", pa.string(), nullable=False),
+        pa.field("dex_protocol", pa.string(), nullable=False),
+        pa.field("hour_ts", ts, nullable=False),
+        pa.field("load_ts", ts, nullable=False),
+        pa.field("period_start_unix", pa.int64(), nullable=False),
+    ]
+    for t in ("token0", "token1"):
+        fields += [
+            pa.field(f"{t}_id", pa.string()),
+            pa.field(f"{t}_symbol", pa.string()),
+            pa.field(f"{t}_name", pa.string()),
+            pa.field(f"{t}_decimals", pa.int32()),
+        ]
+    fields.append(pa.field("fee_tier", pa.int32()))
+    fields += [pa.field(c, pa.string()) for c in _BIGINT_FIELDS.values()]
+    fields += [pa.field(c, pa.int64()) for c in _INT_FIELDS.values()]
+    fields += [pa.field(c, pa.float64()) for c in _FLOAT_FIELDS.values()]
+    return pa.schema(fields)
+
+
+def record_columns(batch: RecordBatch, dex_protocol: str, load_ts: List[datetime]) -> Dict[str, List[Any]]:
+    """RecordBatch を Parquet の列 dict に変換（load_ts はレコードと同じ長さ）"""
+    records = batch.records
+    period = [r.period_start_unix for r in records]
+    pools = [r.pool for r in records]
+    cols: Dict[str, List[Any]] = {
+        "id": [r.id for r in records],
+        "pool_id": [p.id for p in pools],
+        "dex_protocol": [dex_protocol] * len(records),
+        "hour_ts": [datetime.fromtimestamp(t, tz=timezone.utc) for t in period],
+        "load_ts": load_ts,
+        "period_start_unix": period,
+        "fee_tier": [p.fee_tier for p in pools],
+    }
+    for t in ("token0", "token1"):
+        tokens = [getattr(p, t) for p in pools]
+        cols[f"{t}_id"] = [tok and tok.id for tok in tokens]
+        cols[f"{t}_symbol"] = [tok and tok.symbol for tok in tokens]
+        cols[f"{t}_name"] = [tok and tok.name for tok in tokens]
+        cols[f"{t}_decimals"] = [tok and tok.decimals for tok in tokens]
+    # uint256 はパース済み int を 10 進文字列に戻す（損失なし）
+    for attr in _BIGINT_FIELDS.values():
+        cols[attr] = [None if (v := getattr(r, attr)) is None else str(v) for r in records]
+    for attr in (*_INT_FIELDS.values(), *_FLOAT_FIELDS.values()):
+        cols[attr] = [getattr(r, attr) for r in records]
+    return cols
+
+
+class ParquetWriter(_AtomicOutput):
+    """
+    型付き・フラット化した Parquet ライター（pyarrow が必要）
+
+    数値は float64/int64 に変換済み、プール／トークン列は辞書エンコードされるため
+    BigQuery 側で JSON をパースし直す必要がなく、ファイルサイズ・スキャン量も小さくなる。
+    row_group_size 行溜まるごとに row group として書き出す。
+    """
+
+    def __init__(self, output_path: str, dex_protocol: str, row_group_size: int = 50_000, **sink_options: Any):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Parquet 出力には pyarrow が必要です (pip install pyarrow)") from e
+        if split_compression(output_path)[1] != "none":
+            raise ValueError(f"Parquet output cannot be compressed as a whole: {output_path}")
+        super().__init__(output_path, **sink_options)
+        self.dex_protocol = dex_protocol
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._schema = parquet_schema()
+        # 行 dict ではなく PoolHourRecord でバッファし、メタデータはバッチ間で共有する
+        self._buffer = RecordBatch()
+        self._load_ts: List[datetime] = []
+        self._writer: Optional[Any] = None
+
+    def __enter__(self) -> "ParquetWriter":
+        import pyarrow.parquet as pq
+
+        self._writer = pq.ParquetWriter(
+            self._open(),
+            self._schema,
+            compression="zstd",
+            use_dictionary=_DICT_COLUMNS,
+        )
+        return self
+
+    def write(self, records: Iterable[PoolHourData]) -> int:
+        """1 ページ分をバッファに追加し、row group 分溜まったら書き出す"""
+        load_ts = datetime.now(timezone.utc).replace(microsecond=0)
+        before = len(self._buffer)
+        self._buffer.extend(records)
+        n = len(self._buffer) - before
+        self._load_ts.extend([load_ts] * n)
+        self.rows += n
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+        return n
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+
+        if self._buffer:
+            cols = record_columns(self._buffer, self.dex_protocol, self._load_ts)
+            self._writer.write_table(pa.Table.from_pydict(cols, schema=self._schema))
+            self._buffer.clear()
+            self._load_ts = []
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self._flush()
+        finally:
+            self._writer.close()
+            self._finish(exc_type is None)
+
+
+def open_writer(
+    output_path: str, dex_protocol: str, serde: Optional[Serde] = None, **sink_options: Any
+) -> Union[JsonlWriter, ParquetWriter, StorageWriteWriter]:
+    """
+    拡張子から出力形式を判定してライターを返す
+
+    sink_options は gs:// 出力時の GcsSink の引数（part_size, parallelism, client）、
+    bq:// 出力時の StorageWriteWriter の引数（client, mode, archive）
+    """
+    if output_path.startswith("bq://"):
+        return StorageWriteWriter(output_path[len("bq://") :], dex_protocol, serde, **sink_options)
+    if split_compression(output_path)[0].endswith(".parquet"):
+        return ParquetWriter(output_path, dex_protocol, **sink_options)
+    return JsonlWriter(output_path, dex_protocol, serde, **sink_options)
@@ -0,0 +1,220 @@
+"""
+read_features の結果をプロセス内に保持する LRU + TTL キャッシュ
+
+特徴量は import_feature_values で 1 時間に 1 回しか更新されないため、同じプールを繰り返しスコアリングする間は
+Feature Store に問い合わせずに返す。
+
+- キーは (pool_id, 特徴量 ID の組)。maxsize を超えたら最も長く使われていないものから捨てる
+- 取得から ttl_s 経ったら期限切れ
+- 期限切れから stale_s 以内は古い値をそのまま返し、裏で取り直す（stale-while-revalidate）
+- 世代を invalidate(generation) で進めると、それより前の値は使わない。取得した特徴量のタイムスタンプが
+  それまでに見た最新の import（period_s 単位）より新しければ、新しい import が届いたとみなして世代を進める
+- 取得に失敗した場合は期限切れの値でも残っていれば返す
+
+値は dict（取り出す度にコピーを返す）か、変更されない値（読み取り専用の ndarray など）を入れる。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Features = Any
+# 取得関数は (特徴量, 特徴量のタイムスタンプ（UNIX 秒、不明なら None）) を返す
+Loader = Callable[[], Tuple[Features, Optional[float]]]
+AsyncLoader = Callable[[], Awaitable[Tuple[Features, Optional[float]]]]
+
+
+def _copy(value: Features) -> Features:
+    return dict(value) if isinstance(value, dict) else value
+
+
+@dataclass
+class _Entry:
+    features: Features
+    expires_at: float
+    generation: Hashable
+
+
+class FeatureCache:
+    """
+    cache = FeatureCache(maxsize=10_000, ttl_s=300)
+    features = cache.get(("0xpool", ("volume_usd", "tvl_usd")), lambda: fetch(...))
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl_s: float = 300.0,
+        stale_s: float = 600.0,
+        period_s: float = 3600.0,
+        refresh_workers: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive: {maxsize}")
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.period_s = period_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._refresh_workers = refresh_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.generation: Hashable = 0
+        # これまでに取得した特徴量のうち最新の import の周期（feature_ts // period_s）
+        self._latest_period: Optional[int] = None
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _observe(self, feature_ts: Optional[float]) -> None:
+        # 呼び出し元でロックを保持している前提
+        if feature_ts is None:
+            return
+        period = int(feature_ts // self.period_s)
+        if self._latest_period is not None and period > self._latest_period:
+            # 新しい import の値が届いたので、それより前に取得した値は使わない
+            logger.info(f"newer feature import observed (period {period}) - invalidating cached features")
+            self.generation = ("import", period)
+            self._entries.clear()
+        if self._latest_period is None or period > self._latest_period:
+            self._latest_period = period
+
+    def _store(self, key: Hashable, features: Features, feature_ts: Optional[float], generation: Hashable) -> None:
+        with self._lock:
+            if generation != self.generation:
+                # 取得中に世代が進んだ値は保持しない
+                return
+            self._observe(feature_ts)
+            generation = self.generation
+            self._entries[key] = _Entry(_copy(features), self._clock() + self.ttl_s, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: Hashable, loader: Loader, generation: Hashable) -> Features:
+        features, feature_ts = loader()
+        self._store(key, features, feature_ts, generation)
+        return _copy(features)
+
+    def _refresh(self, key: Hashable, loader: Loader, generation: Hashable) -> None:
+        try:
+            self._load(key, loader, generation)
+            self.stats["refreshes"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"background feature refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, key: Hashable, loader: Loader, generation: Hashable) -> None:
+        # 呼び出し元でロックを保持している前提
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self._refresh_workers, thread_name_prefix="feature-cache")
+        self._executor.submit(self._refresh, key, loader, generation)
+
+    def _lookup(self, key: Hashable) -> Tuple[str, Optional[_Entry], Hashable]:
+        """("hit" | "stale" | "miss", エントリ, 世代)。hit / stale は呼び出し側で値を返す"""
+        now = self._clock()
+        generation = self.generation
+        entry = self._entries.get(key)
+        if entry is None or entry.generation != generation:
+            self.stats["misses"] += 1
+            return "miss", None, generation
+        self._entries.move_to_end(key)
+        if now < entry.expires_at:
+            self.stats["hits"] += 1
+            return "hit", entry, generation
+        if now < entry.expires_at + self.stale_s:
+            self.stats["stale_hits"] += 1
+            return "stale", entry, generation
+        self.stats["misses"] += 1
+        return "miss", entry, generation
+
+    def _serve_expired(self, entry: _Entry) -> Features:
+        # Feature Store の障害時は期限切れでも直近の値を返す
+        logger.warning("feature read failed - serving an expired cached value", exc_info=True)
+        return _copy(entry.features)
+
+    def get(self, key: Hashable, loader: Loader) -> Features:
+        """キャッシュ済みの値を返す。なければ（または古すぎれば）loader で取得してキャッシュする"""
+        with self._lock:
+            state, entry, generation = self._lookup(key)
+            if state == "stale":
+                self._schedule_refresh(key, loader, generation)
+            if state != "miss":
+                return _copy(entry.features)
+        try:
+            return self._load(key, loader, generation)
+        except Exception:
+            self.stats["errors"] += 1
+            if entry is None:
+                raise
+            return self._serve_expired(entry)
+
+    async def aget(self, key: Hashable, loader: AsyncLoader) -> Features:
+        """get の asyncio 版（古い値の取り直しは同じイベントループ上のタスクで行う）"""
+        with self._lock:
+            state, entry, generation = self._lookup(key)
+            if state == "stale" and key not in self._refreshing:
+                self._refreshing.add(key)
+                task = asyncio.ensure_future(self._arefresh(key, loader, generation))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            if state != "miss":
+                return _copy(entry.features)
+        try:
+            features, feature_ts = await loader()
+        except Exception:
+            self.stats["errors"] += 1
+            if entry is None:
+                raise
+            return self._serve_expired(entry)
+        self._store(key, features, feature_ts, generation)
+        return _copy(features)
+
+    async def _arefresh(self, key: Hashable, loader: AsyncLoader, generation: Hashable) -> None:
+        try:
+            features, feature_ts = await loader()
+            self._store(key, features, feature_ts, generation)
+            self.stats["refreshes"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"background feature refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, generation: Optional[Hashable] = None) -> None:
+        """
+        キャッシュ済みの値を使わないようにする
+
+        generation を渡した場合は現在と異なるときだけ進める（import 毎のマーカーを何度渡してもよい）
+        """
+        with self._lock:
+            if generation is None:
+                generation = object()
+            elif generation == self.generation:
+                return
+            self.generation = generation
+            self._entries.clear()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
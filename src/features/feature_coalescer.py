@@ -0,0 +1,136 @@
+"""
+同じプールへの同時読み取りを 1 回の RPC にまとめる（single-flight + マイクロバッチ）
+
+- 実行中（または送信待ち）のキーと同じキーの読み取りは新たに RPC を発行せず、その結果を待つ
+- 別々のキーでも window_s 以内に届いたものは 1 回の read_many（streaming_read_feature_values）にまとめる
+  （最初に届いた呼び出しが window_s 待ってから送る。max_batch 件集まったらすぐ送る）
+- 1 件だけなら read_one（read_feature_values）で読む
+- read_many が split_errors（エンティティが原因の失敗）で失敗した場合は、各キーを最初に要求したスレッドが
+  read_one で読み直す（1 つのプールの不正な値がバッチ全体を失敗させても、他のプールには影響しない）
+- それ以外の失敗（一時的なエラーのリトライ切れなど）は、個別に読み直しても障害中のサービスへの負荷を
+  増やすだけなので、バッチの全キーにその例外を返す
+"""
+
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, Type, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_PENDING, _ALONE, _DONE = "pending", "alone", "done"
+
+
+class _Call:
+    __slots__ = ("key", "state", "value", "error")
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.state = _PENDING
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ReadCoalescer(Generic[K, V]):
+    """
+    coalescer = ReadCoalescer(read_one, read_many, window_s=0.002, split_errors=(InvalidArgument, NotFound))
+    response = coalescer.read("0xpool")
+
+    read_many は渡したキーそれぞれの値を dict で返す（欠けたキーの値は None）。
+    返す値は待っていた全スレッドで共有されるため、呼び出し側で書き換えないこと。
+    """
+
+    def __init__(
+        self,
+        read_one: Callable[[K], V],
+        read_many: Callable[[List[K]], Dict[K, V]],
+        window_s: float = 0.002,
+        max_batch: int = 100,
+        split_errors: Tuple[Type[BaseException], ...] = (),
+    ):
+        if max_batch <= 0:
+            raise ValueError(f"max_batch must be positive: {max_batch}")
+        self._read_one = read_one
+        self._read_many = read_many
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.split_errors = split_errors
+        self._cond = threading.Condition()
+        self._in_flight: Dict[K, _Call] = {}
+        self._pending: List[_Call] = []
+        self.stats: Dict[str, int] = {"reads": 0, "coalesced": 0, "single_reads": 0, "batches": 0, "fallbacks": 0}
+
+    def read(self, key: K) -> V:
+        with self._cond:
+            self.stats["reads"] += 1
+            call = self._in_flight.get(key)
+            owner = call is None
+            if call is None:
+                call = _Call(key)
+                self._in_flight[key] = call
+                self._pending.append(call)
+                leader = len(self._pending) == 1
+                if len(self._pending) >= self.max_batch:
+                    self._cond.notify_all()
+            else:
+                self.stats["coalesced"] += 1
+                leader = False
+
+        if leader:
+            with self._cond:
+                # 他のスレッドの読み取りが集まるのを待つ
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.window_s)
+                batch, self._pending = self._pending, []
+            self._send(batch)
+
+        with self._cond:
+            # バッチが失敗したキーは最初に要求したスレッドだけが読み直し、他はその結果を待つ
+            self._cond.wait_for(lambda: call.state == _DONE or (owner and call.state == _ALONE))
+        if call.state == _ALONE:
+            self._read_alone(call)
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def _send(self, batch: List[_Call]) -> None:
+        if len(batch) == 1:
+            self._read_alone(batch[0])
+            return
+        try:
+            values = self._read_many([call.key for call in batch])
+        except self.split_errors:
+            with self._cond:
+                self.stats["batches"] += 1
+                self.stats["fallbacks"] += len(batch)
+                for call in batch:
+                    call.state = _ALONE
+                self._cond.notify_all()
+            return
+        except Exception as e:
+            with self._cond:
+                self.stats["batches"] += 1
+                for call in batch:
+                    self._resolve(call, None, e)
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self.stats["batches"] += 1
+            for call in batch:
+                self._resolve(call, values.get(call.key), None)
+            self._cond.notify_all()
+
+    def _read_alone(self, call: _Call) -> None:
+        value, error = None, None
+        try:
+            value = self._read_one(call.key)
+        except Exception as e:
+            error = e
+        with self._cond:
+            self.stats["single_reads"] += 1
+            self._resolve(call, value, error)
+            self._cond.notify_all()
+
+    def _resolve(self, call: _Call, value: Any, error: Optional[BaseException]) -> None:
+        # 呼び出し元でロックを保持している前提
+        call.value, call.error, call.state = value, error, _DONE
+        # 以降の読み取りは新しい RPC（またはキャッシュ）から
+        self._in_flight.pop(call.key, None)
@@ -0,0 +1,112 @@
+"""
+Feature Store のレスポンスを (プール数, 特徴量数) の float64 行列に直接書き込むデコーダ
+
+header.feature_descriptors → 列番号の対応はヘッダ毎に 1 度だけ作り、entity_view の値は
+protobuf のメッセージから dict を経由せずに行列の該当位置へ書き込む。値が返ってこなかった位置は
+missing（True が欠損）で区別し、values には default_value（未指定なら NaN）が入る。
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import proto
+
+# 数値として扱う FeatureValue の oneof
+_NUMERIC_KINDS = ("double_value", "int64_value", "bool_value")
+
+
+def _raw(message: Any) -> Any:
+    """proto-plus のメッセージなら下層の protobuf メッセージを返す（フィールドアクセス毎のラップを避ける）"""
+    return type(message).pb(message) if isinstance(message, proto.Message) else message
+
+
+@dataclass
+class FeatureMatrix:
+    pool_ids: List[str]
+    feature_ids: List[str]
+    # (len(pool_ids), len(feature_ids)) の float64。欠損位置は default_value
+    values: np.ndarray
+    # values と同じ形の bool。値が返ってこなかった位置が True
+    missing: np.ndarray
+
+    @classmethod
+    def empty(
+        cls, pool_ids: Sequence[str], feature_ids: Sequence[str], default_value: Optional[float] = None
+    ) -> "FeatureMatrix":
+        shape = (len(pool_ids), len(feature_ids))
+        fill = math.nan if default_value is None else default_value
+        return cls(list(pool_ids), list(feature_ids), np.full(shape, fill), np.ones(shape, dtype=bool))
+
+    @classmethod
+    def from_dicts(
+        cls,
+        rows: Mapping[str, Mapping[str, float]],
+        feature_ids: Sequence[str],
+        pool_ids: Optional[Sequence[str]] = None,
+        default_value: Optional[float] = None,
+    ) -> "FeatureMatrix":
+        """read_features の結果（プール → 特徴量の dict）から組み立てる"""
+        matrix = cls.empty(list(rows) if pool_ids is None else pool_ids, feature_ids, default_value)
+        columns = {fid: i for i, fid in enumerate(matrix.feature_ids)}
+        for r, pid in enumerate(matrix.pool_ids):
+            for fid, value in rows.get(pid, {}).items():
+                if fid in columns:
+                    matrix.values[r, columns[fid]] = value
+                    matrix.missing[r, columns[fid]] = False
+        return matrix
+
+    def clear_rows(self, rows: Sequence[int], default_value: Optional[float] = None) -> None:
+        """途中まで書き込んだ行を欠損に戻す"""
+        self.values[rows] = math.nan if default_value is None else default_value
+        self.missing[rows] = True
+
+    def to_dicts(self) -> Dict[str, Dict[str, float]]:
+        """値が返ってきた位置だけの dict（read_features_batch と同じ形）"""
+        return {
+            pid: {fid: float(v) for fid, v, m in zip(self.feature_ids, self.values[r], self.missing[r]) if not m}
+            for r, pid in enumerate(self.pool_ids)
+        }
+
+
+class FeatureDecoder:
+    """
+    decoder = FeatureDecoder(FEATURE_LIST)
+    columns = decoder.columns(response.header)
+    decoder.decode_into(matrix, row, response.entity_view, columns)
+    """
+
+    def __init__(self, feature_ids: Sequence[str]):
+        self.feature_ids = list(feature_ids)
+        self._index = {fid: i for i, fid in enumerate(self.feature_ids)}
+        self._columns: Dict[Tuple[str, ...], List[int]] = {}
+
+    def columns(self, header: Any) -> List[int]:
+        """header.feature_descriptors の並び → 行列の列番号（要求していない特徴量は -1）"""
+        ids = tuple(d.id for d in _raw(header).feature_descriptors)
+        if ids not in self._columns:
+            self._columns[ids] = [self._index.get(fid, -1) for fid in ids]
+        return self._columns[ids]
+
+    def decode_into(self, matrix: FeatureMatrix, row: int, entity_view: Any, columns: List[int]) -> Optional[float]:
+        """
+        entity_view の値を matrix の row 行に書き込み、値の生成時刻（最新のもの、UNIX 秒）を返す
+        """
+        values = matrix.values[row]
+        missing = matrix.missing[row]
+        latest: Optional[float] = None
+        for col, data in zip(columns, _raw(entity_view).data):
+            if col < 0 or not data.HasField("value"):
+                continue
+            value = data.value
+            kind = value.WhichOneof("value")
+            if kind not in _NUMERIC_KINDS:
+                continue
+            values[col] = getattr(value, kind)
+            missing[col] = False
+            if value.HasField("metadata"):
+                generated = value.metadata.generate_time
+                ts = generated.seconds + generated.nanos / 1e9
+                latest = ts if latest is None else max(latest, ts)
+        return latest
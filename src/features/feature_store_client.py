@@ -1,17 +1,37 @@
 """
 Vertex AI Feature Store からオンラインで特徴量を取得するクライアント
+
+read_features の結果はプロセス内にキャッシュする（feature_cache.FeatureCache）。
+FEATURE_CACHE_SIZE（既定 10000、0 で無効）・FEATURE_CACHE_TTL_S（既定 300）・
+FEATURE_CACHE_STALE_S（既定 600）で調整する。
+キャッシュにない読み取りは feature_coalescer.ReadCoalescer で同じプールの同時読み取りを 1 回の RPC にまとめ、
+FEATURE_COALESCE_WINDOW_MS（既定 2）以内に届いた別のプールは 1 本のストリームにまとめて読む
+（FEATURE_COALESCE_MAX_BATCH、既定 100 件まで）。
+イベントループから使う場合は AsyncFeatureStoreClient（grpc.aio）を使う。
 """
 
+import asyncio
 import logging
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
 from functools import lru_cache
-from typing import Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
 
+import numpy as np
 from google.api_core import exceptions as api_exceptions
-from google.api_core import retry
-from google.cloud.aiplatform_v1 import FeaturestoreOnlineServingServiceClient
+from google.api_core import retry, retry_async
+from google.cloud.aiplatform_v1 import (
+    FeaturestoreOnlineServingServiceAsyncClient,
+    FeaturestoreOnlineServingServiceClient,
+)
 from google.cloud.aiplatform_v1 import types as fs_types
 
+from src.features.feature_cache import FeatureCache
+from src.features.feature_coalescer import ReadCoalescer
+from src.features.feature_matrix import FeatureDecoder, FeatureMatrix
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,73 +75,135 @@ def _get_client() -> FeaturestoreOnlineServingServiceClient:
     return FeaturestoreOnlineServingServiceClient(client_options=client_options)
 
 
+@lru_cache(maxsize=1)
+def _get_cache() -> Optional[FeatureCache]:
+    """read_features のキャッシュのシングルトンインスタンスを返す（FEATURE_CACHE_SIZE=0 なら None）"""
+    maxsize = int(os.getenv("FEATURE_CACHE_SIZE", "10000"))
+    if maxsize <= 0:
+        return None
+    return FeatureCache(
+        maxsize=maxsize,
+        ttl_s=float(os.getenv("FEATURE_CACHE_TTL_S", "300")),
+        stale_s=float(os.getenv("FEATURE_CACHE_STALE_S", "600")),
+    )
+
+
+def _feature_timestamp(response) -> Optional[float]:
+    """レスポンス中の特徴量の生成時刻（最新のもの、UNIX 秒）"""
+    latest: Optional[float] = None
+    for feature_data in getattr(response.entity_view, "data", []):
+        generate_time = getattr(getattr(feature_data.value, "metadata", None), "generate_time", None)
+        if isinstance(generate_time, datetime):
+            ts = generate_time.timestamp()
+            latest = ts if latest is None else max(latest, ts)
+    return latest
+
+
+def _apply_defaults(
+    features: Dict[str, float], pool_id: str, feature_ids: List[str], default_value: Optional[float]
+) -> Dict[str, float]:
+    """デフォルト値補完（同期・非同期で共通）"""
+    if default_value is not None:
+        for fid in feature_ids:
+            features.setdefault(fid, default_value)
+
+    if len(features) == 0 or all(v == default_value for v in features.values()):
+        logger.info(f"No features returned for pool_id={pool_id[:6]}..., using default values")
+
+    return features
+
+
 def read_features(pool_id: str, feature_ids: List[str], default_value: Optional[float] = None) -> Dict[str, float]:
     """
-    pool_id を entity_id として最新値を取得し dict で返す
+    pool_id を entity_id として最新値を取得し dict で返す（キャッシュ済みならキャッシュから）
     """
-    config = _get_config()
-    client = _get_client()
+    cache = _get_cache()
     masked = pool_id[:6] + "..."
 
-    request = fs_types.ReadFeatureValuesRequest(
-        entity_type=config.entity_type_path,
-        entity_id=pool_id,
-        feature_selector=fs_types.FeatureSelector(id_matcher=fs_types.IdMatcher(ids=feature_ids)),
-    )
-
-    # google-api-core の組み込みリトライを使用
-    gapic_retry = retry.Retry(
-        predicate=retry.if_exception_type(
-            api_exceptions.DeadlineExceeded,
-            api_exceptions.ServiceUnavailable,
-        ),
-        deadline=10,  # 秒
-        initial=1.0,  # 秒
-        maximum=5.0,  # 秒
-        multiplier=2.0,
-    )
+    def load() -> Tuple[Dict[str, float], Optional[float]]:
+        return _parse_response(_coalescer(tuple(feature_ids)).read(pool_id))
 
     try:
-        response = client.read_feature_values(request=request, retry=gapic_retry)
-
-        features: dict[str, float] = {}
-
-        # header フィールドでエンティティの状態を確認
-        if hasattr(response, "header"):
-            logger.debug(f"Response header: {response.header}")
-
-        # entity_view を使用
-        if hasattr(response, "entity_view"):
-            if hasattr(response.entity_view, "data"):
-                # dataは配列で、インデックスはheader.feature_descriptorsと対応
-                for i, feature_data in enumerate(response.entity_view.data):
-                    if i < len(response.header.feature_descriptors):
-                        feature_name = response.header.feature_descriptors[i].id
-
-                        # dataオブジェクトから値を取得
-                        if feature_data and hasattr(feature_data, "value") and feature_data.value is not None:
-                            value = feature_data.value
-                            if hasattr(value, "double_value"):
-                                features[feature_name] = value.double_value
-                            elif hasattr(value, "int64_value"):
-                                features[feature_name] = float(value.int64_value)
-                        else:
-                            # 値が存在しない場合（空のdataオブジェクト）
-                            logger.debug(f"No value for feature {feature_name}")
-
+        if cache is not None:
+            features = cache.get((pool_id, tuple(feature_ids)), load)
+        else:
+            features, _ = load()
     except Exception as e:
         logger.error(f"Failed to read features for pool_id={masked}: {e}", exc_info=True)
         features = {}
 
-    # デフォルト値補完
-    if default_value is not None:
-        for fid in feature_ids:
-            features.setdefault(fid, default_value)
+    return _apply_defaults(features, pool_id, feature_ids, default_value)
 
-    if len(features) == 0 or all(v == default_value for v in features.values()):
-        logger.info(f"No features returned for pool_id={masked}, using default values")
 
-    return features
+# 一時的なエラーとして同期・非同期の両方でリトライする例外
+_TRANSIENT_ERRORS = (api_exceptions.DeadlineExceeded, api_exceptions.ServiceUnavailable)
+
+# 特定のエンティティが原因でバッチ全体が失敗する例外（バッチを分割して原因のプールを切り分ける）
+_ENTITY_ERRORS = (api_exceptions.InvalidArgument, api_exceptions.NotFound)
+
+# read_feature_values の google-api-core 組み込みリトライの設定（秒）
+_RETRY_SETTINGS = {"deadline": 10, "initial": 1.0, "maximum": 5.0, "multiplier": 2.0}
+
+
+def _feature_selector(feature_ids: List[str]) -> fs_types.FeatureSelector:
+    return fs_types.FeatureSelector(id_matcher=fs_types.IdMatcher(ids=feature_ids))
+
+
+def _read_request(
+    config: FeatureStoreConfig, pool_id: str, feature_ids: List[str]
+) -> fs_types.ReadFeatureValuesRequest:
+    return fs_types.ReadFeatureValuesRequest(
+        entity_type=config.entity_type_path, entity_id=pool_id, feature_selector=_feature_selector(feature_ids)
+    )
+
+
+def _streaming_request(
+    config: FeatureStoreConfig, pool_ids: List[str], feature_ids: List[str]
+) -> fs_types.StreamingReadFeatureValuesRequest:
+    return fs_types.StreamingReadFeatureValuesRequest(
+        entity_type=config.entity_type_path, entity_ids=pool_ids, feature_selector=_feature_selector(feature_ids)
+    )
+
+
+def _parse_response(response) -> Tuple[Dict[str, float], Optional[float]]:
+    """ReadFeatureValuesResponse を特徴量の dict と生成時刻に変換"""
+    features: dict[str, float] = {}
+
+    # header フィールドでエンティティの状態を確認
+    if hasattr(response, "header"):
+        logger.debug(f"Response header: {response.header}")
+
+    # entity_view を使用
+    if hasattr(response, "entity_view"):
+        if hasattr(response.entity_view, "data"):
+            # dataは配列で、インデックスはheader.feature_descriptorsと対応
+            for i, feature_data in enumerate(response.entity_view.data):
+                if i < len(response.header.feature_descriptors):
+                    feature_name = response.header.feature_descriptors[i].id
+
+                    # dataオブジェクトから値を取得
+                    if feature_data and hasattr(feature_data, "value") and feature_data.value is not None:
+                        value = feature_data.value
+                        if hasattr(value, "double_value"):
+                            features[feature_name] = value.double_value
+                        elif hasattr(value, "int64_value"):
+                            features[feature_name] = float(value.int64_value)
+                    else:
+                        # 値が存在しない場合（空のdataオブジェクト）
+                        logger.debug(f"No value for feature {feature_name}")
+
+    return features, _feature_timestamp(response)
+
+
+def _read_response(
+    config: FeatureStoreConfig,
+    client: FeaturestoreOnlineServingServiceClient,
+    pool_id: str,
+    feature_ids: List[str],
+) -> fs_types.ReadFeatureValuesResponse:
+    """read_feature_values を 1 回呼ぶ（失敗時は例外）"""
+    gapic_retry = retry.Retry(predicate=retry.if_exception_type(*_TRANSIENT_ERRORS), **_RETRY_SETTINGS)
+    return client.read_feature_values(request=_read_request(config, pool_id, feature_ids), retry=gapic_retry)
 
 
 def _parse_entity_view(entity_view, header) -> dict[str, float]:
@@ -140,33 +222,396 @@ def _parse_entity_view(entity_view, header) -> dict[str, float]:
     return result
 
 
+class _StreamCollector:
+    """
+    streaming_read_feature_values のレスポンスをエンティティ毎にまとめる
+
+    ヘッダ（feature_descriptors）は最初のレスポンスにだけ含まれ、以降のレスポンスは entity_view だけを持つ
+    """
+
+    def __init__(self) -> None:
+        self.header = None
+        self.results: dict[str, dict[str, float]] = {}
+
+    def add(self, resp) -> None:
+        if len(resp.header.feature_descriptors) > 0:
+            self.header = resp.header
+        entity_id = resp.entity_view.entity_id
+        if entity_id and self.header is not None:
+            self.results.setdefault(entity_id, {}).update(_parse_entity_view(resp.entity_view, self.header))
+
+
+class _EntityResponse(NamedTuple):
+    """ストリームの 1 エンティティ分を ReadFeatureValuesResponse と同じ形（header / entity_view）で扱う"""
+
+    header: Any
+    entity_view: Any
+
+
+class _ResponseCollector:
+    """streaming_read_feature_values のレスポンスをエンティティ毎の _EntityResponse にする（値は解釈しない）"""
+
+    def __init__(self) -> None:
+        self.header = None
+        self.results: dict[str, _EntityResponse] = {}
+
+    def add(self, resp) -> None:
+        if len(resp.header.feature_descriptors) > 0:
+            self.header = resp.header
+        entity_id = resp.entity_view.entity_id
+        if entity_id and self.header is not None:
+            self.results[entity_id] = _EntityResponse(self.header, resp.entity_view)
+
+
+class _MatrixCollector:
+    """streaming_read_feature_values のレスポンスを FeatureMatrix の該当行に直接書き込む"""
+
+    def __init__(self, decoder: FeatureDecoder, matrix: FeatureMatrix, rows: Dict[str, int]) -> None:
+        self.decoder = decoder
+        self.matrix = matrix
+        self.rows = rows
+        self.columns: Optional[List[int]] = None
+        self.results = None
+
+    def add(self, resp) -> None:
+        if len(resp.header.feature_descriptors) > 0:
+            self.columns = self.decoder.columns(resp.header)
+        entity_id = resp.entity_view.entity_id
+        if entity_id in self.rows and self.columns is not None:
+            self.decoder.decode_into(self.matrix, self.rows[entity_id], resp.entity_view, self.columns)
+
+
+def _stream_backoff(attempt: int) -> float:
+    return min(5.0, 0.5 * 2 ** (attempt - 1))
+
+
+def _read_stream(
+    config: FeatureStoreConfig,
+    client: FeaturestoreOnlineServingServiceClient,
+    pool_ids: list[str],
+    feature_ids: list[str],
+    max_attempts: int,
+    new_collector: Callable[[], Any] = _StreamCollector,
+) -> Any:
+    """streaming_read_feature_values で 1 バッチ分を読み切る（一時的なエラーはバッチ毎にやり直す）"""
+    attempt = 1
+    while True:
+        try:
+            collector = new_collector()
+            # 途中で切れたストリームの結果は使わず、バッチ全体を取り直す
+            for resp in client.streaming_read_feature_values(request=_streaming_request(config, pool_ids, feature_ids)):
+                collector.add(resp)
+            return collector.results
+        except _TRANSIENT_ERRORS as e:
+            if attempt >= max_attempts:
+                raise
+            delay = _stream_backoff(attempt)
+            logger.warning(f"streaming_read_feature_values failed ({e}) - retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def _fan_out(
+    pool_ids: list[str],
+    batch_size: int,
+    max_concurrency: Optional[int],
+    read_batch: Callable[[list[str]], None],
+    read_one: Callable[[str], None],
+    on_failure: Callable[[list[str]], None] = lambda batch: None,
+) -> None:
+    """
+    batch_size 毎のストリームを最大 max_concurrency 本（既定 FEATURE_BATCH_CONCURRENCY、4）並行して読む
+
+    エンティティが原因の失敗（_ENTITY_ERRORS）は on_failure を呼んでから半分に分けて読み直し、1 件になったら
+    read_one で個別に読む。一時的なエラーのリトライ切れなどは分割しても障害中のサービスへの負荷を増やすだけなので、
+    on_failure を呼んでそのバッチを諦める。
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("FEATURE_BATCH_CONCURRENCY", "4"))
+    if not pool_ids:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="feature-batch") as executor:
+
+        def submit(batch: list[str]) -> Future:
+            if len(batch) == 1:
+                return executor.submit(read_one, batch[0])
+            return executor.submit(read_batch, batch)
+
+        pending = {
+            submit(pool_ids[i : i + batch_size]): pool_ids[i : i + batch_size]
+            for i in range(0, len(pool_ids), batch_size)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                try:
+                    future.result()
+                except _ENTITY_ERRORS as e:
+                    logger.warning("streaming_read_feature_values failed for %d pools: %s - splitting", len(batch), e)
+                    on_failure(batch)
+                    # フォールバックもバッチ単位（半分ずつ）で読み直し、失敗の原因になったプールを切り分ける
+                    mid = len(batch) // 2
+                    for half in (batch[:mid], batch[mid:]):
+                        pending[submit(half)] = half
+                except Exception as e:
+                    logger.error("streaming_read_feature_values failed for %d pools: %s", len(batch), e)
+                    on_failure(batch)
+
+
 def read_features_batch(
     pool_ids: list[str],
     feature_ids: list[str],
     batch_size: int = 100,
+    max_concurrency: Optional[int] = None,
+    max_attempts: int = 3,
 ) -> dict[str, dict[str, float]]:
-    """gRPC streamingを使用したバッチ読み取り"""
+    """
+    gRPC streamingを使用したバッチ読み取り
+
+    batch_size 毎のストリームを最大 max_concurrency 本（既定 FEATURE_BATCH_CONCURRENCY、4）並行して読む。
+    エンティティが原因で失敗したバッチは半分に分けて読み直し、1 件になったら read_features で個別に読む。
+    一時的なエラーのリトライ切れなどで失敗したバッチのプールは結果に含めない。
+    """
     config = _get_config()
     client = _get_client()
     results: dict[str, dict[str, float]] = {}
 
-    for i in range(0, len(pool_ids), batch_size):
-        batch_pool_ids = pool_ids[i : i + batch_size]
+    def read_batch(batch: list[str]) -> None:
+        results.update(_read_stream(config, client, batch, feature_ids, max_attempts))
+
+    def read_one(pool_id: str) -> None:
+        results[pool_id] = read_features(pool_id, feature_ids)
+
+    _fan_out(pool_ids, batch_size, max_concurrency, read_batch, read_one)
+    return results
+
+
+@lru_cache(maxsize=32)
+def _coalescer(feature_ids: Tuple[str, ...]) -> ReadCoalescer:
+    """特徴量の組毎に、キャッシュにない読み取りを 1 回の RPC にまとめる"""
+
+    def read_one(pool_id: str) -> Any:
+        return _read_response(_get_config(), _get_client(), pool_id, list(feature_ids))
+
+    def read_many(pool_ids: List[str]) -> Dict[str, Any]:
+        results = _read_stream(
+            _get_config(), _get_client(), pool_ids, list(feature_ids), max_attempts=3, new_collector=_ResponseCollector
+        )
+        # ストリームに含まれなかったプールは値なしのレスポンスとして扱う
+        empty = _EntityResponse(
+            fs_types.ReadFeatureValuesResponse.Header(), fs_types.ReadFeatureValuesResponse.EntityView()
+        )
+        return {pid: results.get(pid, empty) for pid in pool_ids}
+
+    return ReadCoalescer(
+        read_one,
+        read_many,
+        window_s=float(os.getenv("FEATURE_COALESCE_WINDOW_MS", "2")) / 1000,
+        max_batch=int(os.getenv("FEATURE_COALESCE_MAX_BATCH", "100")),
+        split_errors=_ENTITY_ERRORS,
+    )
+
+
+@lru_cache(maxsize=32)
+def _decoder(feature_ids: Tuple[str, ...]) -> FeatureDecoder:
+    """特徴量の組毎のデコーダ（ヘッダ → 列番号の対応を使い回す）"""
+    return FeatureDecoder(feature_ids)
+
+
+def _decode_row(
+    decoder: FeatureDecoder, pool_id: str, response: Any
+) -> Tuple[Tuple[np.ndarray, np.ndarray], Optional[float]]:
+    """1 プール分のレスポンスを読み取り専用の (値, 欠損) の行と生成時刻にする"""
+    row = FeatureMatrix.empty([pool_id], decoder.feature_ids)
+    feature_ts = decoder.decode_into(row, 0, response.entity_view, decoder.columns(response.header))
+    values, missing = row.values[0], row.missing[0]
+    # キャッシュで共有するため書き換えられないようにする
+    values.flags.writeable = False
+    missing.flags.writeable = False
+    return (values, missing), feature_ts
+
+
+def read_feature_matrix(
+    pool_ids: list[str],
+    feature_ids: list[str],
+    default_value: Optional[float] = None,
+    batch_size: int = 100,
+    max_concurrency: Optional[int] = None,
+    max_attempts: int = 3,
+) -> FeatureMatrix:
+    """
+    pool_ids × feature_ids の特徴量を (len(pool_ids), len(feature_ids)) の float64 行列で返す
+
+    1 プールなら read_feature_values（キャッシュ済みならキャッシュから）、複数なら read_features_batch と同じく
+    ストリームを並行して読み、レスポンスの値を dict を経由せずに行列へ書き込む。
+    取得できなかった位置は missing が True で、values は default_value（未指定なら NaN）。
+    """
+    config = _get_config()
+    client = _get_client()
+    cache = _get_cache()
+    decoder = _decoder(tuple(feature_ids))
+    matrix = FeatureMatrix.empty(pool_ids, feature_ids, default_value)
+    rows = {pid: r for r, pid in enumerate(pool_ids)}
+
+    def read_batch(batch: list[str]) -> None:
+        _read_stream(config, client, batch, feature_ids, max_attempts, lambda: _MatrixCollector(decoder, matrix, rows))
+
+    def read_one(pool_id: str) -> None:
+        def load() -> Tuple[Tuple[np.ndarray, np.ndarray], Optional[float]]:
+            return _decode_row(decoder, pool_id, _coalescer(tuple(feature_ids)).read(pool_id))
 
         try:
-            stream = client.streaming_read_feature_values(
-                entity_type=config.entity_type_path,
-                entity_ids=batch_pool_ids,
-                feature_selector=fs_types.FeatureSelector(id_matcher=fs_types.IdMatcher(ids=feature_ids)),
+            if cache is not None:
+                values, missing = cache.get((pool_id, tuple(feature_ids), "row"), load)
+            else:
+                (values, missing), _ = load()
+        except Exception as e:
+            logger.error(f"Failed to read features for pool_id={pool_id[:6]}...: {e}", exc_info=True)
+            return
+        present = ~missing
+        matrix.values[rows[pool_id], present] = values[present]
+        matrix.missing[rows[pool_id]] = missing
+
+    def on_failure(batch: list[str]) -> None:
+        matrix.clear_rows([rows[pid] for pid in batch], default_value)
+
+    if len(pool_ids) == 1:
+        read_one(pool_ids[0])
+    else:
+        _fan_out(pool_ids, batch_size, max_concurrency, read_batch, read_one, on_failure)
+    return matrix
+
+
+class AsyncFeatureStoreClient:
+    """
+    read_features / read_features_batch の asyncio 版（grpc.aio）
+
+    async with AsyncFeatureStoreClient() as fs:
+        features = await fs.read_features("0xpool", FEATURE_LIST, default_value=0.0)
+        batch = await fs.read_features_batch(pool_ids, FEATURE_LIST)
+
+    gRPC チャネルはイベントループに紐づくため、最初の呼び出し時に channels 本
+    （既定 FEATURE_ASYNC_CHANNELS、4）作ってラウンドロビンで使い、close で閉じる。
+    同時に実行する RPC は max_in_flight（既定 FEATURE_ASYNC_MAX_IN_FLIGHT、256）までに制限する。
+    リトライ・レスポンスの解釈・キャッシュは同期版と共通。
+    """
+
+    def __init__(
+        self,
+        config: Optional[FeatureStoreConfig] = None,
+        channels: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        use_cache: bool = True,
+        client_factory: Optional[Callable[[], FeaturestoreOnlineServingServiceAsyncClient]] = None,
+    ):
+        self.config = config or _get_config()
+        self.channels = channels or int(os.getenv("FEATURE_ASYNC_CHANNELS", "4"))
+        self.max_in_flight = max_in_flight or int(os.getenv("FEATURE_ASYNC_MAX_IN_FLIGHT", "256"))
+        self.cache = _get_cache() if use_cache else None
+        self._client_factory = client_factory or self._default_client
+        self._clients: List[FeaturestoreOnlineServingServiceAsyncClient] = []
+        self._next = 0
+        self._in_flight: Optional[asyncio.Semaphore] = None
+
+    def _default_client(self) -> FeaturestoreOnlineServingServiceAsyncClient:
+        client_options = {"api_endpoint": f"{self.config.region}-aiplatform.googleapis.com"}
+        return FeaturestoreOnlineServingServiceAsyncClient(client_options=client_options)
+
+    def _client(self) -> FeaturestoreOnlineServingServiceAsyncClient:
+        if not self._clients:
+            self._clients = [self._client_factory() for _ in range(max(1, self.channels))]
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        client = self._clients[self._next % len(self._clients)]
+        self._next += 1
+        return client
+
+    async def close(self) -> None:
+        """gRPC チャネルを閉じる（以降の呼び出しでは作り直す）"""
+        clients, self._clients = self._clients, []
+        for client in clients:
+            await client.transport.close()
+
+    async def __aenter__(self) -> "AsyncFeatureStoreClient":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    async def _read_feature_values(
+        self, pool_id: str, feature_ids: List[str]
+    ) -> Tuple[Dict[str, float], Optional[float]]:
+        client = self._client()
+        gapic_retry = retry_async.AsyncRetry(predicate=retry.if_exception_type(*_TRANSIENT_ERRORS), **_RETRY_SETTINGS)
+        async with self._in_flight:
+            response = await client.read_feature_values(
+                request=_read_request(self.config, pool_id, feature_ids), retry=gapic_retry
             )
+        return _parse_response(response)
 
-            for resp in stream:
-                results[resp.entity_id] = _parse_entity_view(resp.entity_view, resp.header)
+    async def read_features(
+        self, pool_id: str, feature_ids: List[str], default_value: Optional[float] = None
+    ) -> Dict[str, float]:
+        """read_features の asyncio 版"""
+        masked = pool_id[:6] + "..."
 
-        except Exception as e:
-            logger.error("streaming_read_feature_values failed: %s", e)
-            # フォールバックで個別読み取り
-            for pid in batch_pool_ids:
-                results[pid] = read_features(pid, feature_ids)
+        def load() -> Awaitable[Tuple[Dict[str, float], Optional[float]]]:
+            return self._read_feature_values(pool_id, feature_ids)
 
-    return results
+        try:
+            if self.cache is not None:
+                features = await self.cache.aget((pool_id, tuple(feature_ids)), load)
+            else:
+                features, _ = await load()
+        except Exception as e:
+            logger.error(f"Failed to read features for pool_id={masked}: {e}", exc_info=True)
+            features = {}
+
+        return _apply_defaults(features, pool_id, feature_ids, default_value)
+
+    async def _read_stream(
+        self, pool_ids: list[str], feature_ids: list[str], max_attempts: int
+    ) -> dict[str, dict[str, float]]:
+        attempt = 1
+        while True:
+            try:
+                client = self._client()
+                collector = _StreamCollector()
+                async with self._in_flight:
+                    stream = await client.streaming_read_feature_values(
+                        request=_streaming_request(self.config, pool_ids, feature_ids)
+                    )
+                    async for resp in stream:
+                        collector.add(resp)
+                return collector.results
+            except _TRANSIENT_ERRORS as e:
+                if attempt >= max_attempts:
+                    raise
+                delay = _stream_backoff(attempt)
+                logger.warning(f"streaming_read_feature_values failed ({e}) - retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def read_features_batch(
+        self, pool_ids: list[str], feature_ids: list[str], batch_size: int = 100, max_attempts: int = 3
+    ) -> dict[str, dict[str, float]]:
+        """read_features_batch の asyncio 版（全バッチを同時に投げ、同時実行数は max_in_flight で制限）"""
+        results: dict[str, dict[str, float]] = {}
+
+        async def read(batch: list[str]) -> None:
+            if len(batch) == 1:
+                results[batch[0]] = await self.read_features(batch[0], feature_ids)
+                return
+            try:
+                results.update(await self._read_stream(batch, feature_ids, max_attempts))
+            except _ENTITY_ERRORS as e:
+                logger.warning("streaming_read_feature_values failed for %d pools: %s - splitting", len(batch), e)
+                mid = len(batch) // 2
+                await asyncio.gather(read(batch[:mid]), read(batch[mid:]))
+            except Exception as e:
+                # 同期版と同じく、リトライ切れなどは分割せずにそのバッチを諦める
+                logger.error("streaming_read_feature_values failed for %d pools: %s", len(batch), e)
+
+        await asyncio.gather(*(read(pool_ids[i : i + batch_size]) for i in range(0, len(pool_ids), batch_size)))
+        return results
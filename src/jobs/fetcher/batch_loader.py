@@ -0,0 +1,171 @@
+"""
+GCS の raw オブジェクトをまとめて BigQuery にロードするバッチローダー
+
+取得ジョブ（LOAD_MODE=batch）はアップロードだけを行い（最初のアップロードの前にマニフェストへ
+ロード対象の開始時刻を記録する）、ローダーが flush 毎に
+raw/{protocol}/{date}/ の新しいオブジェクトを一覧して、テーブル毎に 1 つのロードジョブで取り込む。
+毎時・プロトコル毎にロードジョブを作らないため、ロードジョブのクォータを消費せず、キュー待ちも 1 回で済む。
+
+ロード済みの URI はマニフェスト（LoadManifest）に記録し、二重にロードしない:
+
+1. ジョブ id と URI を pending としてマニフェストに保存してからロードジョブを投入
+2. 完了したら loaded に移して保存
+3. 途中で落ちた場合、次回の flush で pending のジョブ id の状態を確認し、成功していれば loaded に移し、
+   失敗・未投入なら pending から外して再ロード対象に戻す
+
+マニフェストの保存は世代番号の前提条件付きのため、ローダーが並行して動いても同じ URI を二重に投入しない。
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from src.data.fetcher.sinks import split_compression
+from src.data.fetcher.state import LoadManifest, StateStore
+from src.data.fetcher.writers import OutputFormat
+
+logger = logging.getLogger(__name__)
+
+# BigQuery のロードジョブ 1 つあたりのソース URI 上限
+MAX_URIS_PER_JOB = 10_000
+
+# (protocol, fmt) → (テーブル id, LoadJobConfig)
+Destination = Callable[[str, OutputFormat], Tuple[str, Any]]
+
+
+def object_format(name: str) -> Optional[OutputFormat]:
+    """オブジェクト名から出力形式を判定する（アップロード途中のパートや対象外のファイルは None）"""
+    if ".parts-" in name:
+        return None
+    base, _ = split_compression(name)
+    if base.endswith(".jsonl"):
+        return "jsonl"
+    if base.endswith(".parquet"):
+        return "parquet"
+    return None
+
+
+def record_cutover(store: StateStore, protocol: str, clock: Callable[[], float] = time.time) -> LoadManifest:
+    """
+    マニフェストにロード対象の開始時刻（since）がなければ記録する
+
+    ローダーの初回 flush より前に LOAD_MODE=batch の取得ジョブがアップロードしたオブジェクトも
+    取り込まれるよう、取得ジョブは最初のアップロードの前にも呼ぶ。
+    """
+    from google.api_core.exceptions import PreconditionFailed
+
+    manifest = store.load(protocol)
+    if manifest.since is None:
+        # 初回: 以前からあるオブジェクトは直接ロード済みとみなす
+        manifest.since = clock()
+        try:
+            store.save(manifest)
+        except PreconditionFailed:
+            # ローダーや並行の取得ジョブが先に記録した
+            manifest = store.load(protocol)
+    return manifest
+
+
+class BatchLoader:
+    """
+    loader = BatchLoader(bq_client, storage_bucket, open_state_store(uri, state_cls=LoadManifest), destination)
+    loader.flush("uniswap")
+    """
+
+    def __init__(
+        self,
+        bq: Any,
+        bucket: Any,
+        store: StateStore,
+        destination: Destination,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.bq = bq
+        self.bucket = bucket
+        self.store = store
+        self.destination = destination
+        self._clock = clock
+
+    def _manifest(self, protocol: str) -> LoadManifest:
+        return record_cutover(self.store, protocol, self._clock)
+
+    def _resolve_pending(self, manifest: LoadManifest) -> None:
+        """前回の flush で完了を確認できなかったロードジョブの結果を反映する"""
+        from google.api_core.exceptions import GoogleAPICallError, NotFound
+
+        if not manifest.pending:
+            return
+        for job_id in list(manifest.pending):
+            try:
+                job = self.bq.get_job(job_id)
+            except NotFound:
+                # マニフェストの保存後、投入前に落ちた
+                logger.warning("load job %s was never submitted - reloading its files", job_id)
+                manifest.pending.pop(job_id)
+                continue
+            try:
+                job.result()
+            except GoogleAPICallError:
+                if job.error_result is None:
+                    raise  # ジョブの失敗ではなく問い合わせの失敗。次回確認し直す
+                logger.warning("load job %s failed (%s) - reloading its files", job_id, job.error_result)
+                manifest.pending.pop(job_id)
+                continue
+            manifest.complete(job_id)
+        self.store.save(manifest)
+
+    def discover(self, manifest: LoadManifest, lookback_days: int = 1) -> Dict[OutputFormat, List[str]]:
+        """直近 lookback_days 日（+ 当日）の未ロードのオブジェクトを形式毎に返す"""
+        today = datetime.fromtimestamp(self._clock(), tz=timezone.utc).date()
+        dates = [(today - timedelta(days=d)).isoformat() for d in range(lookback_days, -1, -1)]
+        known = manifest.known()
+        prefix = f"gs://{self.bucket.name}/raw/{manifest.protocol}/"
+        # 対象期間を過ぎた URI は一覧に現れないのでマニフェストから外す
+        manifest.forget([uri for uri in manifest.loaded if uri[len(prefix) :].split("/")[0] < dates[0]])
+
+        found: Dict[OutputFormat, List[str]] = {}
+        for date in dates:
+            for blob in self.bucket.list_blobs(prefix=f"raw/{manifest.protocol}/{date}/"):
+                fmt = object_format(blob.name)
+                if fmt is None or blob.time_created.timestamp() < manifest.since:
+                    continue
+                uri = f"gs://{self.bucket.name}/{blob.name}"
+                if uri not in known:
+                    found.setdefault(fmt, []).append(uri)
+        return found
+
+    def load_uris(self, protocol: str, uris: Iterable[str], fmt: OutputFormat) -> int:
+        """マニフェストにない URI だけをロードし、ロードした件数を返す"""
+        manifest = self._manifest(protocol)
+        self._resolve_pending(manifest)
+        return self._load(manifest, fmt, uris)
+
+    def _load(self, manifest: LoadManifest, fmt: OutputFormat, uris: Iterable[str]) -> int:
+        known = manifest.known()
+        uris = sorted(set(uris) - known)
+        table, job_config = self.destination(manifest.protocol, fmt)
+        for i in range(0, len(uris), MAX_URIS_PER_JOB):
+            chunk = uris[i : i + MAX_URIS_PER_JOB]
+            job_id = f"pool_hourly_{manifest.protocol}_{fmt}_{uuid4().hex}"
+            manifest.reserve(job_id, chunk)
+            self.store.save(manifest)
+            # 失敗時は pending のまま残し、次回の flush でジョブの状態を確認する
+            job = self.bq.load_table_from_uri(chunk, table, job_id=job_id, job_config=job_config)
+            job.result()
+            manifest.complete(job_id)
+            self.store.save(manifest)
+            logger.info("loaded %s files (%s rows) into %s", len(chunk), job.output_rows, table)
+        return len(uris)
+
+    def flush(self, protocol: str, lookback_days: int = 1) -> int:
+        """未ロードのオブジェクトをテーブル毎に 1 ジョブでロードし、ロードしたファイル数を返す"""
+        manifest = self._manifest(protocol)
+        self._resolve_pending(manifest)
+        found = self.discover(manifest, lookback_days)
+        loaded = sum(self._load(manifest, fmt, uris) for fmt, uris in sorted(found.items()))
+        if not loaded:
+            self.store.save(manifest)  # forget した分を反映
+            logger.info("nothing to load: protocol=%s", protocol)
+        return loaded
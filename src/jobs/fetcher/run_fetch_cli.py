@@ -1,59 +1,96 @@
 """
 Cloud Run Job から環境変数で渡されたパラメータを読み取り、fetch → GCS → BigQuery を実行します
+
+--start/--end を指定した場合は期間をシャードに分割してバックフィルします:
+    python -m src.jobs.fetcher.run_fetch_cli --start 2024-07-01 --end 2024-10-01 --shard day --workers 8 --load
+
+OUTPUT_FORMAT=parquet（バックフィルは --format parquet）で型付き Parquet を出力し、
+pool_hourly_{protocol}_v3_typed テーブルにロードします。
+
+FETCH_STATE_URI（ローカルディレクトリまたは gs://bucket/prefix）を指定すると増分取得になり、
+ロード済みの区間は取得せず、直近 CATCH_UP_HOURS 時間（既定 1）の未取得区間だけを取得します。
+アップロード済みでロードに失敗した区間は、再実行時に再取得せずロードだけやり直します。
+
+取得結果はローカルに保存せず、取得と並行して GCS へ直接アップロードします（パート毎の並列アップロード
+→ compose）。JSONL は UPLOAD_COMPRESSION（none | gzip、既定 gzip）で圧縮します。
+STREAM_UPLOAD=0 で従来どおり一時ファイルに書いてからアップロードします。
+
+LOAD_MODE=batch では取得ジョブはアップロードだけを行い、BigQuery へのロードはバッチローダーが
+まとめて行います（--flush-loads、PROTOCOLS のプロトコル毎・テーブル毎に 1 ジョブ）:
+    python -m src.jobs.fetcher.run_fetch_cli --flush-loads --flush-interval 900
+ロード済みのファイルは LOAD_MANIFEST_URI（既定 gs://RAW_BUCKET/_manifests）のマニフェストに記録します。
+
+INGEST_MODE=storage_write では GCS・ロードジョブを経由せず、Storage Write API で RAW テーブルに直接書き込みます
+（WRITE_STREAM_MODE: pending | committed、既定 pending）。ARCHIVE_TO_GCS=1（既定）なら同じ行を
+gs://RAW_BUCKET/archive/ にも保存します（raw/ ではないためバッチローダーの対象になりません）。
+
+--poll では現在の 1 時間分を --poll-interval 分毎に取得し直し、変化した行だけを POLL_OUTPUT
+（既定 gs://RAW_BUCKET/live/{protocol}/{date}/{poll_ts}.jsonl.gz、bq://project.dataset.table も可）に書き出します:
+    python -m src.jobs.fetcher.run_fetch_cli --poll --poll-interval 5
+ポーリング中に protocols.yml が更新されると、次の回からフェッチャーを組み直して新しい設定で取得します。
 """
 
+import argparse
 import logging
 import os
 import tempfile
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
 from uuid import uuid4
 
-from google.api_core.exceptions import PreconditionFailed
-from google.cloud import bigquery, storage
-from google.cloud.bigquery import SchemaField
+from src.data.fetcher.backfill import Checkpoint, parse_utc_hour, run_backfill
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.config import protocol_config_cache, reload_protocol_config
+from src.data.fetcher.poller import HourPoller, writer_emitter
+from src.data.fetcher.run_fetch import build_fetcher, fetch_pool_data  # noqa: E402
+from src.data.fetcher.sinks import Compression, OutputExistsError, compression_suffix
+from src.data.fetcher.state import LoadManifest, StateStore, open_state_store
+from src.data.fetcher.writers import OutputFormat, output_suffix
+from src.jobs.fetcher.batch_loader import BatchLoader, record_cutover
 
-from src.data.fetcher.run_fetch import fetch_pool_data  # noqa: E402
+if TYPE_CHECKING:
+    from google.cloud import bigquery
 
 logger = logging.getLogger(__name__)
 
 
-def main() -> None:
-    project_id = os.environ["PROJECT_ID"]
-    env_suffix = os.environ["ENV_SUFFIX"]
-    protocol = os.environ["PROTOCOL"]  # "uniswap" | "sushiswap"
-    bucket = os.environ["RAW_BUCKET"]
-    interval_iso = (
-        os.getenv("INTERVAL_END_ISO")
-        or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0).isoformat()
-    )
-    dataset_prefix = os.getenv("DATASET_PREFIX", "dex")
+def _upload(project_id: str, bucket: str, local_file: str, gcs_path: str) -> bool:
+    """GCS にアップロードする。同名オブジェクトが既にあれば False"""
+    from google.api_core.exceptions import PreconditionFailed
+    from google.cloud import storage
 
-    logger.info("job started: protocol=%s", protocol)
-    # fetch → tmp JSONL
-    with tempfile.TemporaryDirectory() as tmp:
-        local_file = f"{tmp}/{protocol}_{interval_iso}.jsonl"
-        fetch_pool_data(protocol, local_file, interval_iso)
+    blob = storage.Client(project=project_id).bucket(bucket).blob(gcs_path)
+    try:
+        blob.upload_from_filename(local_file, if_generation_match=0)
+        logger.info("uploaded gs://%s/%s", bucket, gcs_path)
+        return True
+    except PreconditionFailed:
+        logger.info("%s already exists - skipped", gcs_path)
+        return False
 
-        unique_id = uuid4().hex  # 32 桁
-        gcs_path = (
-            f"raw/{protocol}/{interval_iso[:10]}/{os.path.splitext(os.path.basename(local_file))[0]}_{unique_id}.jsonl"
-        )
-        blob = storage.Client(project=project_id).bucket(bucket).blob(gcs_path)
-        try:
-            blob.upload_from_filename(local_file, if_generation_match=0)
-            logger.info("uploaded gs://%s/%s", bucket, gcs_path)
-        except PreconditionFailed:
-            logger.info("%s already exists - skipped", gcs_path)
-            return
 
-    # BigQuery RAW dataset にロード
-    bq = bigquery.Client(project=project_id)
-    ds = f"{dataset_prefix}_raw_{env_suffix}"
-    tbl = f"{project_id}.{ds}.pool_hourly_{protocol}_v3"
+def _parquet_job_config() -> "bigquery.LoadJobConfig":
+    from google.cloud import bigquery
+
+    # Parquet は自己記述的なのでスキーマ指定不要。初回ロード時にテーブルを作成する
+    return bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition="WRITE_APPEND",
+        create_disposition="CREATE_IF_NEEDED",
+        time_partitioning=bigquery.TimePartitioning(type_=bigquery.TimePartitioningType.HOUR, field="hour_ts"),
+        clustering_fields=["pool_id", "dex_protocol"],
+    )
+
+
+def _json_job_config() -> "bigquery.LoadJobConfig":
+    from google.cloud import bigquery
+    from google.cloud.bigquery import SchemaField
 
     # BigQuery に既存テーブル (dex_raw_*) があるため
     # 自動検出ではなく raw(JSON) 1 カラムに固定してロード
-    job_config = bigquery.LoadJobConfig(
+    return bigquery.LoadJobConfig(
         source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
         schema=[
             SchemaField("raw", "JSON", mode="REQUIRED"),
@@ -66,10 +103,353 @@ def main() -> None:
         ignore_unknown_values=True,  # 将来の余分カラム無視
     )
 
-    job = bq.load_table_from_uri(f"gs://{bucket}/{gcs_path}", tbl, job_config=job_config)
+
+def _destination(
+    project_id: str, env_suffix: str, dataset_prefix: str, protocol: str, fmt: OutputFormat = "jsonl"
+) -> tuple[str, "bigquery.LoadJobConfig"]:
+    """ロード先のテーブル id とジョブ設定"""
+    ds = f"{dataset_prefix}_raw_{env_suffix}"
+    tbl = f"{project_id}.{ds}.pool_hourly_{protocol}_v3"
+    if fmt == "parquet":
+        # 型付き列は raw(JSON) テーブルとは別テーブルに格納
+        return f"{tbl}_typed", _parquet_job_config()
+    return tbl, _json_job_config()
+
+
+def _load(
+    project_id: str,
+    env_suffix: str,
+    dataset_prefix: str,
+    protocol: str,
+    uris: list[str],
+    fmt: OutputFormat = "jsonl",
+) -> None:
+    """BigQuery RAW dataset にロード（複数 URI は 1 ジョブにまとめる）"""
+    from google.cloud import bigquery
+
+    bq = bigquery.Client(project=project_id)
+    tbl, job_config = _destination(project_id, env_suffix, dataset_prefix, protocol, fmt)
+    job = bq.load_table_from_uri(uris, tbl, job_config=job_config)
     job.result()
     logger.info("loaded %s rows into %s", job.output_rows, tbl)
 
 
+def _batch_mode() -> bool:
+    return os.getenv("LOAD_MODE", "direct") == "batch"
+
+
+def _manifest_store(project_id: str, bucket: str) -> StateStore:
+    manifest_uri = os.getenv("LOAD_MANIFEST_URI") or f"gs://{bucket}/_manifests"
+    return open_state_store(manifest_uri, project=project_id, state_cls=LoadManifest)
+
+
+def _batch_loader(project_id: str, env_suffix: str, dataset_prefix: str, bucket: str) -> BatchLoader:
+    from google.cloud import bigquery, storage
+
+    return BatchLoader(
+        bigquery.Client(project=project_id),
+        storage.Client(project=project_id).bucket(bucket),
+        _manifest_store(project_id, bucket),
+        lambda protocol, fmt: _destination(project_id, env_suffix, dataset_prefix, protocol, fmt),
+    )
+
+
+def flush_loads(args: argparse.Namespace) -> None:
+    """未ロードのオブジェクトをまとめてロードする（--flush-interval 秒毎に繰り返す）"""
+    project_id = os.environ["PROJECT_ID"]
+    protocols = os.getenv("PROTOCOLS", os.getenv("PROTOCOL", "")).split(",")
+    loader = _batch_loader(
+        project_id, os.environ["ENV_SUFFIX"], os.getenv("DATASET_PREFIX", "dex"), os.environ["RAW_BUCKET"]
+    )
+    while True:
+        started = time.monotonic()
+        for protocol in filter(None, (p.strip() for p in protocols)):
+            loader.flush(protocol, args.lookback_days)
+        if not args.flush_interval:
+            return
+        time.sleep(max(0.0, args.flush_interval - (time.monotonic() - started)))
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DEX pool hourly fetcher")
+    parser.add_argument("--start", help="バックフィル開始 (UTC, 例: 2024-07-01)")
+    parser.add_argument("--end", help="バックフィル終了 (UTC, 排他)")
+    parser.add_argument("--shard", choices=["hour", "day"], default="day", help="シャード単位")
+    parser.add_argument("--workers", type=int, default=8, help="同時に取得するシャード数")
+    parser.add_argument("--output-dir", default="./data/backfill", help="シャード出力とチェックポイントの保存先")
+    parser.add_argument("--load", action="store_true", help="取得後に GCS へアップロードし BigQuery にロード")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="シャードの出力形式")
+    parser.add_argument("--flush-loads", action="store_true", help="未ロードの GCS オブジェクトをまとめてロード")
+    parser.add_argument("--flush-interval", type=int, default=0, help="flush を繰り返す間隔（秒, 0 = 1 回のみ）")
+    parser.add_argument("--lookback-days", type=int, default=1, help="flush で一覧する過去の日数（当日に加えて）")
+    parser.add_argument("--poll", action="store_true", help="現在の 1 時間分をポーリングし、変化した行を書き出す")
+    parser.add_argument("--poll-interval", type=float, default=5, help="ポーリング間隔（分）")
+    parser.add_argument("--max-polls", type=int, help="ポーリング回数の上限（未指定なら停止されるまで）")
+    args = parser.parse_args(argv)
+    if bool(args.start) != bool(args.end):
+        parser.error("--start and --end must be given together")
+    return args
+
+
+def _fetcher_refresher(protocol: str, on_rebuild: Callable[[BaseFetcher], None]) -> Callable[[], Optional[BaseFetcher]]:
+    """
+    protocols.yml が更新されていればフェッチャーを組み直して返す関数（変化がなければ None）
+
+    組み直すかどうかは今のフェッチャーを組んだ設定の版と比べて決めるため、組み直しに失敗した版
+    （新しく参照した環境変数が未設定など）は成功するまで次の呼び出しでもやり直す。
+    """
+    reload_protocol_config()
+    built = protocol_config_cache().version
+
+    def refresh() -> Optional[BaseFetcher]:
+        nonlocal built
+        reload_protocol_config()
+        version = protocol_config_cache().version
+        if version == built:
+            return None
+        fetcher = build_fetcher(protocol)
+        try:
+            on_rebuild(fetcher)
+        except Exception:
+            fetcher.close()
+            raise
+        built = version
+        return fetcher
+
+    return refresh
+
+
+def poll(args: argparse.Namespace) -> None:
+    """現在の 1 時間分を繰り返し取得し、内容が変わった行だけを書き出す"""
+    protocol = os.environ["PROTOCOL"]
+    output = (
+        os.getenv("POLL_OUTPUT") or f"gs://{os.environ['RAW_BUCKET']}/live/{{protocol}}/{{date}}/{{poll_ts}}.jsonl.gz"
+    )
+    # 書き込んだ行をすぐに見せるため、Storage Write API は committed ストリームを使う
+    sink_options = {"mode": "committed"} if output.startswith("bq://") else {}
+
+    def rebuild_emitter(fetcher: BaseFetcher) -> None:
+        poller.emit = writer_emitter(fetcher, output, **sink_options)
+
+    # protocols.yml が更新されていればフェッチャー（と書き出し先）を組み直す
+    refresh = _fetcher_refresher(protocol, rebuild_emitter)
+    fetcher = build_fetcher(protocol)
+    poller = HourPoller(
+        fetcher, writer_emitter(fetcher, output, **sink_options), interval_s=args.poll_interval * 60, refresh=refresh
+    )
+    try:
+        poller.run(args.max_polls)
+    finally:
+        poller.fetcher.close()
+    logger.info("polling finished: %s", dict(poller.metrics))
+
+
+def backfill(args: argparse.Namespace) -> None:
+    protocol = os.environ["PROTOCOL"]
+    results = run_backfill(
+        protocol,
+        parse_utc_hour(args.start),
+        parse_utc_hour(args.end),
+        args.output_dir,
+        unit=args.shard,
+        workers=args.workers,
+        fmt=args.format,
+    )
+    if not args.load:
+        return
+
+    project_id = os.environ["PROJECT_ID"]
+    bucket = os.environ["RAW_BUCKET"]
+    # オブジェクト名を決定的にし、再実行時は if_generation_match=0 で二重アップロードを防ぐ
+    loaded = Checkpoint(Path(args.output_dir) / protocol / "_loaded.json")
+    to_load = [s for s in results if not loaded.is_done(s)]
+    uris = []
+    for shard in to_load:
+        local_file = results[shard]
+        gcs_path = f"raw/{protocol}/{shard.date}/{os.path.basename(local_file)}"
+        _upload(project_id, bucket, local_file, gcs_path)
+        uris.append(f"gs://{bucket}/{gcs_path}")
+    if not uris:
+        logger.info("nothing to load")
+        return
+
+    env_suffix, dataset_prefix = os.environ["ENV_SUFFIX"], os.getenv("DATASET_PREFIX", "dex")
+    if _batch_mode():
+        # バッチローダーと同じマニフェストを通し、flush と重なっても二重にロードしない
+        _batch_loader(project_id, env_suffix, dataset_prefix, bucket).load_uris(protocol, uris, args.format)
+    else:
+        _load(project_id, env_suffix, dataset_prefix, protocol, uris, args.format)
+    for shard in to_load:
+        loaded.mark_done(shard)
+
+
+def _upload_compression(fmt: OutputFormat) -> Compression:
+    # BigQuery がロードできる圧縮は gzip のみ。Parquet は列毎に圧縮済み
+    if fmt == "parquet":
+        return "none"
+    compression = os.getenv("UPLOAD_COMPRESSION", "gzip")
+    if compression not in ("none", "gzip"):
+        raise ValueError(f"UPLOAD_COMPRESSION must be none or gzip: {compression}")
+    return compression
+
+
+def _fetch_and_upload(
+    project_id: str, bucket: str, protocol: str, interval_iso: str, fmt: OutputFormat, hours: int = 1
+) -> str | None:
+    """[interval_iso - hours, interval_iso) を取得して GCS にアップロードし、URI を返す（既存なら None）"""
+    unique_id = uuid4().hex  # 32 桁
+    if os.getenv("STREAM_UPLOAD", "1") != "0":
+        suffix = output_suffix(fmt) + compression_suffix(_upload_compression(fmt))
+        uri = f"gs://{bucket}/raw/{protocol}/{interval_iso[:10]}/{protocol}_{interval_iso}_{unique_id}{suffix}"
+        try:
+            fetch_pool_data(protocol, uri, interval_iso, hours)
+        except OutputExistsError:
+            logger.info("%s already exists - skipped", uri)
+            return None
+        return uri
+
+    suffix = output_suffix(fmt)
+    # fetch → tmp JSONL / Parquet
+    with tempfile.TemporaryDirectory() as tmp:
+        local_file = f"{tmp}/{protocol}_{interval_iso}{suffix}"
+        fetch_pool_data(protocol, local_file, interval_iso, hours)
+
+        stem = os.path.splitext(os.path.basename(local_file))[0]
+        gcs_path = f"raw/{protocol}/{interval_iso[:10]}/{stem}_{unique_id}{suffix}"
+        if not _upload(project_id, bucket, local_file, gcs_path):
+            return None
+    return f"gs://{bucket}/{gcs_path}"
+
+
+def _stream_to_bigquery(
+    project_id: str, env_suffix: str, dataset_prefix: str, protocol: str, bucket: str, interval_iso: str, hours: int = 1
+) -> int:
+    """[interval_iso - hours, interval_iso) を Storage Write API で RAW テーブルに書き込み、行数を返す"""
+    table, _ = _destination(project_id, env_suffix, dataset_prefix, protocol)
+    with build_fetcher(protocol) as fetcher:
+        archive = None
+        if os.getenv("ARCHIVE_TO_GCS", "1") != "0":
+            name = f"{protocol}_{interval_iso}_{uuid4().hex}.jsonl.gz"
+            archive = fetcher.open_writer(f"gs://{bucket}/archive/{protocol}/{interval_iso[:10]}/{name}")
+        return fetcher.run(
+            f"bq://{table}", interval_iso, hours, mode=os.getenv("WRITE_STREAM_MODE", "pending"), archive=archive
+        )
+
+
+def incremental(
+    project_id: str,
+    env_suffix: str,
+    dataset_prefix: str,
+    protocol: str,
+    bucket: str,
+    interval_iso: str,
+    fmt: OutputFormat,
+    state_uri: str,
+    catch_up_hours: int = 1,
+    defer_load: bool = False,
+    stream_rows: bool = False,
+) -> None:
+    """
+    状態ストアを参照し、未ロードの区間だけを fetch → GCS → BigQuery する
+
+    defer_load=True（LOAD_MODE=batch）ではアップロードまでで完了とし、ロードはバッチローダーに任せる。
+    stream_rows=True（INGEST_MODE=storage_write）では Storage Write API のコミットで完了とする
+    """
+    store = open_state_store(state_uri, project=project_id)
+    state = store.load(protocol)
+    end = parse_utc_hour(interval_iso)
+    start = end - timedelta(hours=catch_up_hours)
+
+    # 前回アップロード済みでロードに失敗した区間はロードだけやり直す
+    for interval, uri in sorted(state.pending.items()):
+        _load(project_id, env_suffix, dataset_prefix, protocol, [uri], fmt)
+        state.mark_done(interval)
+        store.save(state)
+
+    gaps = state.gaps(int(start.timestamp()), int(end.timestamp()))
+    if not gaps:
+        logger.info("up to date: protocol=%s high_water=%s", protocol, state.high_water)
+        return
+    if defer_load:
+        # ローダーの初回 flush より前のアップロードもロード対象にする
+        record_cutover(_manifest_store(project_id, bucket), protocol)
+    for gap in gaps:
+        gap_end = datetime.fromtimestamp(gap[1], tz=timezone.utc).isoformat()
+        if stream_rows:
+            hours = (gap[1] - gap[0]) // 3600
+            _stream_to_bigquery(project_id, env_suffix, dataset_prefix, protocol, bucket, gap_end, hours)
+            state.mark_done(gap)
+            store.save(state)
+            continue
+        uri = _fetch_and_upload(project_id, bucket, protocol, gap_end, fmt, hours=(gap[1] - gap[0]) // 3600)
+        if uri is None:
+            continue
+        if defer_load:
+            state.mark_done(gap)
+            store.save(state)
+            continue
+        state.mark_uploaded(gap, uri)
+        store.save(state)
+        _load(project_id, env_suffix, dataset_prefix, protocol, [uri], fmt)
+        state.mark_done(gap)
+        store.save(state)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    if args.flush_loads:
+        flush_loads(args)
+        return
+    if args.poll:
+        poll(args)
+        return
+    if args.start:
+        backfill(args)
+        return
+
+    project_id = os.environ["PROJECT_ID"]
+    env_suffix = os.environ["ENV_SUFFIX"]
+    protocol = os.environ["PROTOCOL"]  # "uniswap" | "sushiswap"
+    bucket = os.environ["RAW_BUCKET"]
+    interval_iso = (
+        os.getenv("INTERVAL_END_ISO")
+        or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0).isoformat()
+    )
+    dataset_prefix = os.getenv("DATASET_PREFIX", "dex")
+    fmt: OutputFormat = os.getenv("OUTPUT_FORMAT", "jsonl")  # "jsonl" | "parquet"
+
+    stream_rows = os.getenv("INGEST_MODE", "load") == "storage_write"
+    if stream_rows and fmt != "jsonl":
+        raise ValueError("INGEST_MODE=storage_write writes the raw(JSON) table - OUTPUT_FORMAT must be jsonl")
+
+    logger.info("job started: protocol=%s format=%s", protocol, fmt)
+    if state_uri := os.getenv("FETCH_STATE_URI"):
+        catch_up_hours = int(os.getenv("CATCH_UP_HOURS", "1"))
+        incremental(
+            project_id,
+            env_suffix,
+            dataset_prefix,
+            protocol,
+            bucket,
+            interval_iso,
+            fmt,
+            state_uri,
+            catch_up_hours,
+            defer_load=_batch_mode(),
+            stream_rows=stream_rows,
+        )
+        return
+
+    if stream_rows:
+        _stream_to_bigquery(project_id, env_suffix, dataset_prefix, protocol, bucket, interval_iso)
+        return
+    if _batch_mode():
+        record_cutover(_manifest_store(project_id, bucket), protocol)
+    uri = _fetch_and_upload(project_id, bucket, protocol, interval_iso, fmt)
+    if uri is None or _batch_mode():
+        return
+    _load(project_id, env_suffix, dataset_prefix, protocol, [uri], fmt)
+
+
 if __name__ == "__main__":
     main()
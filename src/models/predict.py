@@ -5,7 +5,7 @@ from functools import lru_cache
 import joblib
 import numpy as np
 
-from src.features.feature_store_client import read_features
+from src.features.feature_store_client import read_feature_matrix
 
 FEATURE_LIST = [
     "volume_usd",
@@ -55,10 +55,10 @@ def predict_from_feature_store(
     """
     try:
         # Feature Storeから特徴量取得
-        features = read_features(pool_id, FEATURE_LIST, default_value=default_feature_value)
-
-        # 特徴量ベクトルを構築（順序を保証）
-        feature_vector = np.array([features.get(fname, default_feature_value) for fname in FEATURE_LIST]).reshape(1, -1)
+        # （FEATURE_LIST の順に並んだ (1, 特徴量数) の行列。欠損位置は default_feature_value）
+        matrix = read_feature_matrix([pool_id], FEATURE_LIST, default_value=default_feature_value)
+        feature_vector = matrix.values
+        features_used = int(np.count_nonzero(~matrix.missing))
 
         # モデル取得と予測
         model = get_model()
@@ -73,8 +73,8 @@ def predict_from_feature_store(
             "score": score,
             "is_anomaly": is_anomaly,
             "threshold": threshold,
-            "features_used": len(features),
-            "features_missing": len(FEATURE_LIST) - len(features),
+            "features_used": features_used,
+            "features_missing": len(FEATURE_LIST) - features_used,
         }
 
         logger.info(f"Prediction for pool_id '{pool_id}': score={score:.4f}, is_anomaly={is_anomaly}")
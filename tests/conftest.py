@@ -7,13 +7,17 @@ import pytest
 def clear_caches():
     """各テスト前後でキャッシュをクリア"""
     # 循環参照を避けるためここでインポート
-    from src.features.feature_store_client import _get_client, _get_config
+    from src.data.fetcher.config import clear_config_cache
+    from src.features.feature_store_client import _coalescer, _get_cache, _get_client, _get_config
     from src.models.predict import get_model
 
     # テスト前にクリア
     get_model.cache_clear()
     _get_client.cache_clear()
     _get_config.cache_clear()
+    _get_cache.cache_clear()
+    _coalescer.cache_clear()
+    clear_config_cache()
 
     yield
 
@@ -21,6 +25,9 @@ def clear_caches():
     get_model.cache_clear()
     _get_client.cache_clear()
     _get_config.cache_clear()
+    _get_cache.cache_clear()
+    _coalescer.cache_clear()
+    clear_config_cache()
 
 
 @pytest.fixture
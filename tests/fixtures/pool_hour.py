@@ -0,0 +1,33 @@
+"""フェッチャーテスト用の poolHourData 生成"""
+
+
+def pool_hour(i: int, period_start: int = 1728000000, pool_id: str | None = None) -> dict:
+    """The Graph の poolHourData と同じ形（数値は文字列）の 1 行"""
+    pool_id = pool_id or f"0xpool{i:04d}"
+    return {
+        "id": f"{pool_id}-{period_start // 3600}",
+        "periodStartUnix": period_start,
+        "pool": {
+            "id": pool_id,
+            "token0": {"id": "0xweth", "symbol": "WETH", "name": "Wrapped Ether", "decimals": "18"},
+            "token1": {"id": "0xusdc", "symbol": "USDC", "name": "USD Coin", "decimals": "6"},
+            "feeTier": "3000",
+        },
+        "liquidity": "1234567890123456789012345678901234567890",
+        "sqrtPrice": "1461446703485210103287273052203988822378723970341",
+        "token0Price": "2500.123456789012345678",
+        "token1Price": "0.000399980249",
+        "tick": "-201234",
+        "feeGrowthGlobal0X128": str(2**255 + i),
+        "feeGrowthGlobal1X128": "0",
+        "tvlUSD": "1000000.5",
+        "volumeToken0": "12.5",
+        "volumeToken1": "31250.25",
+        "volumeUSD": "31250.25",
+        "feesUSD": "93.75",
+        "txCount": "42",
+        "open": "2499.5",
+        "high": "2510",
+        "low": "2490",
+        "close": "2500.1",
+    }
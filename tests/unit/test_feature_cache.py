@@ -0,0 +1,124 @@
+import threading
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.features.feature_cache import FeatureCache
+from src.features.feature_store_client import _get_cache, read_features
+
+
+class _Loader:
+    """呼ばれた回数を数え、values の値を順に返す取得関数"""
+
+    def __init__(self, *values, feature_ts=None):
+        self.values = list(values)
+        self.feature_ts = feature_ts
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        value = self.values.pop(0) if len(self.values) > 1 else self.values[0]
+        self.done.set()
+        if isinstance(value, Exception):
+            raise value
+        return value, self.feature_ts
+
+
+@pytest.mark.unit
+def test_hits_until_ttl_and_evicts_least_recently_used():
+    """TTL 内はキャッシュから返し、maxsize を超えたら最も長く使われていないキーを捨てる"""
+    now = {"t": 0.0}
+    cache = FeatureCache(maxsize=2, ttl_s=60, stale_s=0, clock=lambda: now["t"])
+    a, b, c = _Loader({"v": 1.0}), _Loader({"v": 2.0}), _Loader({"v": 3.0})
+
+    assert cache.get("a", a) == {"v": 1.0}
+    cache.get("b", b)
+    cache.get("a", a)  # a を最近使ったことにする
+    cache.get("c", c)  # b が追い出される
+    assert (a.calls, b.calls, c.calls) == (1, 1, 1)
+    cache.get("b", b)
+    assert b.calls == 2 and len(cache) == 2
+
+    now["t"] = 61.0
+    cache.get("c", c)
+    assert c.calls == 2
+    assert cache.stats["hits"] == 1
+
+
+@pytest.mark.unit
+def test_stale_while_revalidate_and_errors():
+    """期限切れ直後は古い値を返して裏で取り直し、取得に失敗しても直前の値を返す"""
+    now = {"t": 0.0}
+    cache = FeatureCache(ttl_s=60, stale_s=120, clock=lambda: now["t"])
+    loader = _Loader({"v": 1.0}, {"v": 2.0})
+    cache.get("a", loader)
+
+    now["t"] = 90.0
+    loader.done.clear()
+    assert cache.get("a", loader) == {"v": 1.0}  # 古い値をすぐ返す
+    assert loader.done.wait(5)
+    cache.close()
+    assert cache.get("a", loader) == {"v": 2.0} and loader.calls == 2
+
+    now["t"] = 1000.0  # stale_s も過ぎたので同期で取り直すが、失敗したら直前の値
+    failing = _Loader(RuntimeError("unavailable"))
+    assert cache.get("a", failing) == {"v": 2.0}
+    with pytest.raises(RuntimeError):
+        cache.get("b", failing)
+
+
+@pytest.mark.unit
+def test_entries_live_for_ttl_and_newer_imports_advance_generation():
+    """取得から ttl_s までは特徴量のタイムスタンプに関係なく使い、新しい import の値を見たら世代を進める"""
+    now = {"t": 7200.0 + 3600 + 600}  # 2 時台の特徴量が 3:10 に import 済み
+    cache = FeatureCache(ttl_s=300, stale_s=0, period_s=3600, clock=lambda: now["t"])
+    loader = _Loader({"v": 1.0}, feature_ts=7200.0)
+    cache.get("a", loader)
+    now["t"] += 61
+    cache.get("a", loader)
+    now["t"] += 238  # 取得から 299 秒
+    cache.get("a", loader)
+    assert loader.calls == 1
+    now["t"] += 1
+    cache.get("a", loader)
+    assert loader.calls == 2
+
+    cache.invalidate("import-1")
+    cache.get("a", loader)
+    cache.invalidate("import-1")  # 同じマーカーでは破棄しない
+    cache.get("a", loader)
+    assert loader.calls == 3
+
+    # 別のプールで次の時間帯の特徴量（新しい import）を見たら、それより前の値は使わない
+    cache.get("b", _Loader({"v": 2.0}, feature_ts=7200.0 + 3600))  # 3 時台
+    assert len(cache) == 1
+    cache.get("a", loader)
+    assert loader.calls == 4
+
+
+@pytest.mark.unit
+@patch("src.features.feature_store_client._get_config")
+@patch("src.features.feature_store_client._get_client")
+def test_read_features_uses_cache(mock_client, mock_config):
+    """同じプール・特徴量の組は Feature Store に 1 回だけ問い合わせる（デフォルト値の補完は毎回）"""
+    mock_config.return_value.entity_type_path = "projects/test/locations/test/featurestores/test/entityTypes/test"
+    response = MagicMock()
+    response.header.feature_descriptors = [MagicMock(id="volume_usd"), MagicMock(id="tvl_usd")]
+    data = MagicMock()
+    data.value.double_value = 1000.0
+    data.value.metadata.generate_time = datetime(2024, 10, 1, 2, tzinfo=timezone.utc)
+    response.entity_view.data = [data, MagicMock(value=None)]
+    mock_client.return_value.read_feature_values.return_value = response
+
+    first = read_features("test_pool", ["volume_usd", "tvl_usd"], default_value=0.0)
+    first["volume_usd"] = -1.0  # 返した dict の変更はキャッシュに影響しない
+    second = read_features("test_pool", ["volume_usd", "tvl_usd"])
+    assert second == {"volume_usd": 1000.0}
+    assert mock_client.return_value.read_feature_values.call_count == 1
+
+    read_features("test_pool", ["volume_usd"])  # 特徴量の組が違えば別のキー
+    _get_cache().invalidate()
+    read_features("test_pool", ["volume_usd", "tvl_usd"])
+    assert mock_client.return_value.read_feature_values.call_count == 3
@@ -0,0 +1,153 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from google.api_core import exceptions as api_exceptions
+from google.cloud.aiplatform_v1 import types as fs_types
+
+from src.features.feature_coalescer import ReadCoalescer
+from src.features.feature_store_client import _coalescer, read_features
+
+ENTITY_TYPE_PATH = "projects/test/locations/test/featurestores/test/entityTypes/test"
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class _Backend:
+    """read_one / read_many の偽物。呼ばれたキーを記録し、release されるまで返さない"""
+
+    def __init__(self, batch_error=None, bad_keys=()):
+        self.batch_error = batch_error
+        self.bad_keys = set(bad_keys)
+        self.single = []
+        self.batches = []
+        self.release = threading.Event()
+
+    def read_one(self, key):
+        self.single.append(key)
+        self.release.wait(5)
+        if key in self.bad_keys:
+            raise ValueError(key)
+        return key.upper()
+
+    def read_many(self, keys):
+        self.batches.append(sorted(keys))
+        self.release.wait(5)
+        if self.batch_error is not None:
+            raise self.batch_error
+        return {key: key.upper() for key in keys}
+
+
+@pytest.mark.unit
+def test_coalesces_same_key_and_batches_distinct_keys():
+    """実行中のキーへの読み取りは結果を共有し、同時に届いた別のキーは 1 回の read_many にまとめる"""
+    backend = _Backend()
+    coalescer = ReadCoalescer(backend.read_one, backend.read_many, window_s=5.0, max_batch=3)
+
+    with ThreadPoolExecutor(8) as executor:
+        first = executor.submit(coalescer.read, "a")
+        _wait_until(lambda: coalescer.stats["reads"] == 1)
+        same = [executor.submit(coalescer.read, "a") for _ in range(3)]
+        _wait_until(lambda: coalescer.stats["coalesced"] == 3)
+        others = [executor.submit(coalescer.read, key) for key in ("b", "c")]  # 3 件揃ったらすぐ送る
+        _wait_until(lambda: backend.batches)
+        backend.release.set()
+        assert [f.result() for f in [first, *same, *others]] == ["A", "A", "A", "A", "B", "C"]
+
+    assert backend.batches == [["a", "b", "c"]] and backend.single == []
+
+    # 1 件だけなら read_one、終わったキーは新たに読む
+    coalescer.window_s = 0
+    assert coalescer.read("a") == "A" and backend.single == ["a"]
+
+
+@pytest.mark.unit
+def test_batch_split_error_falls_back_to_single_reads():
+    """read_many が split_errors で失敗したらキー毎に 1 回だけ read_one で読み直し、失敗はそのキーだけに返す"""
+    backend = _Backend(batch_error=api_exceptions.InvalidArgument("batch"), bad_keys={"b"})
+    coalescer = ReadCoalescer(
+        backend.read_one, backend.read_many, window_s=5.0, max_batch=2, split_errors=(api_exceptions.InvalidArgument,)
+    )
+
+    with ThreadPoolExecutor(4) as executor:
+        first = executor.submit(coalescer.read, "a")
+        _wait_until(lambda: coalescer.stats["reads"] == 1)
+        same = executor.submit(coalescer.read, "a")
+        _wait_until(lambda: coalescer.stats["coalesced"] == 1)
+        bad = executor.submit(coalescer.read, "b")
+        backend.release.set()
+        assert first.result() == "A" and same.result() == "A"
+        with pytest.raises(ValueError):
+            bad.result()
+
+    assert backend.batches == [["a", "b"]]
+    assert sorted(backend.single) == ["a", "b"]
+    assert coalescer.stats["fallbacks"] == 2
+
+
+@pytest.mark.unit
+def test_batch_other_error_is_returned_to_every_read():
+    """split_errors 以外の失敗は読み直さず、バッチの全キー（結果を待っていた読み取りも含む）に同じ例外を返す"""
+    backend = _Backend(batch_error=api_exceptions.ServiceUnavailable("down"))
+    coalescer = ReadCoalescer(
+        backend.read_one, backend.read_many, window_s=5.0, max_batch=2, split_errors=(api_exceptions.InvalidArgument,)
+    )
+
+    with ThreadPoolExecutor(4) as executor:
+        first = executor.submit(coalescer.read, "a")
+        _wait_until(lambda: coalescer.stats["reads"] == 1)
+        same = executor.submit(coalescer.read, "a")
+        _wait_until(lambda: coalescer.stats["coalesced"] == 1)
+        other = executor.submit(coalescer.read, "b")
+        backend.release.set()
+        for future in (first, same, other):
+            with pytest.raises(api_exceptions.ServiceUnavailable):
+                future.result()
+
+    assert backend.batches == [["a", "b"]] and backend.single == []
+    assert coalescer.stats["fallbacks"] == 0
+
+    # 失敗したキーは実行中から外れ、次の読み取りは新たに読む
+    backend.batch_error = None
+    coalescer.window_s = 0
+    assert coalescer.read("a") == "A" and backend.single == ["a"]
+
+
+@pytest.mark.unit
+@patch("src.features.feature_store_client._get_config")
+@patch("src.features.feature_store_client._get_client")
+def test_concurrent_read_features_share_one_stream(mock_client, mock_config, monkeypatch):
+    """キャッシュにないプールへの同時の read_features は 1 本のストリームで読む"""
+    monkeypatch.setenv("FEATURE_COALESCE_WINDOW_MS", "5000")
+    monkeypatch.setenv("FEATURE_COALESCE_MAX_BATCH", "3")
+    mock_config.return_value.entity_type_path = ENTITY_TYPE_PATH
+    client = mock_client.return_value
+    header = fs_types.ReadFeatureValuesResponse.Header(
+        feature_descriptors=[fs_types.ReadFeatureValuesResponse.FeatureDescriptor(id="volume_usd")]
+    )
+
+    def stream(request):
+        yield fs_types.ReadFeatureValuesResponse(header=header)
+        for pid in request.entity_ids:
+            if pid == "0x03":
+                continue  # 存在しないエンティティ
+            value = fs_types.FeatureValue(double_value=float(len(pid)))
+            data = [fs_types.ReadFeatureValuesResponse.EntityView.Data(value=value)]
+            yield fs_types.ReadFeatureValuesResponse(entity_view={"entity_id": pid, "data": data})
+
+    client.streaming_read_feature_values.side_effect = stream
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(lambda pid: read_features(pid, ["volume_usd"]), ["0x01", "0x02", "0x03"]))
+
+    assert results == [{"volume_usd": 4.0}, {"volume_usd": 4.0}, {}]
+    assert client.streaming_read_feature_values.call_count == 1
+    assert client.read_feature_values.call_count == 0
+    assert _coalescer(("volume_usd",)).stats["batches"] == 1
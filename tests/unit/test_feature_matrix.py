@@ -0,0 +1,87 @@
+import math
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from google.cloud.aiplatform_v1 import types as fs_types
+
+from src.features.feature_matrix import FeatureDecoder, FeatureMatrix
+from src.features.feature_store_client import read_feature_matrix
+
+ENTITY_TYPE_PATH = "projects/test/locations/test/featurestores/test/entityTypes/test"
+
+FEATURES = ["volume_usd", "tvl_usd", "tx_count"]
+
+
+def _header(feature_ids):
+    return fs_types.ReadFeatureValuesResponse.Header(
+        feature_descriptors=[fs_types.ReadFeatureValuesResponse.FeatureDescriptor(id=fid) for fid in feature_ids]
+    )
+
+
+def _entity_view(entity_id, values, generate_time=None):
+    """values の None は値なし（空の Data）"""
+    data = []
+    for value in values:
+        if value is None:
+            data.append(fs_types.ReadFeatureValuesResponse.EntityView.Data())
+            continue
+        kind = {int: "int64_value", float: "double_value", str: "string_value"}[type(value)]
+        feature_value = fs_types.FeatureValue(**{kind: value})
+        if generate_time is not None:
+            feature_value.metadata = fs_types.FeatureValue.Metadata(generate_time={"seconds": generate_time})
+        data.append(fs_types.ReadFeatureValuesResponse.EntityView.Data(value=feature_value))
+    return fs_types.ReadFeatureValuesResponse.EntityView(entity_id=entity_id, data=data)
+
+
+@pytest.mark.unit
+def test_decode_into_writes_values_and_missing_mask():
+    """ヘッダの並びで列を対応付け、数値以外・値なし・要求していない特徴量は欠損のまま"""
+    decoder = FeatureDecoder(FEATURES)
+    header = _header(["tx_count", "unknown", "volume_usd", "tvl_usd"])
+    columns = decoder.columns(header)
+    assert columns == [2, -1, 0, 1]
+    assert decoder.columns(_header(["tx_count", "unknown", "volume_usd", "tvl_usd"])) is columns
+
+    matrix = FeatureMatrix.empty(["0xa", "0xb"], FEATURES, default_value=0.0)
+    ts = decoder.decode_into(matrix, 1, _entity_view("0xb", [42, 9.0, None, "n/a"], generate_time=7200), columns)
+
+    assert ts == 7200.0
+    np.testing.assert_array_equal(matrix.values, [[0.0, 0.0, 0.0], [0.0, 0.0, 42.0]])
+    np.testing.assert_array_equal(matrix.missing, [[True, True, True], [True, True, False]])
+    assert matrix.to_dicts() == {"0xa": {}, "0xb": {"tx_count": 42.0}}
+
+
+@pytest.mark.unit
+@patch("src.features.feature_store_client._get_config")
+@patch("src.features.feature_store_client._get_client")
+def test_read_feature_matrix_from_streams_and_single_read(mock_client, mock_config):
+    """複数プールはストリームから、1 プールは read_feature_values から行列に書き込む"""
+    mock_config.return_value.entity_type_path = ENTITY_TYPE_PATH
+    client = mock_client.return_value
+
+    def stream(request):
+        yield fs_types.ReadFeatureValuesResponse(header=_header(FEATURES))
+        for i, pid in enumerate(request.entity_ids):
+            yield fs_types.ReadFeatureValuesResponse(entity_view=_entity_view(pid, [float(i), None, i]))
+
+    client.streaming_read_feature_values.side_effect = stream
+    matrix = read_feature_matrix(["0x01", "0x02", "0x03", "0x04"], FEATURES, batch_size=2)
+
+    assert matrix.values.shape == (4, 3) and matrix.values.dtype == np.float64
+    assert matrix.to_dicts() == {
+        "0x01": {"volume_usd": 0.0, "tx_count": 0.0},
+        "0x02": {"volume_usd": 1.0, "tx_count": 1.0},
+        "0x03": {"volume_usd": 0.0, "tx_count": 0.0},
+        "0x04": {"volume_usd": 1.0, "tx_count": 1.0},
+    }
+    assert math.isnan(matrix.values[0, 1])
+
+    client.read_feature_values.return_value = fs_types.ReadFeatureValuesResponse(
+        header=_header(FEATURES), entity_view=_entity_view("0x01", [5.0, 6.0, None])
+    )
+    single = read_feature_matrix(["0x01"], FEATURES, default_value=-1.0)
+    again = read_feature_matrix(["0x01"], FEATURES, default_value=-1.0)
+    np.testing.assert_array_equal(single.values, [[5.0, 6.0, -1.0]])
+    np.testing.assert_array_equal(again.missing, [[False, False, True]])
+    assert client.read_feature_values.call_count == 1  # 2 回目はキャッシュから
@@ -1,9 +1,19 @@
+import asyncio
 import os
+import threading
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable
 
-from src.features.feature_store_client import FeatureStoreConfig, read_features
+from src.features.feature_store_client import (
+    AsyncFeatureStoreClient,
+    FeatureStoreConfig,
+    read_features,
+    read_features_batch,
+)
+
+ENTITY_TYPE_PATH = "projects/test/locations/test/featurestores/test/entityTypes/test"
 
 
 @pytest.mark.unit
@@ -164,3 +174,163 @@ def test_read_features_without_default_value(mock_client, mock_config):
     # default_valueを指定しない
     result = read_features("test_pool", ["volume_usd"])
     assert "volume_usd" not in result  # キーが存在しないことを確認
+
+
+def _stream_responses(entity_ids):
+    """streaming_read_feature_values のレスポンス列（ヘッダは最初のレスポンスだけ）"""
+    yield MagicMock(
+        header=MagicMock(feature_descriptors=[MagicMock(id="volume_usd")]), entity_view=MagicMock(entity_id="")
+    )
+    for pid in entity_ids:
+        data = MagicMock()
+        data.value.double_value = float(len(pid))
+        yield MagicMock(header=MagicMock(feature_descriptors=[]), entity_view=MagicMock(entity_id=pid, data=[data]))
+
+
+class _StreamingClient:
+    """streaming_read_feature_values の偽物。同時に開いているストリーム数を記録する"""
+
+    def __init__(self, bad_pools=(), transient_failures=0, delay=0.05):
+        self.bad_pools = set(bad_pools)
+        self.transient_failures = transient_failures
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _start(self, request):
+        with self._lock:
+            self.calls.append(list(request.entity_ids))
+            if self.transient_failures:
+                self.transient_failures -= 1
+                raise ServiceUnavailable("busy")
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _finish(self, request):
+        with self._lock:
+            self.in_flight -= 1
+        if self.bad_pools & set(request.entity_ids):
+            raise InvalidArgument("bad entity id")
+        return _stream_responses(request.entity_ids)
+
+    def streaming_read_feature_values(self, request):
+        self._start(request)
+        threading.Event().wait(self.delay)  # time.sleep はテスト側で差し替えるため
+        yield from self._finish(request)
+
+
+@pytest.mark.unit
+@patch("src.features.feature_store_client._get_config")
+@patch("src.features.feature_store_client._get_client")
+def test_read_features_batch_runs_streams_concurrently(mock_client, mock_config):
+    """複数のストリームを並行して読み、一時的なエラーはバッチ毎にやり直す"""
+    mock_config.return_value.entity_type_path = ENTITY_TYPE_PATH
+    client = _StreamingClient(transient_failures=1)
+    mock_client.return_value = client
+    pool_ids = [f"0x{i:04d}" for i in range(40)]
+
+    with patch("src.features.feature_store_client.time.sleep"):
+        results = read_features_batch(pool_ids, ["volume_usd"], batch_size=10, max_concurrency=4)
+
+    assert set(results) == set(pool_ids)
+    assert results["0x0001"] == {"volume_usd": 6.0}
+    assert client.peak > 1
+    assert len(client.calls) == 5  # 4 バッチ + 再送 1 回
+
+
+@pytest.mark.unit
+@patch("src.features.feature_store_client.read_features")
+@patch("src.features.feature_store_client._get_config")
+@patch("src.features.feature_store_client._get_client")
+def test_read_features_batch_bisects_failed_batch(mock_client, mock_config, mock_read_features):
+    """失敗したバッチは半分ずつ読み直し、原因のプールだけを個別に読む"""
+    mock_config.return_value.entity_type_path = ENTITY_TYPE_PATH
+    client = _StreamingClient(bad_pools={"0x0005"}, delay=0)
+    mock_client.return_value = client
+    mock_read_features.return_value = {}
+    pool_ids = [f"0x{i:04d}" for i in range(8)]
+
+    results = read_features_batch(pool_ids, ["volume_usd"], batch_size=8)
+
+    assert set(results) == set(pool_ids) and results["0x0005"] == {}
+    assert [c.args[0] for c in mock_read_features.call_args_list] == ["0x0004", "0x0005"]
+    assert len(client.calls) == 5  # 8 → 4+4 → 2+2（失敗側のみ）→ 1 件ずつは個別読み取り
+
+
+@pytest.mark.unit
+@patch("src.features.feature_store_client.read_features")
+@patch("src.features.feature_store_client._get_config")
+@patch("src.features.feature_store_client._get_client")
+def test_read_features_batch_does_not_split_on_exhausted_retries(mock_client, mock_config, mock_read_features):
+    """一時的なエラーのリトライが尽きたバッチは分割せず、そのバッチのプールだけ結果から外す"""
+    mock_config.return_value.entity_type_path = ENTITY_TYPE_PATH
+    client = _StreamingClient(transient_failures=3, delay=0)
+    mock_client.return_value = client
+    pool_ids = [f"0x{i:04d}" for i in range(8)]
+
+    with patch("src.features.feature_store_client.time.sleep"):
+        results = read_features_batch(pool_ids, ["volume_usd"], batch_size=4, max_concurrency=1)
+
+    assert set(results) == set(pool_ids[4:])
+    assert len(client.calls) == 4  # 最初のバッチの 3 回 + 次のバッチ 1 回
+    mock_read_features.assert_not_called()
+
+
+class _AsyncStreamingClient(_StreamingClient):
+    """FeaturestoreOnlineServingServiceAsyncClient の偽物"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.closed = False
+        self.transport = MagicMock(close=self._close)
+
+    async def _close(self):
+        self.closed = True
+
+    async def read_feature_values(self, request, retry):
+        response = MagicMock()
+        response.header.feature_descriptors = [MagicMock(id="volume_usd")]
+        data = MagicMock()
+        data.value.double_value = 1.0
+        response.entity_view.data = [data]
+        return response
+
+    async def streaming_read_feature_values(self, request):
+        self._start(request)
+        await asyncio.sleep(self.delay)
+
+        async def stream():
+            for resp in self._finish(request):
+                yield resp
+
+        return stream()
+
+
+@pytest.mark.unit
+def test_async_client_keeps_streams_in_flight_on_one_loop():
+    """1 つのイベントループで複数のストリームを同時に読み、チャネルはラウンドロビンで使って close で閉じる"""
+    clients = []
+
+    def factory():
+        clients.append(_AsyncStreamingClient(bad_pools={"0x0003"}))
+        return clients[-1]
+
+    config = MagicMock(entity_type_path=ENTITY_TYPE_PATH)
+    pool_ids = [f"0x{i:04d}" for i in range(40)]
+
+    async def run():
+        async with AsyncFeatureStoreClient(config, channels=2, max_in_flight=8, client_factory=factory) as fs:
+            batch = await fs.read_features_batch(pool_ids, ["volume_usd"], batch_size=8)
+            single = await fs.read_features("0xabcd", ["volume_usd", "tvl_usd"], default_value=0.0)
+        return batch, single
+
+    batch, single = asyncio.run(run())
+
+    assert set(batch) == set(pool_ids)
+    assert batch["0x0001"] == {"volume_usd": 6.0}
+    assert batch["0x0003"] == {"volume_usd": 1.0}  # 失敗したバッチを切り分けて個別に読んだ
+    assert single == {"volume_usd": 1.0, "tvl_usd": 0.0}
+    assert len(clients) == 2 and all(c.calls for c in clients) and all(c.closed for c in clients)
+    assert sum(c.peak for c in clients) > 2
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.data.fetcher.backfill import Checkpoint, Shard, parse_utc_hour, plan_shards, run_backfill
+from src.data.fetcher.orchestrator import FetchResult
+
+
+@pytest.mark.unit
+def test_plan_shards_day_aligns_to_utc_midnight():
+    """日シャードは UTC 日境界で切られ、端数は短いシャードになる"""
+    shards = plan_shards(parse_utc_hour("2024-07-01T20:00:00Z"), parse_utc_hour("2024-07-03T05:00:00Z"), "day")
+
+    assert [(s.interval_end_iso, s.hours) for s in shards] == [
+        ("2024-07-02T00:00:00+00:00", 4),
+        ("2024-07-03T00:00:00+00:00", 24),
+        ("2024-07-03T05:00:00+00:00", 5),
+    ]
+    assert [s.date for s in shards] == ["2024-07-01", "2024-07-02", "2024-07-03"]
+
+
+@pytest.mark.unit
+def test_plan_shards_hour():
+    """時間シャードは 1 時間ずつ"""
+    start = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    shards = plan_shards(start, parse_utc_hour("2024-07-01T03:00:00Z"), "hour")
+    assert [s.hours for s in shards] == [1, 1, 1]
+
+
+@pytest.mark.unit
+def test_plan_shards_rejects_empty_range():
+    """start >= end はエラー"""
+    start = parse_utc_hour("2024-07-01")
+    with pytest.raises(ValueError):
+        plan_shards(start, start)
+
+
+@pytest.mark.unit
+@patch("src.data.fetcher.backfill.build_fetcher")
+@patch("src.data.fetcher.backfill.run_tasks")
+def test_run_backfill_resumes_from_checkpoint(mock_run_tasks, mock_build_fetcher, tmp_path):
+    """チェックポイント済みのシャードは再取得しない"""
+    mock_build_fetcher.return_value = MagicMock(pagination="id_gt")
+    Checkpoint(tmp_path / "uniswap" / "_checkpoint.json").mark_done(Shard("2024-07-02T00:00:00+00:00", 24))
+
+    def _complete_all(tasks, max_concurrency, per_endpoint_concurrency, on_done):
+        for t in tasks:
+            on_done(FetchResult(t, rows=1))
+
+    mock_run_tasks.side_effect = _complete_all
+
+    outputs = run_backfill(
+        "uniswap", parse_utc_hour("2024-07-01"), parse_utc_hour("2024-07-04"), str(tmp_path), workers=2
+    )
+
+    tasks = mock_run_tasks.call_args.args[0]
+    assert [t.interval_end_iso for t in tasks] == ["2024-07-03T00:00:00+00:00", "2024-07-04T00:00:00+00:00"]
+    assert len(outputs) == 3
+    assert Checkpoint(tmp_path / "uniswap" / "_checkpoint.json").done == {
+        "2024-07-02T00:00:00+00:00",
+        "2024-07-03T00:00:00+00:00",
+        "2024-07-04T00:00:00+00:00",
+    }
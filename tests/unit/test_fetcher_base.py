@@ -0,0 +1,145 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.retry import RetryPolicy
+from tests.fixtures.pool_hour import pool_hour as _row
+
+
+class _Pages:
+    """ページを順に返す MockTransport ハンドラ。送信された variables を記録する"""
+
+    def __init__(self, pages: list[list[dict]]):
+        self.pages = list(pages)
+        self.sent: list[dict] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.sent.append(json.loads(request.content)["variables"])
+        return httpx.Response(200, json={"data": {"poolHourDatas": self.pages.pop(0)}})
+
+
+def _fetcher(handler, **kwargs) -> BaseFetcher:
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    return BaseFetcher("uniswap", "http://test", "query", client=client, **kwargs)
+
+
+@pytest.mark.unit
+def test_fetch_interval_id_gt_pagination():
+    """id_gt モードでは末尾 id を lastId に渡し skip は常に 0"""
+    rows = [_row(i) for i in range(5)]
+    pages = _Pages([rows[0:2], rows[2:4], rows[4:5]])
+
+    result = _fetcher(pages, page_size=2, pagination="id_gt").fetch_interval("2024-10-04T01:00:00Z")
+
+    assert result == rows
+    assert [v["skip"] for v in pages.sent] == [0, 0, 0]
+    assert [v["lastId"] for v in pages.sent] == ["", rows[1]["id"], rows[3]["id"]]
+
+
+@pytest.mark.unit
+def test_fetch_interval_skip_pagination():
+    """skip モードでは従来通り page_size ずつ skip を進める"""
+    rows = [_row(i) for i in range(4)]
+    pages = _Pages([rows[0:2], rows[2:4], []])
+
+    result = _fetcher(pages, page_size=2).fetch_interval("2024-10-04T01:00:00Z")
+
+    assert result == rows
+    assert [v["skip"] for v in pages.sent] == [0, 2, 4]
+    assert all(v["lastId"] == "" for v in pages.sent)
+
+
+@pytest.mark.unit
+def test_fetch_interval_raises_on_graphql_errors():
+    """GraphQL の errors は RuntimeError"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"errors": [{"message": "bad query"}]})
+
+    with pytest.raises(RuntimeError, match="bad query"):
+        _fetcher(handler, page_size=2).fetch_interval("2024-10-04T01:00:00Z")
+
+
+@pytest.mark.unit
+def test_unknown_pagination_mode():
+    """未知のページング方式はエラー"""
+    with pytest.raises(ValueError, match="Unknown pagination mode"):
+        BaseFetcher("uniswap", "http://test", "query", page_size=2, pagination="cursor")
+
+
+@pytest.mark.unit
+def test_pooled_client_reuses_connection():
+    """keep-alive により 2 ページ目以降は新規接続しない（connect=0）"""
+    rows = [_row(i) for i in range(3)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            variables = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["variables"]
+            page = [r for r in rows if r["id"] > variables["lastId"]][: variables["first"]]
+            body = json.dumps({"data": {"poolHourDatas": page}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}/"
+        with BaseFetcher("uniswap", endpoint, "query", page_size=1, pagination="id_gt") as fetcher:
+            assert fetcher.fetch_interval("2024-10-04T01:00:00Z") == rows
+            timings = list(fetcher.page_timings)
+    finally:
+        server.shutdown()
+
+    assert len(timings) == 4
+    assert not timings[0].reused
+    assert all(t.reused for t in timings[1:])
+    assert all(t.ttfb > 0 and t.bytes > 0 for t in timings)
+
+
+@pytest.mark.unit
+def test_run_streams_pages_to_disk(tmp_path):
+    """各ページは次ページ取得前にファイルへ書き出される"""
+    rows = [_row(i) for i in range(4)]
+    out = tmp_path / "uni.jsonl"
+    part = tmp_path / "uni.jsonl.part"
+    lines_on_disk: list[int] = []
+    pages = _Pages([rows[0:2], rows[2:4], []])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        lines_on_disk.append(len(part.read_text().splitlines()) if part.exists() else 0)
+        return pages(request)
+
+    _fetcher(handler, page_size=2, pagination="id_gt").run(str(out), "2024-10-04T01:00:00Z")
+
+    assert lines_on_disk == [0, 2, 4]
+    assert not part.exists()
+    written = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [w["pool_id"] for w in written] == [r["pool"]["id"] for r in rows]
+    assert written[0]["dex_protocol"] == "uniswap_v3"
+    assert written[0]["hour_ts"] == "2024-10-04T00:00:00Z"
+
+
+@pytest.mark.unit
+def test_run_leaves_no_output_on_failure(tmp_path):
+    """途中で失敗した場合は出力ファイルを残さない"""
+    rows = [_row(i) for i in range(2)]
+    responses = [httpx.Response(200, json={"data": {"poolHourDatas": rows}}), httpx.Response(500)]
+    out = tmp_path / "uni.jsonl"
+
+    with pytest.raises(httpx.HTTPStatusError):
+        fetcher = _fetcher(lambda request: responses.pop(0), page_size=2, retry=RetryPolicy(max_attempts=1))
+        fetcher.run(str(out), "2024-10-04T01:00:00Z")
+
+    assert list(tmp_path.iterdir()) == []
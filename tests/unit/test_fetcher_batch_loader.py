@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from google.api_core.exceptions import BadRequest, NotFound
+
+from src.data.fetcher.state import LoadManifest, LocalStateStore
+from src.jobs.fetcher.batch_loader import BatchLoader, object_format, record_cutover
+
+NOW = datetime(2024, 10, 4, 5, 30, tzinfo=timezone.utc).timestamp()
+
+
+class _Bucket:
+    name = "raw-bucket"
+
+    def __init__(self):
+        self.blobs = []
+
+    def add(self, name: str, created: float = NOW):
+        self.blobs.append(SimpleNamespace(name=name, time_created=datetime.fromtimestamp(created, tz=timezone.utc)))
+
+    def list_blobs(self, prefix: str):
+        return [b for b in self.blobs if b.name.startswith(prefix)]
+
+
+class _Job:
+    def __init__(self, error=None):
+        self.error_result = None
+        self._error = error
+        self.output_rows = 10
+
+    def result(self):
+        if self._error:
+            self.error_result = {"reason": "invalid"}
+            raise BadRequest(self._error)
+
+
+class _BigQuery:
+    def __init__(self):
+        self.jobs = {}
+        self.loads = []
+        self.fail = False
+
+    def load_table_from_uri(self, uris, table, job_id, job_config):
+        self.loads.append((table, list(uris)))
+        self.jobs[job_id] = _Job("bad file" if self.fail else None)
+        return self.jobs[job_id]
+
+    def get_job(self, job_id):
+        if job_id not in self.jobs:
+            raise NotFound(job_id)
+        return self.jobs[job_id]
+
+
+def _destination(protocol, fmt):
+    return f"raw.pool_hourly_{protocol}_{fmt}", None
+
+
+def _loader(tmp_path, bucket, bq) -> BatchLoader:
+    store = LocalStateStore(str(tmp_path / "manifests"), state_cls=LoadManifest)
+    return BatchLoader(bq, bucket, store, _destination, clock=lambda: NOW)
+
+
+@pytest.mark.unit
+def test_object_format():
+    assert object_format("raw/uniswap/2024-10-04/a.jsonl.gz") == "jsonl"
+    assert object_format("raw/uniswap/2024-10-04/a.parquet") == "parquet"
+    assert object_format("raw/uniswap/2024-10-04/a.jsonl.parts-0a1b/00001") is None
+    assert object_format("raw/uniswap/2024-10-04/_SUCCESS") is None
+
+
+@pytest.mark.unit
+def test_flush_loads_new_files_once_per_table(tmp_path):
+    """新しいオブジェクトをテーブル毎に 1 ジョブでロードし、ロード済みは次回以降スキップする"""
+    bucket, bq = _Bucket(), _BigQuery()
+    loader = _loader(tmp_path, bucket, bq)
+    loader.flush("uniswap")  # 初回はマニフェストを作成し、以前のオブジェクトは対象外にする
+
+    bucket.add("raw/uniswap/2024-10-03/old.jsonl.gz", created=NOW - 1)
+    bucket.add("raw/uniswap/2024-10-03/a.jsonl.gz", created=NOW + 1)
+    bucket.add("raw/uniswap/2024-10-04/b.jsonl.gz", created=NOW + 1)
+    bucket.add("raw/uniswap/2024-10-04/c.parquet", created=NOW + 1)
+    bucket.add("raw/uniswap/2024-10-04/d.jsonl.parts-ff/00000", created=NOW + 1)
+    bucket.add("raw/sushiswap/2024-10-04/e.jsonl.gz", created=NOW + 1)
+
+    assert loader.flush("uniswap") == 3
+    assert bq.loads == [
+        (
+            "raw.pool_hourly_uniswap_jsonl",
+            ["gs://raw-bucket/raw/uniswap/2024-10-03/a.jsonl.gz", "gs://raw-bucket/raw/uniswap/2024-10-04/b.jsonl.gz"],
+        ),
+        ("raw.pool_hourly_uniswap_parquet", ["gs://raw-bucket/raw/uniswap/2024-10-04/c.parquet"]),
+    ]
+
+    bucket.add("raw/uniswap/2024-10-04/f.jsonl.gz", created=NOW + 2)
+    assert loader.flush("uniswap") == 1
+    assert bq.loads[-1][1] == ["gs://raw-bucket/raw/uniswap/2024-10-04/f.jsonl.gz"]
+    # バックフィルなど直接指定した URI もマニフェストで重複を除く
+    assert loader.load_uris("uniswap", ["gs://raw-bucket/raw/uniswap/2024-10-04/f.jsonl.gz"], "jsonl") == 0
+    assert len(bq.loads) == 3
+
+
+@pytest.mark.unit
+def test_uploads_before_the_first_flush_are_loaded(tmp_path):
+    """取得ジョブがアップロード前に記録した開始時刻以降のオブジェクトは、ローダーの初回 flush でロードする"""
+    bucket, bq = _Bucket(), _BigQuery()
+    loader = _loader(tmp_path, bucket, bq)
+    bucket.add("raw/uniswap/2024-10-04/direct.jsonl.gz", created=NOW - 120)  # バッチロード導入前
+    record_cutover(loader.store, "uniswap", clock=lambda: NOW - 60)  # LOAD_MODE=batch の取得ジョブ
+    bucket.add("raw/uniswap/2024-10-04/a.jsonl.gz", created=NOW - 30)
+
+    assert record_cutover(loader.store, "uniswap", clock=lambda: NOW).since == NOW - 60  # 記録済みなら変えない
+    assert loader.flush("uniswap") == 1
+    assert bq.loads == [("raw.pool_hourly_uniswap_jsonl", ["gs://raw-bucket/raw/uniswap/2024-10-04/a.jsonl.gz"])]
+
+
+@pytest.mark.unit
+def test_pending_jobs_are_resolved_after_a_crash(tmp_path):
+    """pending のジョブは次回の flush で結果を確認し、成功なら再ロードせず、失敗・未投入なら再ロードする"""
+    bucket, bq = _Bucket(), _BigQuery()
+    loader = _loader(tmp_path, bucket, bq)
+    loader.flush("uniswap")
+    bucket.add("raw/uniswap/2024-10-04/a.jsonl.gz", created=NOW + 1)
+
+    bq.fail = True
+    with pytest.raises(BadRequest):
+        loader.flush("uniswap")
+    manifest = loader.store.load("uniswap")
+    assert list(manifest.pending.values()) == [["gs://raw-bucket/raw/uniswap/2024-10-04/a.jsonl.gz"]]
+
+    # 失敗したジョブは pending から外して再ロード
+    bq.fail = False
+    assert loader.flush("uniswap") == 1
+    assert len(bq.loads) == 2
+
+    # 投入済みで完了を記録する前に落ちた場合は、ジョブの成功を確認して loaded に移すだけ
+    bucket.add("raw/uniswap/2024-10-04/b.jsonl.gz", created=NOW + 1)
+    manifest = loader.store.load("uniswap")
+    manifest.reserve("pool_hourly_uniswap_jsonl_done", ["gs://raw-bucket/raw/uniswap/2024-10-04/b.jsonl.gz"])
+    bq.jobs["pool_hourly_uniswap_jsonl_done"] = _Job()
+    manifest.reserve("pool_hourly_uniswap_jsonl_lost", ["gs://raw-bucket/raw/uniswap/2024-10-04/c.jsonl.gz"])
+    loader.store.save(manifest)
+    assert loader.flush("uniswap") == 0
+    manifest = loader.store.load("uniswap")
+    assert manifest.pending == {}
+    assert "gs://raw-bucket/raw/uniswap/2024-10-04/b.jsonl.gz" in manifest.loaded
+    assert len(bq.loads) == 2
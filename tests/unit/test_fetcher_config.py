@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from src.data.fetcher import config
+from src.data.fetcher.config import ConfigError, ProtocolConfigCache, load_protocol_config, validate_protocol_config
+
+PROTOCOLS_YML = """
+uniswap:
+  api_key: ${TEST_API_KEY}
+  subgraph_id: uni
+  endpoint_template: "https://gateway.example/{api_key}/{subgraph_id}"
+  page_size: 500
+sushiswap:
+  api_key: ${TEST_SUSHI_KEY}
+  subgraph_id: sushi
+  endpoint_template: "https://gateway.example/{api_key}/{subgraph_id}"
+  page_size: 500
+"""
+
+
+@pytest.fixture
+def protocols_yml(tmp_path, monkeypatch):
+    path = tmp_path / "protocols.yml"
+    path.write_text(PROTOCOLS_YML, encoding="utf-8")
+    monkeypatch.setenv("PROTOCOL_CFG_PATH", str(path))
+    monkeypatch.setenv("TEST_API_KEY", "secret")
+    return path
+
+
+@pytest.mark.unit
+def test_config_is_parsed_once_per_process(protocols_yml, monkeypatch):
+    """探索・パースは 1 回だけで、環境変数は要求されたプロトコルの分だけ展開する"""
+    reads = []
+    read_text = type(protocols_yml).read_text
+    monkeypatch.setattr(type(protocols_yml), "read_text", lambda self, *a: reads.append(self) or read_text(self, *a))
+
+    for _ in range(3):
+        cfg = load_protocol_config("uniswap")["uniswap"]
+    assert cfg["api_key"] == "secret"
+    assert reads == [protocols_yml]
+
+    # 返した dict を書き換えてもキャッシュには影響しない
+    cfg["page_size"] = 1
+    assert load_protocol_config("uniswap")["uniswap"]["page_size"] == 500
+
+    # TEST_SUSHI_KEY は sushiswap を要求したときだけ必要
+    with pytest.raises(ConfigError, match="TEST_SUSHI_KEY"):
+        load_protocol_config()
+    with pytest.raises(ConfigError, match="Unknown protocol"):
+        load_protocol_config("pancakeswap")
+
+
+@pytest.mark.unit
+def test_validation_reports_every_problem():
+    """スキーマ違反はまとめて 1 つのエラーで報告する"""
+    raw = {
+        "uniswap": {"api_key": "k", "subgraph_id": "s", "page_size": "1000", "pagination": "cursor", "pagesize": 1},
+        "sushiswap": ["not", "a", "mapping"],
+    }
+    with pytest.raises(ConfigError) as e:
+        validate_protocol_config(raw)
+    message = str(e.value)
+    for problem in [
+        "uniswap.endpoint_template: 必須です",
+        "uniswap.page_size: int が必要です",
+        "uniswap.pagination:",
+        "uniswap.pagesize: 不明なキーです",
+        "sushiswap: マッピングが必要です",
+    ]:
+        assert problem in message
+
+
+@pytest.mark.unit
+def test_reloads_when_mtime_changes(protocols_yml):
+    """確認間隔が経った後に mtime が変わっていれば読み直し、不正な内容なら直前の設定を使い続ける"""
+    now = {"t": 0.0}
+    cache = ProtocolConfigCache(protocols_yml, check_interval_s=10, clock=lambda: now["t"])
+    assert cache.get("uniswap")["page_size"] == 500 and cache.version == 1
+
+    protocols_yml.write_text(PROTOCOLS_YML.replace("page_size: 500", "page_size: 250"), encoding="utf-8")
+    stat = protocols_yml.stat()
+    os.utime(protocols_yml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get("uniswap")["page_size"] == 500  # 確認間隔内は stat しない
+    now["t"] = 11.0
+    assert cache.get("uniswap")["page_size"] == 250 and cache.version == 2
+    assert cache.refresh(force=True) is False  # 変化がなければ読み直さない
+
+    protocols_yml.write_text("uniswap: [broken", encoding="utf-8")
+    with pytest.raises(ConfigError, match="YAML"):
+        cache.refresh(force=True)
+    assert cache.get("uniswap")["page_size"] == 250 and cache.version == 2
+    assert config.locate_cfg() == protocols_yml
+
+
+@pytest.mark.unit
+def test_poll_refresh_retries_until_the_new_config_builds(protocols_yml, monkeypatch):
+    """新しい設定でフェッチャーを組めなかった場合は、組めるまで次の refresh でもやり直す"""
+    cli = pytest.importorskip("src.jobs.fetcher.run_fetch_cli")
+    rebuilt = []
+    refresh = cli._fetcher_refresher("uniswap", rebuilt.append)
+    assert refresh() is None
+
+    protocols_yml.write_text(PROTOCOLS_YML.replace("${TEST_API_KEY}", "${TEST_NEW_KEY}"), encoding="utf-8")
+    stat = protocols_yml.stat()
+    os.utime(protocols_yml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(ConfigError, match="TEST_NEW_KEY"):
+        refresh()
+    with pytest.raises(ConfigError, match="TEST_NEW_KEY"):
+        refresh()  # ファイルは読み直し済みでも、組めていない版はやり直す
+
+    monkeypatch.setenv("TEST_NEW_KEY", "rotated")
+    fetcher = refresh()
+    assert fetcher is not None and rebuilt == [fetcher]
+    assert refresh() is None
+    fetcher.close()
@@ -0,0 +1,93 @@
+import shutil
+from unittest.mock import MagicMock
+
+import pytest
+
+from scripts.graph_standin import GraphStandin, StandinConfig
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.metadata_cache import GcsPoolMetadataCache, PoolMetadataCache
+from src.data.fetcher.projection import MINIMAL_FIELDS, build_pool_hour_query
+from tests.fixtures.pool_hour import pool_hour
+
+
+def _pool(i: int) -> dict:
+    return pool_hour(i)["pool"]
+
+
+class _Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+def test_bulk_lookup_and_ttl(tmp_path):
+    """id の一括検索（バインド変数上限を超える件数も可）と TTL 切れの扱い"""
+    clock = _Clock()
+    cache = PoolMetadataCache(str(tmp_path / "meta.sqlite"), ttl_s=3600, clock=clock)
+    cache.put_many("uniswap", [_pool(i) for i in range(2000)])
+
+    found = cache.get_many("uniswap", [f"0xpool{i:04d}" for i in range(0, 2500, 2)])
+    assert len(found) == 1000
+    assert found["0xpool0042"] == _pool(42)
+    assert cache.get_many("sushiswap", ["0xpool0042"]) == {}
+
+    clock.now += 3601
+    assert cache.get_many("uniswap", ["0xpool0042"]) == {}
+    cache.put_many("uniswap", [_pool(42)])
+    assert list(cache.get_many("uniswap", ["0xpool0042", "0xpool0043"])) == ["0xpool0042"]
+    assert cache.purge_expired() == 1999
+
+
+@pytest.mark.unit
+def test_warm_cache_skips_pools_query(tmp_path):
+    """2 回目以降の実行はキャッシュから差し込み、pools クエリを送らない"""
+    path = str(tmp_path / "meta.sqlite")
+    query = build_pool_hour_query(MINIMAL_FIELDS)
+    end = "2024-10-01T03:00:00+00:00"
+
+    def _run(standin):
+        cache = PoolMetadataCache(path)
+        fetcher = BaseFetcher(
+            "uniswap", standin.url, query, 50, http2=False, fields=MINIMAL_FIELDS, metadata_cache=cache
+        )
+        before = standin.stats["requests"]
+        with fetcher:
+            rows = fetcher.fetch_interval(end, hours=3)
+        cache.close()
+        return rows, standin.stats["requests"] - before
+
+    with GraphStandin(StandinConfig(pools=30, hours=3)) as standin:
+        cold_rows, cold_requests = _run(standin)
+        warm_rows, warm_requests = _run(standin)
+
+    assert warm_rows == cold_rows
+    assert cold_requests == 2 + 2  # 90 行 / 50 = 2 ページ + 各ページの pools クエリ
+    assert warm_requests == 2
+
+
+@pytest.mark.unit
+def test_gcs_cache_syncs_with_generation(tmp_path):
+    """GCS 版は既存ファイルをダウンロードし、変更時のみ世代番号付きでアップロードする"""
+    seed = PoolMetadataCache(str(tmp_path / "seed.sqlite"))
+    seed.put_many("uniswap", [_pool(1)])
+    seed.close()
+
+    blob = MagicMock()
+    blob.generation = 7
+    blob.download_to_filename.side_effect = lambda local: shutil.copy(tmp_path / "seed.sqlite", local)
+    client = MagicMock()
+    client.bucket.return_value.blob.return_value = blob
+
+    cache = GcsPoolMetadataCache("gs://bucket/cache/meta.sqlite", client=client)
+    assert cache.get_many("uniswap", ["0xpool0001"]) == {"0xpool0001": _pool(1)}
+    cache.flush()
+    blob.upload_from_filename.assert_not_called()
+
+    cache.put_many("uniswap", [_pool(2)])
+    cache.close()
+    client.bucket.assert_called_with("bucket")
+    client.bucket.return_value.blob.assert_called_with("cache/meta.sqlite")
+    assert blob.upload_from_filename.call_args.kwargs == {"if_generation_match": 7}
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.orchestrator import FetchTask, fetch_all
+from src.data.fetcher.retry import RetryPolicy
+from tests.fixtures.pool_hour import pool_hour
+
+
+class _Recorder:
+    """MockTransport 用のハンドラ。エンドポイント毎の同時実行数を記録する"""
+
+    def __init__(self, rows_per_window: int, delay: float = 0.01):
+        self.rows_per_window = rows_per_window
+        self.delay = delay
+        self.in_flight: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.peak_total = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.in_flight[host])
+        self.peak_total = max(self.peak_total, sum(self.in_flight.values()))
+        await asyncio.sleep(self.delay)
+        self.in_flight[host] -= 1
+
+        variables = json.loads(request.content)["variables"]
+        ids = [f"{host}-{variables['endTime']}-{i:04d}" for i in range(self.rows_per_window)]
+        page = [pool_hour(0, variables["startTime"], pool_id=i) | {"id": i} for i in ids if i > variables["lastId"]]
+        page = page[: variables["first"]]
+        return httpx.Response(200, json={"data": {"poolHourDatas": page}})
+
+
+@pytest.mark.unit
+def test_fetch_all_respects_concurrency_limits(tmp_path):
+    """全体・エンドポイント毎の同時実行数を超えずに全ウィンドウを取得する"""
+    recorder = _Recorder(rows_per_window=5)
+    uni = BaseFetcher("uniswap", "http://uni.test/graphql", "query", page_size=2, pagination="id_gt")
+    sushi = BaseFetcher("sushiswap", "http://sushi.test/graphql", "query", page_size=2, pagination="id_gt")
+    ends = [f"2024-10-04T{h:02d}:00:00+00:00" for h in range(1, 7)]
+    tasks = [FetchTask(f, end, str(tmp_path / f.name / f"{end}.jsonl")) for f in (uni, sushi) for end in ends]
+
+    async def _run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(recorder)) as client:
+            return await fetch_all(tasks, max_concurrency=3, per_endpoint_concurrency=2, client=client)
+
+    results = asyncio.run(_run())
+
+    assert all(r.error is None for r in results)
+    assert [r.rows for r in results] == [5] * len(tasks)
+    assert recorder.peak_total <= 3
+    assert max(recorder.peak.values()) <= 2
+    for t in tasks:
+        assert len((tmp_path / t.fetcher.name / f"{t.interval_end_iso}.jsonl").read_text().splitlines()) == 5
+
+
+@pytest.mark.unit
+def test_fetch_all_collects_errors(tmp_path):
+    """1 タスクの失敗は他タスクを止めず error に格納される"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "bad.test":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"data": {"poolHourDatas": []}})
+
+    ok = BaseFetcher("uniswap", "http://ok.test", "query", page_size=2)
+    bad = BaseFetcher("sushiswap", "http://bad.test", "query", page_size=2, retry=RetryPolicy(max_attempts=1))
+    end = "2024-10-04T01:00:00+00:00"
+    tasks = [FetchTask(ok, end, str(tmp_path / "ok.jsonl")), FetchTask(bad, end, str(tmp_path / "bad.jsonl"))]
+
+    async def _run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch_all(tasks, client=client)
+
+    ok_result, bad_result = asyncio.run(_run())
+
+    assert ok_result.error is None
+    assert isinstance(bad_result.error, httpx.HTTPStatusError)
+    assert (tmp_path / "ok.jsonl").exists()
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from scripts.graph_standin import GraphStandin, StandinConfig
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.poller import ChangeTracker, HourPoller, writer_emitter
+from src.data.fetcher.projection import MINIMAL_FIELDS, build_pool_hour_query
+from tests.fixtures.pool_hour import pool_hour
+
+
+def _ts(iso: str) -> float:
+    return datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.unit
+def test_change_tracker_emits_changed_rows_once():
+    """内容が変わった行・初出の行だけを返し、commit するまでは次回も変化として扱う"""
+    tracker = ChangeTracker()
+    page = [pool_hour(i) for i in range(5)]
+    assert tracker.changed(page) == page
+    tracker.discard()
+    assert tracker.changed(page) == page
+    tracker.commit()
+    assert tracker.changed(page) == []
+
+    updated = {**page[2], "volumeUSD": "123.45"}
+    assert tracker.changed([*page[:2], updated, *page[3:]]) == [updated]
+    tracker.commit()
+
+    tracker.forget_before(max(r["periodStartUnix"] for r in page) + 1)
+    assert len(tracker) == 0
+
+
+@pytest.mark.unit
+def test_poller_polls_current_hour(tmp_path):
+    """現在の 1 時間分を取得し、時間の切り替わり直後は直前の 1 時間も含める。変化がなければ何も流さない"""
+    clock = {"now": _ts("2024-10-01T02:10:00")}
+    with GraphStandin(StandinConfig(pools=10, hours=3)) as standin:
+        query = build_pool_hour_query(MINIMAL_FIELDS)
+        fetcher = BaseFetcher("uniswap", standin.url, query, page_size=8, http2=False, fields=MINIMAL_FIELDS)
+        output = str(tmp_path / "{protocol}" / "{date}" / "{poll_ts}.jsonl")
+        now = lambda: clock["now"]  # noqa: E731
+        poller = HourPoller(fetcher, writer_emitter(fetcher, output, clock=now), interval_s=300, clock=now)
+        with fetcher:
+            first = poller.poll_once()
+            second = poller.poll_once()
+            clock["now"] = _ts("2024-10-01T03:02:00")  # 03 時台のデータはまだない
+            third = poller.poll_once()
+
+    assert {r["periodStartUnix"] for r in first} == {int(_ts("2024-10-01T02:00:00"))}
+    assert len(first) == 10 and second == [] and third == []
+    assert poller.window(_ts("2024-10-01T03:02:00")) == (_ts("2024-10-01T02:00:00"), _ts("2024-10-01T04:00:00"))
+    written = list((tmp_path / "uniswap" / "2024-10-01").iterdir())
+    assert [p.name for p in written] == ["20241001T021000Z.jsonl"]
+    lines = written[0].read_text().splitlines()
+    assert json.loads(lines[0])["raw"]["pool"]["token0"]["symbol"]  # プール情報を差し込んだ行
+
+
+class _Fetcher:
+    name = "uniswap"
+    serde = None
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def iter_pages(self, interval_end_iso, hours):
+        yield self.pages.pop(0)
+
+
+@pytest.mark.unit
+def test_failed_emit_is_retried_next_poll():
+    """書き出しに失敗した変化は次回のポーリングでまとめて流す"""
+    rows = [pool_hour(i) for i in range(3)]
+    updated = {**rows[1], "tvlUSD": "1.5"}
+    emitted, sleeps = [], []
+
+    def emit(changed):
+        if not emitted and not sleeps:
+            raise OSError("disk full")
+        emitted.append(changed)
+
+    poller = HourPoller(
+        _Fetcher([rows, rows, [rows[0], updated, rows[2]]]), emit, interval_s=60, clock=lambda: 0.0, sleep=sleeps.append
+    )
+    poller.run(max_polls=3)
+
+    assert emitted == [rows, [updated]]
+    assert sleeps == [60.0, 120.0]
+    assert poller.metrics["failures"] == 1 and poller.metrics["emitted"] == 4
+
+
+@pytest.mark.unit
+def test_refresh_swaps_fetcher_and_keeps_history():
+    """refresh が返したフェッチャーに差し替え（古いものは閉じる）、変化の履歴は引き継ぐ"""
+    rows = [pool_hour(i) for i in range(3)]
+    emitted, closed = [], []
+
+    class _Closable(_Fetcher):
+        def close(self):
+            closed.append(self)
+
+    old, new = _Closable([rows]), _Closable([rows])
+    swaps = [None, new]
+    poller = HourPoller(
+        old, emitted.append, interval_s=60, clock=lambda: 0.0, sleep=lambda s: None, refresh=lambda: swaps.pop(0)
+    )
+    poller.run(max_polls=2)
+
+    assert poller.fetcher is new and closed == [old]
+    assert emitted == [rows]  # 差し替え後も同じ行は流さない
+    assert poller.metrics["reloads"] == 1
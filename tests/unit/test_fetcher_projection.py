@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+
+from scripts.graph_standin import GraphStandin, StandinConfig, parse_selection
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.projection import (
+    FULL_FIELDS,
+    MINIMAL_FIELDS,
+    build_pool_hour_query,
+    needs_pool_metadata,
+    resolve_fields,
+)
+
+END = "2024-10-01T06:00:00+00:00"
+
+
+def _fetcher(url: str, fields) -> BaseFetcher:
+    fields = resolve_fields(fields)
+    query = build_pool_hour_query(fields)
+    return BaseFetcher("uniswap", url, query, page_size=10, pagination="id_gt", http2=False, fields=fields)
+
+
+@pytest.mark.unit
+def test_resolve_fields_validates():
+    """プロファイル名・フィールドのリストを検証する"""
+    assert resolve_fields("minimal") == MINIMAL_FIELDS
+    assert resolve_fields(["id", "periodStartUnix", "pool.id", "tvlUSD", "tvlUSD"]) == (
+        "id",
+        "periodStartUnix",
+        "pool.id",
+        "tvlUSD",
+    )
+    with pytest.raises(ValueError, match="Unknown field profile"):
+        resolve_fields("tiny")
+    with pytest.raises(ValueError, match="Unknown poolHourData fields"):
+        resolve_fields(["id", "periodStartUnix", "pool.id", "pool.tvl"])
+    with pytest.raises(ValueError, match="Required poolHourData fields missing"):
+        resolve_fields(["id", "tvlUSD"])
+    assert needs_pool_metadata(MINIMAL_FIELDS) and not needs_pool_metadata(FULL_FIELDS)
+
+
+@pytest.mark.unit
+def test_built_query_selects_declared_fields():
+    """組み立てたクエリの選択セットは宣言したフィールドと一致する"""
+    root, selection = parse_selection(build_pool_hour_query(MINIMAL_FIELDS))
+
+    assert root == "poolHourDatas"
+    assert selection["pool"] == {"id": {}, "token0": {"id": {}}, "token1": {"id": {}}}
+    assert "sqrtPrice" not in selection and "feeGrowthGlobal0X128" not in selection
+
+
+@pytest.mark.unit
+def test_minimal_profile_fetches_pool_metadata_once():
+    """minimal ではプール情報をプール毎に 1 度だけ取得して行に差し込み、受信バイト数が減る"""
+    with GraphStandin(StandinConfig(pools=15, hours=6)) as standin:
+        with _fetcher(standin.url, "full") as full:
+            full_rows = full.fetch_interval(END, hours=4)
+        with _fetcher(standin.url, "minimal") as minimal:
+            requests_before = standin.stats["requests"]
+            rows = minimal.fetch_interval(END, hours=4)
+            requests = standin.stats["requests"] - requests_before
+
+    # 行はプール順に並ぶため 6 ページ（+ 最終の空ページ）すべてに新しいプールが登場し、
+    # 未取得のプールだけを各ページ 1 回の pools クエリで取得する
+    assert len(rows) == len(full_rows) == 60
+    assert requests == 7 + 6
+    assert len(minimal.pool_metadata) == 15
+    assert rows[0]["pool"] == full_rows[0]["pool"]
+    assert rows[0]["pool"]["token0"]["symbol"] == "WETH"
+    assert "sqrtPrice" not in rows[0] and rows[0]["tvlUSD"] == full_rows[0]["tvlUSD"]
+    assert sum(t.bytes for t in minimal.page_timings) * 1.5 < sum(t.bytes for t in full.page_timings)
+
+
+@pytest.mark.unit
+def test_minimal_profile_async():
+    """非同期経路でも同じくプール情報を差し込む"""
+    with GraphStandin(StandinConfig(pools=5, hours=2)) as standin:
+        fetcher = _fetcher(standin.url, "minimal")
+
+        async def _run():
+            async with httpx.AsyncClient() as client:
+                return await fetcher.afetch_interval(client, "2024-10-01T02:00:00+00:00", hours=2)
+
+        rows = asyncio.run(_run())
+
+    assert len(rows) == 10
+    assert all(r["pool"]["token1"]["symbol"] and r["pool"]["feeTier"] for r in rows)
@@ -0,0 +1,71 @@
+import json
+import tracemalloc
+
+import pytest
+
+from src.data.fetcher.records import MetadataTable, PoolHourRecord, RecordBatch
+from tests.fixtures.pool_hour import pool_hour
+
+
+@pytest.mark.unit
+def test_record_round_trip_is_lossless():
+    """uint256 は int で損失なし・to_raw から再構築しても同じレコードになる"""
+    table = MetadataTable()
+    raw = pool_hour(7)
+    rec = PoolHourRecord.from_raw(raw, table)
+
+    assert rec.fee_growth_global0_x128 == 2**255 + 7
+    assert rec.sqrt_price == int(raw["sqrtPrice"])
+    assert rec.tick == -201234
+    assert rec.pool.token0.decimals == 18
+
+    back = rec.to_raw()
+    assert back["feeGrowthGlobal0X128"] == raw["feeGrowthGlobal0X128"]
+    assert back["liquidity"] == raw["liquidity"]
+    assert PoolHourRecord.from_raw(back, MetadataTable()) == rec
+
+
+@pytest.mark.unit
+def test_metadata_is_interned():
+    """同じプール／トークンは 1 インスタンスを共有し、id だけの参照は既知の情報で補う"""
+    batch = RecordBatch()
+    batch.extend(pool_hour(i % 3, period_start=1728000000 + 3600 * i) for i in range(30))
+
+    assert len(batch) == 30
+    assert len(batch.table.pools) == 3
+    assert len(batch.table.tokens) == 2
+    assert len({id(r.pool) for r in batch}) == 3
+    assert len({id(r.pool.token0) for r in batch}) == 1
+
+    slim = {"id": "x", "periodStartUnix": 1728000000, "pool": {"id": "0xpool0001"}}
+    assert PoolHourRecord.from_raw(slim, batch.table).pool.token1.symbol == "USDC"
+
+
+@pytest.mark.unit
+def test_records_use_less_memory_than_dicts():
+    """パース済みレコードは生 dict より大幅に小さい"""
+
+    def _measure(build):
+        tracemalloc.start()
+        try:
+            kept = build()
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del kept
+        return size
+
+    n = 5_000
+    # 実際のフェッチと同じくレスポンスボディからデコードした dict と比較する
+    rows = [pool_hour(i % 100, period_start=1728000000 + 3600 * i) for i in range(n)]
+    pages = [json.dumps(rows[start : start + 1000]) for start in range(0, n, 1000)]
+    dicts = _measure(lambda: [json.loads(body) for body in pages])
+
+    def _records():
+        batch = RecordBatch()
+        for body in pages:
+            batch.extend(json.loads(body))
+        return batch
+
+    records = _measure(_records)
+    assert records * 2 < dicts
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from src.data.fetcher.config import ConfigError
+from src.data.fetcher.orchestrator import ConcurrencyLimiter, RateBudget, group_rates
+from src.data.fetcher.projection import FULL_FIELDS
+from src.data.fetcher.registry import FetcherRegistry, read_query
+
+PROTOCOLS_YML = """
+uniswap:
+  api_key: ${TEST_API_KEY}
+  subgraph_id: uni
+  endpoint_template: "https://gateway.example/api/{api_key}/subgraphs/id/{subgraph_id}"
+  page_size: 500
+  fields: full
+  query_file: uniswap_poolHourDatas.gql
+  rate_group: gateway
+  requests_per_s: 20
+
+base_uniswap:
+  api_key: ${TEST_API_KEY}
+  subgraph_id: base
+  endpoint_template: "https://gateway.example/api/{api_key}/subgraphs/id/{subgraph_id}"
+  page_size: 1000
+  pagination: id_gt
+  fields: minimal
+  headers:
+    Authorization: "Bearer {api_key}"
+  dex_protocol: uniswap_v3_base
+  rate_group: gateway
+  requests_per_s: 5
+"""
+
+
+@pytest.fixture
+def protocols_yml(tmp_path, monkeypatch):
+    path = tmp_path / "protocols.yml"
+    path.write_text(PROTOCOLS_YML, encoding="utf-8")
+    monkeypatch.setenv("PROTOCOL_CFG_PATH", str(path))
+    monkeypatch.setenv("TEST_API_KEY", "secret")
+    return path
+
+
+@pytest.mark.unit
+def test_builds_fetchers_from_config_entries(protocols_yml):
+    """protocols.yml のエントリだけでフェッチャーを組み立てる（モジュールの追加は不要）"""
+    registry = FetcherRegistry()
+    assert registry.names() == ["uniswap", "base_uniswap"]
+
+    uni = registry.build("uniswap")
+    assert uni.endpoint == "https://gateway.example/api/secret/subgraphs/id/uni"
+    assert uni.fields == FULL_FIELDS and uni.query == read_query("uniswap_poolHourDatas.gql")
+    assert uni.dex_protocol == "uniswap_v3"
+
+    base = registry.build("base_uniswap")
+    assert base.headers["Authorization"] == "Bearer secret"
+    assert base.page_size == 1000 and base.pagination == "id_gt"
+    assert base.dex_protocol == "uniswap_v3_base"
+    assert group_rates([uni, base]) == {"gateway": 5}  # 同じグループの最小値
+
+    with pytest.raises(ConfigError, match="Unknown protocol"):
+        registry.build("pancakeswap")
+
+
+@pytest.mark.unit
+def test_registered_builder_takes_precedence(protocols_yml):
+    """register() したビルダーは同名のエントリより優先され、一覧にも載る"""
+    registry = FetcherRegistry()
+    built = []
+    registry.register("uniswap", lambda: built.append("uniswap") or "custom-uniswap")
+    registry.register("curve", lambda: "custom-curve")
+
+    assert registry.build("uniswap") == "custom-uniswap" and built == ["uniswap"]
+    assert registry.names() == ["uniswap", "base_uniswap", "curve"]
+
+
+@pytest.mark.unit
+def test_rate_group_shares_request_budget():
+    """同じ rate_group のリクエストは秒間リクエスト数の上限を共有する"""
+    clock = {"now": 0.0}
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock["now"] += seconds
+
+    async def run():
+        limiter = ConcurrencyLimiter(8, 8, {"gateway": 2.0})
+        limiter._budgets["gateway"] = RateBudget(2.0, clock=lambda: clock["now"], sleep=fake_sleep)
+        for _ in range(4):
+            async with limiter.slot("gateway"):
+                pass
+        async with limiter.slot("other"):  # レート指定のないグループは待たない
+            pass
+
+    asyncio.run(run())
+
+    # バースト 2 回の後は 0.5 秒毎
+    assert sleeps == [0.5, 0.5]
@@ -0,0 +1,134 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.retry import FetchController, RetryPolicy, parse_retry_after
+from tests.fixtures.pool_hour import pool_hour as _row
+
+
+class _Script:
+    """応答（または例外）を順に返すハンドラ。送信された first を記録する"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.firsts: list[int] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.firsts.append(json.loads(request.content)["variables"]["first"])
+        item = self.responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+def _ok(rows) -> httpx.Response:
+    return httpx.Response(200, json={"data": {"poolHourDatas": rows}})
+
+
+def _fetcher(handler, **kwargs) -> BaseFetcher:
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    return BaseFetcher("uniswap", "http://test", "query", client=client, pagination="id_gt", **kwargs)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited: list[float] = []
+    monkeypatch.setattr("src.data.fetcher.base.time.sleep", waited.append)
+    return waited
+
+
+@pytest.mark.unit
+def test_retry_honors_retry_after(sleeps):
+    """429 は Retry-After だけ待ってから同じページを再取得する"""
+    rows = [_row(0)]
+    script = _Script(httpx.Response(429, headers={"Retry-After": "7"}), _ok(rows))
+    fetcher = _fetcher(script, page_size=10)
+
+    assert fetcher.fetch_interval("2024-10-04T01:00:00Z") == rows
+    assert sleeps == [7.0]
+    assert fetcher.controller.metrics["error.http_429"] == 1
+    assert fetcher.controller.metrics["retry_after"] == 1
+
+
+@pytest.mark.unit
+def test_timeout_and_complexity_errors_shrink_page_size(sleeps):
+    """タイムアウト・複雑度エラーでは first を半減してリトライする"""
+    rows = [_row(i) for i in range(3)]
+    script = _Script(
+        httpx.ReadTimeout("timed out"),
+        httpx.Response(200, json={"errors": [{"message": "Query exceeds complexity limit"}]}),
+        _ok(rows),
+    )
+    fetcher = _fetcher(script, page_size=1000, min_page_size=100)
+
+    assert fetcher.fetch_interval("2024-10-04T01:00:00Z") == rows
+    assert script.firsts == [1000, 500, 250]
+    assert len(sleeps) == 2
+    assert fetcher.controller.snapshot()["page_size.shrink"] == 2
+    assert fetcher.controller.page_size == 250
+
+
+@pytest.mark.unit
+def test_non_retryable_and_exhausted_errors_raise(sleeps):
+    """4xx は即座に、リトライ上限に達した 5xx はそのまま例外にする"""
+    bad_request = _Script(httpx.Response(400))
+    with pytest.raises(httpx.HTTPStatusError):
+        _fetcher(bad_request, page_size=10).fetch_interval("2024-10-04T01:00:00Z")
+    assert len(bad_request.firsts) == 1 and sleeps == []
+
+    unavailable = _Script(*[httpx.Response(503) for _ in range(3)])
+    fetcher = _fetcher(unavailable, page_size=10, retry=RetryPolicy(max_attempts=3))
+    with pytest.raises(httpx.HTTPStatusError):
+        fetcher.fetch_interval("2024-10-04T01:00:00Z")
+    assert len(sleeps) == 2
+    assert fetcher.controller.metrics["gave_up"] == 1
+
+
+@pytest.mark.unit
+def test_page_size_grows_back_after_fast_pages():
+    """速いページが続くと設定値を上限にページサイズを戻す"""
+    controller = FetchController("uniswap", 1000, min_page_size=100, grow_after=2)
+    controller.on_error(httpx.ReadTimeout("timed out"), attempt=1)
+    controller.on_error(httpx.ReadTimeout("timed out"), attempt=2)
+    assert controller.page_size == 250
+
+    for _ in range(8):
+        controller.on_success(0.1)
+    assert controller.page_size == 1000
+    assert controller.metrics["page_size.grow"] == 4
+
+
+@pytest.mark.unit
+def test_parse_retry_after_http_date():
+    """Retry-After は秒数・HTTP-date の両方に対応"""
+    assert parse_retry_after("3") == 3.0
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+    assert parse_retry_after("garbage") is None
+
+
+@pytest.mark.unit
+def test_async_fetch_retries(monkeypatch):
+    """非同期経路も同じコントローラでリトライする"""
+    waited: list[float] = []
+
+    async def _sleep(delay):
+        waited.append(delay)
+
+    monkeypatch.setattr("src.data.fetcher.base.asyncio.sleep", _sleep)
+    rows = [_row(0)]
+    script = _Script(httpx.Response(502), _ok(rows))
+    fetcher = BaseFetcher("uniswap", "http://test", "query", page_size=10)
+
+    async def _run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(script)) as client:
+            return await fetcher.afetch_interval(client, "2024-10-04T01:00:00Z")
+
+    assert asyncio.run(_run()) == rows
+    assert len(waited) == 1
+    assert fetcher.controller.metrics["error.http_502"] == 1
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.data.fetcher.serde import available_backends, get_serde
+
+PAGE = (Path(__file__).resolve().parents[1] / "fixtures" / "poolhourdatas_page.json").read_bytes()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend", list(available_backends()))
+def test_backends_roundtrip_page(backend):
+    """どのバックエンドでも同じページ・同じ NDJSON 内容になる"""
+    serde = get_serde(backend)
+    page = serde.decode_page(PAGE)
+
+    assert page == json.loads(PAGE)["data"]["poolHourDatas"]
+    encoded = serde.encode_rows([{"raw": rec, "pool_id": rec["pool"]["id"]} for rec in page])
+    lines = encoded.decode("utf-8").splitlines()
+    assert [json.loads(line)["raw"] for line in lines] == page
+    assert encoded.endswith(b"\n")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend", list(available_backends()))
+def test_backends_raise_on_graphql_errors(backend):
+    """errors を含むレスポンスは RuntimeError"""
+    with pytest.raises(RuntimeError, match="timeout"):
+        get_serde(backend).decode_page(b'{"errors": [{"message": "timeout"}]}')
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend", list(available_backends()))
+def test_backends_decode_nullable_and_unexpected_fields(backend):
+    """null の tick は型検証付きでも読め、想定外の形の行（feeTier のない V2 プールなど）は検証なしで読む"""
+    resp = json.loads(PAGE)
+    resp["data"]["poolHourDatas"][0]["tick"] = None
+    serde = get_serde(backend)
+    assert serde.decode_page(json.dumps(resp).encode())[0]["tick"] is None
+
+    del resp["data"]["poolHourDatas"][0]["pool"]["feeTier"]
+    assert serde.decode_page(json.dumps(resp).encode()) == resp["data"]["poolHourDatas"]
+
+
+@pytest.mark.unit
+def test_stdlib_always_available():
+    """標準ライブラリのバックエンドは常に利用可能"""
+    assert "stdlib" in available_backends()
+    with pytest.raises(ValueError, match="Unknown JSON backend"):
+        get_serde("simdjson")
@@ -0,0 +1,128 @@
+import gzip
+import json
+import threading
+
+import pytest
+from google.api_core.exceptions import PreconditionFailed
+
+from src.data.fetcher.sinks import GcsSink, OutputExistsError, split_compression
+from src.data.fetcher.writers import open_writer
+from tests.fixtures.pool_hour import pool_hour
+
+
+class _Blob:
+    def __init__(self, bucket: "_Bucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+
+    def _create(self, data: bytes, if_generation_match):
+        with self.bucket.lock:
+            if if_generation_match == 0 and self.name in self.bucket.objects:
+                raise PreconditionFailed(self.name)
+            self.bucket.objects[self.name] = data
+
+    def upload_from_string(self, data: bytes, if_generation_match=None):
+        self.bucket.calls.append(("upload", self.name))
+        self._create(data, if_generation_match)
+
+    def compose(self, sources, if_generation_match=None):
+        assert len(sources) <= 32
+        self.bucket.calls.append(("compose", self.name))
+        self._create(b"".join(self.bucket.objects[s.name] for s in sources), if_generation_match)
+
+    def delete(self):
+        del self.bucket.objects[self.name]
+
+
+class _Bucket:
+    """GCS バケットのインメモリ版（if_generation_match=0 のみ対応）"""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def blob(self, name: str) -> _Blob:
+        return _Blob(self, name)
+
+
+class _Client:
+    def __init__(self):
+        self.bucket_ = _Bucket()
+
+    def bucket(self, name: str) -> _Bucket:
+        assert name == "raw-bucket"
+        return self.bucket_
+
+
+@pytest.mark.unit
+def test_gcs_sink_composes_parts_in_order():
+    """part_size 毎に並列アップロードし、32 件を超えるパートも段階的に compose して元のバイト列に戻す"""
+    client = _Client()
+    sink = GcsSink("gs://raw-bucket/raw/x.jsonl", part_size=10, parallelism=3, client=client)
+    data = bytes(range(256)) * 4
+    f = sink.open()
+    for i in range(0, len(data), 7):
+        f.write(data[i : i + 7])
+    assert f.tell() == len(data)
+    sink.commit()
+
+    objects = client.bucket_.objects
+    assert list(objects) == ["raw/x.jsonl"]  # 一時オブジェクトは削除済み
+    assert objects["raw/x.jsonl"] == data
+    assert sum(1 for op, _ in client.bucket_.calls if op == "upload") == 103
+
+
+@pytest.mark.unit
+def test_gcs_sink_existing_output_and_abort():
+    """出力先が既にあれば OutputExistsError（既存は上書きしない）、abort はパートを残さない"""
+    client = _Client()
+    client.bucket_.objects["raw/x.jsonl"] = b"old"
+    sink = GcsSink("gs://raw-bucket/raw/x.jsonl", part_size=4, client=client)
+    sink.open().write(b"new data")
+    with pytest.raises(OutputExistsError):
+        sink.commit()
+    assert client.bucket_.objects == {"raw/x.jsonl": b"old"}
+
+    sink = GcsSink("gs://raw-bucket/raw/y.jsonl", part_size=4, client=client)
+    sink.open().write(b"partial data")
+    sink.abort()
+    assert client.bucket_.objects == {"raw/x.jsonl": b"old"}
+
+
+@pytest.mark.unit
+def test_gzip_jsonl_streamed_to_gcs():
+    """.jsonl.gz は 1 本の gzip ストリームとしてパートに分割され、compose 後にそのまま展開できる"""
+    client = _Client()
+    records = [pool_hour(i) for i in range(300)]
+    assert split_compression("gs://raw-bucket/a.jsonl.gz") == ("gs://raw-bucket/a.jsonl", "gzip")
+
+    with open_writer("gs://raw-bucket/a.jsonl.gz", "uniswap_v3", client=client, part_size=1024) as w:
+        for start in range(0, len(records), 100):
+            w.write(records[start : start + 100])
+
+    body = client.bucket_.objects["a.jsonl.gz"]
+    lines = gzip.decompress(body).splitlines()
+    assert len(lines) == 300
+    assert json.loads(lines[42])["raw"] == records[42]
+    assert len(body) * 5 < len(gzip.decompress(body))
+
+
+@pytest.mark.unit
+def test_local_gzip_writer_and_parquet_rejects_compression(tmp_path):
+    """ローカルでも .gz で圧縮し、失敗時は出力を残さない。Parquet の全体圧縮は不可"""
+    path = tmp_path / "a.jsonl.gz"
+    with open_writer(str(path), "uniswap_v3") as w:
+        w.write([pool_hour(1)])
+    assert json.loads(gzip.decompress(path.read_bytes()))["raw"] == pool_hour(1)
+
+    with pytest.raises(RuntimeError):
+        with open_writer(str(tmp_path / "b.jsonl.gz"), "uniswap_v3") as w:
+            w.write([pool_hour(1)])
+            raise RuntimeError("boom")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.jsonl.gz"]
+
+    pytest.importorskip("pyarrow")
+    with pytest.raises(ValueError, match="cannot be compressed"):
+        open_writer(str(tmp_path / "c.parquet.gz"), "uniswap_v3")
@@ -0,0 +1,36 @@
+import pytest
+
+from scripts.graph_standin import GraphStandin, StandinConfig
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.retry import RetryPolicy
+
+END = "2024-10-01T06:00:00+00:00"  # 代替サーバーのデータ開始から 6 時間後
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("pagination", ["skip", "id_gt"])
+def test_standin_serves_each_row_once(pagination):
+    """どちらのページングでも窓内の全行を重複・欠落なく返す"""
+    with GraphStandin(StandinConfig(pools=7, hours=12)) as standin:
+        with BaseFetcher("uniswap", standin.url, "query", page_size=5, pagination=pagination, http2=False) as f:
+            rows = f.fetch_interval(END, hours=3)
+
+    ids = [r["id"] for r in rows]
+    assert len(ids) == 7 * 3 == len(set(ids))
+    assert ids == sorted(ids)
+    assert {r["periodStartUnix"] for r in rows} == {1727740800 + h * 3600 for h in (3, 4, 5)}
+
+
+@pytest.mark.unit
+def test_standin_injected_faults_are_retried():
+    """注入した 429/5xx はフェッチャーのリトライで吸収される"""
+    cfg = StandinConfig(pools=20, hours=6, rate_limit_rate=0.2, server_error_rate=0.2, retry_after_s=0, seed=1)
+    with GraphStandin(cfg) as standin:
+        retry = RetryPolicy(max_attempts=20, base_delay=0.001)
+        f = BaseFetcher("uniswap", standin.url, "query", page_size=4, pagination="id_gt", http2=False, retry=retry)
+        with f:
+            rows = f.fetch_interval(END, hours=6)
+
+    assert len(rows) == 20 * 6
+    assert standin.stats["429"] + standin.stats["5xx"] > 0
+    assert f.controller.metrics["retries"] == standin.stats["429"] + standin.stats["5xx"]
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+ENTRYPOINT = "src.jobs.fetcher.run_fetch_cli"
+
+# Cloud Run Job の起動時に読み込まないモジュール（使う関数の中で import する）
+DEFERRED = ("google.cloud.bigquery", "google.cloud.storage", "google.api_core", "pyarrow", "grpc")
+
+# ジョブのモジュールを import し終えるまでの予算（-X importtime の累積時間、マイクロ秒）
+IMPORT_BUDGET_US = int(os.getenv("FETCHER_IMPORT_BUDGET_MS", "600")) * 1000
+
+
+def _importtime(code: str) -> tuple[dict[str, int], str]:
+    """新しいプロセスで code を実行し、モジュール毎の累積 import 時間（マイクロ秒）と stdout を返す"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        if cum.strip().isdigit():
+            cumulative[name.strip()] = int(cum)
+    return cumulative, proc.stdout
+
+
+@pytest.mark.performance
+def test_fetcher_job_cold_start_within_budget():
+    """ジョブの起動でクラウドのクライアントライブラリや .gql を読み込まず、import 時間が予算内に収まる"""
+    code = (
+        f"import {ENTRYPOINT}\n"
+        "from src.data.fetcher.registry import read_query\n"
+        "print(read_query.cache_info().currsize)"
+    )
+    cumulative, stdout = _importtime(code)
+
+    eager = sorted(m for m in cumulative if m.startswith(DEFERRED))
+    assert eager == [], f"imported at startup: {eager}"
+    assert stdout.strip() == "0"  # クエリファイルはフェッチャーを組み立てるまで読まない
+    assert cumulative[ENTRYPOINT] <= IMPORT_BUDGET_US, (
+        f"{ENTRYPOINT} took {cumulative[ENTRYPOINT] / 1000:.0f}ms to import "
+        f"(budget {IMPORT_BUDGET_US / 1000:.0f}ms, FETCHER_IMPORT_BUDGET_MS)"
+    )
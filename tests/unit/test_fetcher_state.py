@@ -0,0 +1,96 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.data.fetcher.state import FetchState, GcsStateStore, LocalStateStore, subtract_intervals
+
+H = 3600
+T0 = 1728000000 - 1728000000 % H
+
+
+@pytest.mark.unit
+def test_gaps_exclude_done_and_pending():
+    """ロード済み・アップロード済みの区間を除いた隙間だけを返す"""
+    state = FetchState("uniswap", done=[(T0, T0 + 2 * H), (T0 + 2 * H, T0 + 3 * H)])
+    state.mark_uploaded((T0 + 5 * H, T0 + 6 * H), "gs://b/x.jsonl")
+
+    assert state.done == [(T0, T0 + 3 * H)]
+    assert state.high_water == T0 + 3 * H
+    assert state.gaps(T0, T0 + 8 * H) == [(T0 + 3 * H, T0 + 5 * H), (T0 + 6 * H, T0 + 8 * H)]
+    assert state.gaps(T0 + H, T0 + 2 * H) == []
+
+    state.mark_done((T0 + 5 * H, T0 + 6 * H))
+    assert state.pending == {}
+    assert state.done == [(T0, T0 + 3 * H), (T0 + 5 * H, T0 + 6 * H)]
+    assert subtract_intervals(0, 10, [(2, 4), (3, 6)]) == [(0, 2), (6, 10)]
+
+
+@pytest.mark.unit
+def test_local_store_round_trip(tmp_path):
+    """ローカルストアは保存した状態をそのまま復元する"""
+    store = LocalStateStore(str(tmp_path / "state"))
+    assert store.load("uniswap").done == []
+
+    state = FetchState("uniswap", done=[(T0, T0 + H)], pending={(T0 + H, T0 + 2 * H): "gs://b/y.jsonl"})
+    store.save(state)
+
+    loaded = store.load("uniswap")
+    assert loaded.done == state.done
+    assert loaded.pending == state.pending
+
+
+@pytest.mark.unit
+def test_gcs_store_uses_generation_precondition():
+    """GCS ストアは読み込んだ世代番号を if_generation_match に渡す"""
+    from google.api_core.exceptions import NotFound
+
+    blob = MagicMock()
+    blob.download_as_bytes.side_effect = NotFound("missing")
+    client = MagicMock()
+    client.bucket.return_value.blob.return_value = blob
+
+    store = GcsStateStore("bucket", "state/", client=client)
+    state = store.load("sushiswap")
+    blob.generation = 42
+    store.save(state)
+
+    client.bucket.return_value.blob.assert_called_with("state/sushiswap.json")
+    assert blob.upload_from_string.call_args.kwargs["if_generation_match"] == 0
+    store.save(state)
+    assert blob.upload_from_string.call_args.kwargs["if_generation_match"] == 42
+
+
+@pytest.mark.unit
+def test_incremental_skips_done_and_retries_pending_load(tmp_path, monkeypatch):
+    """完了済みの区間は取得せず、ロード失敗の区間は再取得せずにロードだけやり直す"""
+    cli = pytest.importorskip("src.jobs.fetcher.run_fetch_cli")
+    fetched: list[tuple[str, int]] = []
+    loaded: list[list[str]] = []
+
+    def _fetch_and_upload(project_id, bucket, protocol, interval_iso, fmt, hours=1):
+        fetched.append((interval_iso, hours))
+        return f"gs://{bucket}/{interval_iso}.jsonl"
+
+    def _load(project_id, env_suffix, dataset_prefix, protocol, uris, fmt="jsonl"):
+        if fail["load"]:
+            raise RuntimeError("load failed")
+        loaded.append(uris)
+
+    fail = {"load": True}
+    monkeypatch.setattr(cli, "_fetch_and_upload", _fetch_and_upload)
+    monkeypatch.setattr(cli, "_load", _load)
+    args = ("p", "dev", "dex", "uniswap", "bucket")
+    state_uri = str(tmp_path / "state")
+
+    with pytest.raises(RuntimeError):
+        cli.incremental(*args, "2024-10-04T05:00:00+00:00", "jsonl", state_uri, catch_up_hours=3)
+    assert fetched == [("2024-10-04T05:00:00+00:00", 3)]
+
+    fail["load"] = False
+    cli.incremental(*args, "2024-10-04T06:00:00+00:00", "jsonl", state_uri, catch_up_hours=3)
+    # 保留中のロードをやり直し、新しい 1 時間分だけを取得する
+    assert fetched[1:] == [("2024-10-04T06:00:00+00:00", 1)]
+    assert loaded == [["gs://bucket/2024-10-04T05:00:00+00:00.jsonl"], ["gs://bucket/2024-10-04T06:00:00+00:00.jsonl"]]
+
+    cli.incremental(*args, "2024-10-04T06:00:00+00:00", "jsonl", state_uri, catch_up_hours=3)
+    assert len(fetched) == 2
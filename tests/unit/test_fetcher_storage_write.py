@@ -0,0 +1,142 @@
+import gzip
+import json
+from concurrent.futures import Future
+
+import pytest
+from google.api_core.exceptions import AlreadyExists, OutOfRange, ServiceUnavailable
+
+from scripts.graph_standin import GraphStandin, StandinConfig
+from src.data.fetcher.base import BaseFetcher
+from src.data.fetcher.projection import MINIMAL_FIELDS, build_pool_hour_query
+from src.data.fetcher.retry import RetryPolicy
+from src.data.fetcher.storage_write import StorageWriteWriter, raw_row_message
+from src.data.fetcher.writers import JsonlWriter
+from tests.fixtures.pool_hour import pool_hour
+
+TABLE = "p.dex_raw_dev.pool_hourly_uniswap_v3"
+
+
+class _FakeWriteClient:
+    """
+    Storage Write API のインメモリ版
+
+    offset が末尾と一致しなければ ALREADY_EXISTS（書き込み済み）/ OUT_OF_RANGE（欠番）。
+    failures に積んだ例外を append の度に 1 つずつ返す（例外を返した append の行は書き込まない）。
+    lost_acks > 0 の間は行を書き込んだ上で応答を失う（ServiceUnavailable）。
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self.tables = {}
+        self.failures = []
+        self.lost_acks = 0
+        self.appends = []
+
+    def create_stream(self, table, committed):
+        name = f"{table}/streams/{len(self.streams)}"
+        self.streams[name] = {"table": table, "committed": committed, "rows": [], "state": "open"}
+        return name
+
+    def append(self, stream, rows, offset):
+        s = self.streams[stream]
+        assert s["state"] == "open"
+        self.appends.append(offset)
+        future = Future()
+        if self.failures:
+            future.set_exception(self.failures.pop(0))
+        elif offset < len(s["rows"]):
+            future.set_exception(AlreadyExists(f"offset {offset}"))
+        elif offset > len(s["rows"]):
+            future.set_exception(OutOfRange(f"offset {offset}"))
+        else:
+            s["rows"] += rows
+            if s["committed"]:
+                self.tables.setdefault(s["table"], []).extend(rows)
+            if self.lost_acks:
+                self.lost_acks -= 1
+                future.set_exception(ServiceUnavailable("connection reset"))
+            else:
+                future.set_result(None)
+        return future
+
+    def finalize(self, stream):
+        self.streams[stream]["state"] = "finalized"
+        return len(self.streams[stream]["rows"])
+
+    def commit(self, table, streams):
+        for name in streams:
+            assert self.streams[name]["state"] == "finalized"
+            self.tables.setdefault(table, []).extend(self.streams[name]["rows"])
+
+    def abort(self, stream):
+        self.streams[stream]["state"] = "aborted"
+
+
+def _writer(client, **kwargs) -> StorageWriteWriter:
+    kwargs.setdefault("retry", RetryPolicy(max_attempts=3))
+    return StorageWriteWriter(TABLE, "uniswap_v3", client=client, sleep=lambda s: None, **kwargs)
+
+
+@pytest.mark.unit
+def test_pending_stream_commits_rows_once(tmp_path):
+    """pending ストリームは正常終了時にまとめてコミットし、一時的なエラー・重複した再送でも行は 1 回だけ"""
+    client = _FakeWriteClient()
+    pages = [[pool_hour(i) for i in range(start, start + 40)] for start in range(0, 120, 40)]
+    archive = JsonlWriter(str(tmp_path / "archive.jsonl.gz"), "uniswap_v3")
+
+    with _writer(client, archive=archive, max_request_bytes=8 * 1024) as w:
+        w.write(pages[0])
+        client.failures = [ServiceUnavailable("busy")]
+        w.write(pages[1])
+        assert client.tables == {}  # コミット前は見えない
+        client.lost_acks = 1
+        w.write(pages[2])
+
+    rows = client.tables[TABLE]
+    assert [json.loads(r["raw"]) for r in rows] == [rec for page in pages for rec in page]
+    assert rows[5]["pool_id"] == pool_hour(5)["pool"]["id"]
+    assert rows[5]["hour_ts"] == pool_hour(5)["periodStartUnix"] * 1_000_000
+    assert len(client.appends) > len(pages)  # 1 ページが複数のリクエストに分割され、失敗分は再送された
+    archived = gzip.decompress((tmp_path / "archive.jsonl.gz").read_bytes()).splitlines()
+    assert [json.loads(line)["raw"] for line in archived] == [json.loads(r["raw"]) for r in rows]
+
+
+@pytest.mark.unit
+def test_failure_leaves_nothing_visible(tmp_path):
+    """途中で失敗した pending ストリームはコミットせず、アーカイブも残さない"""
+    client = _FakeWriteClient()
+    archive = JsonlWriter(str(tmp_path / "archive.jsonl"), "uniswap_v3")
+    with pytest.raises(ServiceUnavailable):
+        with _writer(client, archive=archive) as w:
+            w.write([pool_hour(1)])
+            client.failures = [ServiceUnavailable("busy")] * 3
+            w.write([pool_hour(2)])
+            w.write([pool_hour(3)])
+
+    assert client.tables == {}
+    assert [s["state"] for s in client.streams.values()] == ["aborted"]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.unit
+def test_committed_stream_via_fetcher():
+    """BaseFetcher.run("bq://...") で committed ストリームに追記する"""
+    client = _FakeWriteClient()
+    with GraphStandin(StandinConfig(pools=10, hours=3)) as standin:
+        query = build_pool_hour_query(MINIMAL_FIELDS)
+        fetcher = BaseFetcher("uniswap", standin.url, query, page_size=8, http2=False, fields=MINIMAL_FIELDS)
+        with fetcher:
+            rows = fetcher.run(f"bq://{TABLE}", "2024-10-01T03:00:00+00:00", hours=3, client=client, mode="committed")
+
+    assert rows == 30
+    assert len(client.tables[TABLE]) == 30
+    assert {r["dex_protocol"] for r in client.tables[TABLE]} == {"uniswap_v3"}
+
+
+@pytest.mark.unit
+def test_raw_row_message_round_trip():
+    """RAW テーブル 1 行分の protobuf メッセージ"""
+    row_cls, descriptor = raw_row_message()
+    row = {"raw": '{"id":"x"}', "pool_id": "0xpool", "dex_protocol": "uniswap_v3", "hour_ts": 1, "load_ts": 2}
+    assert row_cls.FromString(row_cls(**row).SerializeToString()).raw == '{"id":"x"}'
+    assert [f.name for f in descriptor.field] == list(row)
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src.data.fetcher.writers import JsonlWriter, open_writer
+from tests.fixtures.pool_hour import pool_hour
+
+
+@pytest.mark.unit
+def test_open_writer_picks_format_by_suffix(tmp_path):
+    """拡張子で出力形式を切り替える"""
+    assert isinstance(open_writer(str(tmp_path / "a.jsonl"), "uniswap_v3"), JsonlWriter)
+
+
+@pytest.mark.unit
+def test_parquet_writer_typed_columns(tmp_path):
+    """数値は型付き・uint256 は文字列で損失なし・プール列は辞書エンコード"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    records = [pool_hour(i % 50, pool_id=f"0xpool{i % 50:04d}") for i in range(2000)]
+
+    parquet_path = tmp_path / "uni.parquet"
+    with open_writer(str(parquet_path), "uniswap_v3") as w:
+        for start in range(0, len(records), 1000):
+            w.write(records[start : start + 1000])
+    jsonl_path = tmp_path / "uni.jsonl"
+    with open_writer(str(jsonl_path), "uniswap_v3") as w:
+        w.write(records)
+
+    table = pq.read_table(parquet_path)
+    row = table.slice(7, 1).to_pylist()[0]
+    assert table.num_rows == 2000
+    assert row["pool_id"] == "0xpool0007"
+    assert row["tvl_usd"] == 1000000.5
+    assert row["tick"] == -201234
+    assert row["token0_decimals"] == 18
+    assert row["fee_tier"] == 3000
+    assert int(row["fee_growth_global0_x128"]) == 2**255 + 7
+    assert str(table.schema.field("hour_ts").type) == "timestamp[ms, tz=UTC]"
+
+    column = pq.ParquetFile(parquet_path).metadata.row_group(0).column(table.schema.get_field_index("pool_id"))
+    assert any("DICTIONARY" in enc for enc in column.encodings)
+    assert parquet_path.stat().st_size * 3 < jsonl_path.stat().st_size
+    assert json.loads(jsonl_path.read_text().splitlines()[0])["raw"] == records[0]
@@ -12,9 +12,15 @@ import numpy as np
 import pytest
 from sklearn.ensemble import IsolationForest
 
+from src.features.feature_matrix import FeatureMatrix
 from tests.fixtures.common import DEFAULT_FEATURES, FEATURE_LIST
 
 
+def _matrix(features, default_value=0.0):
+    """read_feature_matrix の戻り値（1 プール分）"""
+    return FeatureMatrix.from_dicts({"pool_dummy": features}, FEATURE_LIST, default_value=default_value)
+
+
 @pytest.fixture
 def dummy_features():
     """FEATURE_LIST と同じ 13 要素分のダミー値"""
@@ -54,11 +60,11 @@ def test_feature_list_length():
 
 
 @pytest.mark.unit
-@patch("src.models.predict.read_features")
-def test_predict_from_feature_store(mock_read_features, dummy_features, temp_model_file):
+@patch("src.models.predict.read_feature_matrix")
+def test_predict_from_feature_store(mock_read_matrix, dummy_features, temp_model_file):
     """Feature Storeからの予測テスト"""
     # Feature Store のモック
-    mock_read_features.return_value = dummy_features
+    mock_read_matrix.return_value = _matrix(dummy_features)
 
     # モデルパスを設定
     with patch.dict(os.environ, {"MODEL_PATH": temp_model_file}):
@@ -81,11 +87,11 @@ def test_predict_from_feature_store(mock_read_features, dummy_features, temp_mod
 
 
 @pytest.mark.unit
-@patch("src.models.predict.read_features")
-def test_predict_with_missing_features(mock_read_features, temp_model_file):
+@patch("src.models.predict.read_feature_matrix")
+def test_predict_with_missing_features(mock_read_matrix, temp_model_file):
     """一部の特徴量が欠損している場合のテスト"""
     # 一部の特徴量のみ返す
-    mock_read_features.return_value = {"volume_usd": 100.0, "tvl_usd": 5000.0}
+    mock_read_matrix.return_value = _matrix({"volume_usd": 100.0, "tvl_usd": 5000.0})
 
     with patch.dict(os.environ, {"MODEL_PATH": temp_model_file}):
         from src.models.predict import predict_from_feature_store
@@ -97,11 +103,11 @@ def test_predict_with_missing_features(mock_read_features, temp_model_file):
 
 
 @pytest.mark.unit
-@patch("src.models.predict.read_features")
-def test_predict_with_exception(mock_read_features):
+@patch("src.models.predict.read_feature_matrix")
+def test_predict_with_exception(mock_read_matrix):
     """例外発生時のテスト"""
     # Feature Store で例外を発生させる
-    mock_read_features.side_effect = Exception("Feature Store Error")
+    mock_read_matrix.side_effect = Exception("Feature Store Error")
 
     # モデルファイルが存在しない状態でテスト
     with patch.dict(os.environ, {"MODEL_PATH": "/non/existent/model.joblib"}):
@@ -158,8 +164,8 @@ def test_predict_boundary_values(temp_model_file):
         from src.models.predict import predict_from_feature_store
 
         # モックで境界値のスコアを返すように設定
-        with patch("src.models.predict.read_features") as mock_read:
-            mock_read.return_value = {fname: 1.0 for fname in FEATURE_LIST}
+        with patch("src.models.predict.read_feature_matrix") as mock_read:
+            mock_read.return_value = _matrix({fname: 1.0 for fname in FEATURE_LIST})
 
             # 閾値ちょうどのケース
             with patch("src.models.predict.get_model") as mock_model: